@@ -126,8 +126,46 @@ def eps_for_Model(Model, n_node, time_limit=0.5):
 
 # }}}
 
-def eps_report_for_components(comps, eps_func):
-    n_nodes = [2 << i for i in range(14)]
+# couplings {{{
+
+def couplings():
+    from tvb.simulator.coupling import Linear, Scaling, HyperbolicTangent, Difference, Kuramoto
+    return Linear, Scaling, HyperbolicTangent, Difference, Kuramoto
+
+def sparse_history(n_node, density=0.2, n_time=64):
+    from tvb.simulator.history import SparseHistory
+    weights = numpy.random.rand(n_node, n_node) * (numpy.random.rand(n_node, n_node) < density)
+    delays = numpy.random.randint(0, n_time, (n_node, n_node))
+    history = SparseHistory(weights, delays, numpy.r_[0], 1)
+    history.initialize(numpy.random.randn(history.n_time, 1, n_node, 1))
+    return history
+
+def eps_for_cfun(cfun, history, time_limit):
+    cfun(1, history)
+    tic = time.time()
+    n_eval = 0
+    while (time.time() - tic) < time_limit:
+        cfun(n_eval, history)
+        n_eval += 1
+    toc = time.time()
+    return n_eval / (toc - tic)
+
+def eps_for_Coupling(Coupling, n_node, time_limit=0.5):
+    coupling = Coupling()
+    coupling.configure()
+    return eps_for_cfun(coupling, sparse_history(n_node), time_limit)
+
+def eps_for_NbCoupling(Coupling, n_node, time_limit=0.5):
+    from tvb.simulator._numba.coupling import NbSparseCoupling
+    coupling = Coupling()
+    coupling.configure()
+    history = sparse_history(n_node)
+    return eps_for_cfun(NbSparseCoupling(coupling, history), history, time_limit)
+
+# }}}
+
+def eps_report_for_components(comps, eps_func, n_nodes=None):
+    n_nodes = n_nodes or [2 << i for i in range(14)]
     sys.stdout.write('%30s' % ('n_node',))
     [sys.stdout.write('%06s' % (n, )) for n in n_nodes]
     sys.stdout.write('\n')
@@ -152,5 +190,10 @@ if __name__ == '__main__':
     from tvb.simulator.integrators import RungeKutta4thOrderDeterministic
     integs = list(integrators()) + [RungeKutta4thOrderDeterministic]
     eps_report_for_components(integs, eps_for_Integrator)
+    coupling_n_nodes = [2 << i for i in range(10)]
+    print('benchmarking couplings, NumPy')
+    eps_report_for_components(couplings(), eps_for_Coupling, coupling_n_nodes)
+    print('benchmarking couplings, Numba')
+    eps_report_for_components(couplings(), eps_for_NbCoupling, coupling_n_nodes)
 
 # vim: sw=4 sts=4 ai et foldmethod=marker
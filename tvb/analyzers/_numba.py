@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Numba kernels for the analyzers.
+
+"""
+
+import numba
+
+
+@numba.njit
+def _balloon_dfun(s, f, v, q, x, kappa, gamma, rtau_o, ralpha, E0):
+    "Balloon model derivatives of a single node, as `BalloonModel.balloon_dfun`."
+    v_a = v ** ralpha
+    ds = x - kappa * s - gamma * (f - 1.)
+    dv = rtau_o * (f - v_a)
+    dq = rtau_o * ((f * (1. - (1. - E0) ** (1. / f)) / E0) - v_a * (q / v))
+    return ds, s, dv, dq
+
+
+@numba.njit
+def balloon_integrate(state, neural_input, v_q, dt, heun, kappa, gamma, rtau_o, ralpha, E0):
+    """
+    Integrate the balloon model state (4, node) in place through the neural input
+    (time, node), with the Heun or Euler deterministic scheme, writing v and q after
+    each step to v_q (time, 2, node).
+
+    """
+    for i in range(state.shape[1]):
+        s, f, v, q = state[0, i], state[1, i], state[2, i], state[3, i]
+        for t in range(neural_input.shape[0]):
+            x = neural_input[t, i]
+            ds, df, dv, dq = _balloon_dfun(s, f, v, q, x, kappa, gamma, rtau_o, ralpha, E0)
+            if heun:
+                ds_, df_, dv_, dq_ = _balloon_dfun(s + dt * ds, f + dt * df, v + dt * dv, q + dt * dq,
+                                                   x, kappa, gamma, rtau_o, ralpha, E0)
+                s += (ds + ds_) * dt / 2.0
+                f += (df + df_) * dt / 2.0
+                v += (dv + dv_) * dt / 2.0
+                q += (dq + dq_) * dt / 2.0
+            else:
+                s += dt * ds
+                f += dt * df
+                v += dt * dv
+                q += dt * dq
+            v_q[t, 0, i] = v
+            v_q[t, 1, i] = q
+        state[0, i], state[1, i], state[2, i], state[3, i] = s, f, v, q
@@ -40,8 +40,9 @@ import numpy
 import tvb.datatypes.time_series as time_series
 import tvb.datatypes.temporal_correlations as temporal_correlations
 import tvb.basic.traits.core as core
+import tvb.basic.traits.types_basic as basic
 import tvb.basic.traits.util as util
-from scipy.signal.signaltools import correlate
+from scipy.fftpack import next_fast_len
 from tvb.basic.logger.builder import get_logger
 
 LOG = get_logger(__name__)
@@ -63,8 +64,22 @@ class CrossCorrelate(core.Type):
         label="Time Series",
         required=True,
         doc="""The time-series for which the cross correlation sequences are calculated.""")
-    
-    
+
+    max_lag = basic.Float(
+        label="Maximum lag (ms)",
+        default=0.0,
+        required=False,
+        doc="""Largest absolute temporal offset for which the cross-correlation is returned,
+        in the time units of the time-series. By default, offsets spanning the length of the
+        time-series are returned.""")
+
+    block_nbytes = basic.Integer(
+        label="Bytes per block",
+        default=2 ** 26,
+        required=False,
+        doc="""Approximate memory used for the spectral products of a block of node pairs,
+        which are computed at once.""")
+
     def evaluate(self):
         """
         Cross-correlate two one-dimensional arrays.
@@ -77,23 +92,17 @@ class CrossCorrelate(core.Type):
         LOG.info("result shape will be: %s" % str(result_shape))
         
         result = numpy.zeros(result_shape)
-        
-        #TODO: For region level, 4s, 2000Hz, this takes ~3hours...(which makes node_coherence seem positively speedy...)
-        # Probably best to add a keyword for offsets, so we just compute +- some "small" range...
+        lags = self.lags(self.time_series.data.shape[0])
+
         # One inter-node correlation, across offsets, for each state-var & mode.
         for mode in range(result_shape[4]):
             for var in range(result_shape[3]):
                 data = self.time_series.data[:, var, :, mode]
-                data = data - data.mean(axis=0)[numpy.newaxis, :]
-                #TODO: Work out a way around the 4 level loop:
-                for n1 in range(result_shape[1]):
-                    for n2 in range(result_shape[2]):
-                        result[:, n1, n2, var, mode] = correlate(data[:, n1], data[:, n2], mode="same")
-        
+                cross_correlate(data, lags, result[:, :, :, var, mode], self.block_nbytes)
+
         util.log_debug_array(LOG, result, "result")
-        
-        offset = (self.time_series.sample_period *
-                  numpy.arange(-numpy.floor(result_shape[0] / 2.0), numpy.ceil(result_shape[0] / 2.0)))
+
+        offset = self.time_series.sample_period * lags
 
         cross_corr = temporal_correlations.CrossCorrelation(
             source=self.time_series,
@@ -104,9 +113,21 @@ class CrossCorrelate(core.Type):
         return cross_corr
     
     
+    def lags(self, n_time):
+        """
+        Returns the offsets, in samples, of the cross-correlation of n_time samples, centered as
+        by scipy.signal.correlate(mode='same') and limited to max_lag if given.
+        """
+        lo, hi = -(n_time // 2), (n_time - 1) // 2
+        if self.max_lag > 0:
+            max_lag = int(self.max_lag / self.time_series.sample_period)
+            lo, hi = max(lo, -max_lag), min(hi, max_lag)
+        return numpy.arange(lo, hi + 1)
+
     def result_shape(self, input_shape):
         """Returns the shape of the main result of ...."""
-        result_shape = (input_shape[0], input_shape[2], input_shape[2], input_shape[1], input_shape[3])
+        n_lag = len(self.lags(input_shape[0]))
+        result_shape = (n_lag, input_shape[2], input_shape[2], input_shape[1], input_shape[3])
         return result_shape
     
     
@@ -118,4 +139,33 @@ class CrossCorrelate(core.Type):
         return result_size
 
 
+def cross_correlate(data, lags, out, block_nbytes=2 ** 26):
+    """
+    Cross-correlation of each pair of mean-removed columns of data (time, node) at the given lags,
+    written to out (lag, node, node), where out[k, i, j] = sum_t x_i[t + lags[k]] x_j[t], as
+    computed by scipy.signal.correlate.
+
+    For a few lags, each lag is a single matrix product over time, shared by the lag of opposite
+    sign. Otherwise, every node is transformed once, and the products of the spectra are inverted
+    for blocks of rows of node pairs, of about block_nbytes.
 
+    """
+    n_time, n_node = data.shape
+    data = data - data.mean(axis=0)
+    max_lag = int(numpy.abs(lags).max())
+    # zero padding avoids circular wrap around for the requested lags
+    n_fft = next_fast_len(n_time + max_lag)
+    # a product over time costs much less per element than a transform of a pair
+    if len(numpy.unique(numpy.abs(lags))) < 16 * numpy.log2(n_fft):
+        for lag in numpy.unique(numpy.abs(lags)):
+            product = data[lag:].T.dot(data[:n_time - lag])
+            out[lags == lag] = product
+            out[lags == -lag] = product.T
+        return out
+    spectra = numpy.fft.rfft(data, n_fft, axis=0)
+    n_block = max(1, int(block_nbytes // (16 * n_fft * n_node)))
+    indices = lags % n_fft
+    for lo in range(0, n_node, n_block):
+        block = spectra[:, lo:lo + n_block, numpy.newaxis] * spectra[:, numpy.newaxis].conj()
+        out[:, lo:lo + n_block] = numpy.fft.irfft(block, n_fft, axis=0)[indices]
+    return out
@@ -102,6 +102,20 @@ class FcdCalculator(core.Type):
         FC(ti) as Pearson Correlation. The ij element of the FCD matrix is calculated as the Pearson correlation
         between FC(ti) and FC(tj) arranged in a vector""")
 
+    edge_chunk = types_basic.Integer(
+        label="Edges per chunk",
+        default=0,
+        required=False,
+        doc="""Number of node pairs whose windowed correlations are computed at once. Zero chooses
+        the number of pairs from block_nbytes.""")
+
+    block_nbytes = types_basic.Integer(
+        label="Bytes per block",
+        default=2 ** 26,
+        required=False,
+        doc="""Approximate memory used for the cumulative cross products of a chunk of node pairs,
+        which bounds the memory required for long time series and large networks.""")
+
     def evaluate(self):
         cls_attr_name = self.__class__.__name__ + ".time_series"
         self.time_series.trait["data"].log_debug(owner=cls_attr_name)
@@ -114,27 +128,14 @@ class FcdCalculator(core.Type):
         result_shape = self.result_shape(input_shape)
 
         fcd = np.zeros(result_shape)
-        fc_stream = {}  # dict where the fc calculated over the sliding window will be stored
+        starts, stops = window_bounds(sp, sw, result_shape[0])
         for mode in range(result_shape[3]):
             for var in range(result_shape[2]):
-                start = -sp  # in order to well initialize the first starting point of the FC stream
-                for nfcd in range(result_shape[0]):
-                    start += sp
-                    current_slice = tuple([slice(int(start), int(start + sw) + 1), slice(var, var + 1),
-                                           slice(input_shape[2]), slice(mode, mode + 1)])
-                    data = self.time_series.read_data_slice(current_slice).squeeze()
-                    fc = np.corrcoef(data.T)
-                    # the triangular part of the fc is organized as a vector, excluding the diagonal (always ones)
-                    triangular = np.triu_indices(len(fc), 1)
-                    fc_stream[nfcd] = fc[triangular]
-                for i in range(result_shape[0]):
-                    j = i
-                    while j < result_shape[0]:
-                        fci = fc_stream[i]
-                        fcj = fc_stream[j]
-                        fcd[i, j, var, mode] = np.corrcoef(fci, fcj)[0, 1]
-                        fcd[j, i, var, mode] = fcd[i, j, var, mode]
-                        j += 1
+                current_slice = tuple([slice(input_shape[0]), slice(var, var + 1),
+                                       slice(input_shape[2]), slice(mode, mode + 1)])
+                data = self.time_series.read_data_slice(current_slice)[:, 0, :, 0]
+                fcd[:, :, var, mode] = windowed_fcd(data, starts, stops, self.edge_chunk or None,
+                                                    self.block_nbytes)
 
         util.log_debug_array(LOG, fcd, "FCD")
 
@@ -211,6 +212,75 @@ class FcdCalculator(core.Type):
 
 
 # Methods:
+def window_bounds(sp, sw, n_window):
+    "Start and stop time indices of n_window sliding windows of sw samples, every sp samples."
+    # accumulate like successive additions of the span, to match the original windowing exactly
+    starts = np.cumsum(np.r_[-sp, np.tile(sp, n_window)])[1:]
+    return starts.astype(int), (starts + sw).astype(int) + 1
+
+
+def _edge_chunk(n_time, n_window, block_nbytes):
+    "Number of node pairs whose cumulative cross products and FC fit in block_nbytes."
+    # per pair, the products, their cumulative sum with a leading zero, and the window moments
+    return max(1, int(block_nbytes // (8 * (3 * (n_time + 1) + 4 * n_window))))
+
+
+def windowed_fc(data, starts, stops, edge_chunk=None, block_nbytes=2 ** 26):
+    """
+    Pearson correlations between each pair of nodes i < j of data (time, node) within
+    each window [start, stop), computed from cumulative sums and cross products over
+    time instead of one correlation matrix per window. Yields (window, pair) blocks of
+    at most edge_chunk pairs, in the order of numpy.triu_indices; by default, as many
+    pairs as fit in block_nbytes.
+
+    """
+    rows, cols = np.triu_indices(data.shape[1], 1)
+    edge_chunk = edge_chunk or _edge_chunk(data.shape[0], len(starts), block_nbytes)
+    stops = np.minimum(stops, data.shape[0])
+    # centering limits cancellation in differences of the cumulative sums
+    data = data - data.mean(axis=0)
+    n = (stops - starts).reshape((-1, 1)).astype(float)
+    cumsum = lambda x: np.cumsum(np.r_[np.zeros((1, x.shape[1])), x], axis=0)
+    sums = cumsum(data)
+    s = sums[stops] - sums[starts]
+    squares = cumsum(data ** 2)
+    std = np.sqrt(squares[stops] - squares[starts] - s ** 2 / n)
+    for lo in range(0, rows.size, edge_chunk):
+        i, j = rows[lo:lo + edge_chunk], cols[lo:lo + edge_chunk]
+        products = cumsum(data[:, i] * data[:, j])
+        cov = products[stops] - products[starts] - s[:, i] * s[:, j] / n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            yield cov / (std[:, i] * std[:, j])
+
+
+def windowed_fcd(data, starts, stops, edge_chunk=None, block_nbytes=2 ** 26):
+    """
+    FCD matrix of data (time, node), i.e. the Pearson correlations between the upper
+    triangular FC of each pair of windows [start, stop). When all pairs fit in
+    block_nbytes, or edge_chunk, the (window, pair) FC matrix is standardized and the
+    FCD obtained as a single matrix product. Otherwise, only a chunk of pairs is held at
+    a time, and the product and the moments of the FC vectors are accumulated over
+    chunks instead.
+
+    """
+    n_edge = data.shape[1] * (data.shape[1] - 1) // 2
+    edge_chunk = edge_chunk or _edge_chunk(data.shape[0], len(starts), block_nbytes)
+    if edge_chunk >= n_edge:
+        fc, = windowed_fc(data, starts, stops, n_edge)
+        fc -= fc.mean(axis=1).reshape((-1, 1))
+        fc /= np.sqrt((fc ** 2).sum(axis=1)).reshape((-1, 1))
+        return fc.dot(fc.T)
+    gram = np.zeros((len(starts), len(starts)))
+    fc_sum = np.zeros(len(starts))
+    for fc in windowed_fc(data, starts, stops, edge_chunk):
+        gram += fc.dot(fc.T)
+        fc_sum += fc.sum(axis=1)
+    mean = fc_sum / n_edge
+    cov = gram / n_edge - np.outer(mean, mean)
+    std = np.sqrt(np.diag(cov))
+    return cov / np.outer(std, std)
+
+
 def spectral_dbscan(fcd, n_dim=2, eps=0.3, min_samples=50):
     fcd = fcd - fcd.min()
     se = SpectralEmbedding(n_dim, affinity="precomputed")
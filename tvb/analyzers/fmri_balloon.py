@@ -211,6 +211,25 @@ class BalloonModel(core.Type):
         ``revised`` coefficients. """,
         order=-1)
 
+    numba_integration = basic.Bool(
+        label="Numba integration",
+        default=False,
+        required=False,
+        order=-1,
+        doc="""Integrate the balloon model with a compiled kernel, advancing each node
+        through a block of time points, instead of a NumPy step for all nodes at a time.
+        Available for the HeunDeterministic and EulerDeterministic integrators without
+        clamped state variables.""")
+
+    block_nbytes = basic.Integer(
+        label="Bytes per block",
+        default=2 ** 24,
+        required=False,
+        order=-1,
+        doc="""Approximate memory used for the neural input and the balloon model state of
+        a block of time points, which are integrated at once. Only the BOLD signal is
+        kept for all time points.""")
+
 
 
     def evaluate(self):
@@ -224,8 +243,10 @@ class BalloonModel(core.Type):
         #      input is the sum over the state-variables. Only time-series
         #      from basic monitors should be used as inputs.
 
-        neural_activity, t_int = self.input_transformation(self.time_series, self.neural_input_transformation)
-        input_shape = neural_activity.shape
+        t_int = self.input_time(self.time_series, self.neural_input_transformation)
+        n_time = t_int.shape[0]
+        _, _, n_node, n_mode = self.time_series.data.shape
+        input_shape = (n_time, 1, n_node, n_mode)
         result_shape = self.result_shape(input_shape)
         LOG.debug("Result shape will be: %s" % str(result_shape))
 
@@ -241,79 +262,131 @@ class BalloonModel(core.Type):
 
         balloon_nvar = 4           
 
-        #NOTE: hard coded initial conditions
-        state = numpy.zeros((input_shape[0], balloon_nvar, input_shape[2], input_shape[3]))  # s
-        state[0, 1, :] = 1.  # f
-        state[0, 2, :] = 1.  # v
-        state[0, 3, :] = 1.  # q
+        #NOTE: hard coded initial conditions, only the current state is kept
+        state = numpy.zeros((balloon_nvar, n_node, n_mode))  # s
+        state[1, :] = 1.  # f
+        state[2, :] = 1.  # v
+        state[3, :] = 1.  # q
 
         # BOLD model coefficients
         k = self.compute_derived_parameters()
-        k1, k2, k3 = k[0], k[1], k[2]
 
         # prepare integrator
         self.integrator.dt = self.dt
         self.integrator.configure()
         LOG.debug("Integration time step size will be: %s seconds" % str(self.integrator.dt))
 
-        scheme = self.integrator.scheme
-
-        # NOTE: the following variables are not used in this integration but
-        # required due to the way integrators scheme has been defined.
+        # normalise the time-series, blocks of time points are then read and integrated
+        block_steps = max(1, int(self.block_nbytes // (8 * (1 + balloon_nvar) * n_node * n_mode)))
+        blocks = [(lo, min(lo + block_steps, n_time)) for lo in range(0, n_time, block_steps)]
+        mean = sum(self.neural_input(lo, hi).sum(axis=0) for lo, hi in blocks) / n_time
+
+        y_b = numpy.empty(result_shape)
+        y_b[0, 0] = self.bold_signal(state[2], state[3], k)
+        integrate = self._integrate_block
+        if self.numba_integration:
+            integrate = self._numba_integrate_block()
+        for lo, hi in blocks:
+            lo = max(lo, 1)
+            if lo == hi:
+                continue
+            neural_activity = self.neural_input(lo, hi)
+            # Do some checks:
+            if numpy.isnan(neural_activity).any():
+                LOG.warning("NaNs detected in the neural activity!!")
+            v_q = integrate(state, neural_activity - mean)
+            y_b[lo:hi, 0] = self.bold_signal(v_q[:, 0], v_q[:, 1], k)
+            if numpy.isnan(v_q).any():
+                LOG.warning("NaNs detected...")
+        LOG.debug("Max value: %s" % str(y_b.max()))
 
-        local_coupling = 0.0
-        stimulus = 0.0
+        sample_period = 1. / self.dt
 
-        # Do some checks:
-        if numpy.isnan(neural_activity).any():
-            LOG.warning("NaNs detected in the neural activity!!")
+        bold_signal = time_series.TimeSeriesRegion(
+            data=y_b,
+            time=t_int,
+            sample_period=sample_period,
+            sample_period_unit='s',
+            use_storage=False)
 
-        # normalise the time-series.
-        neural_activity = neural_activity - neural_activity.mean(axis=0)[numpy.newaxis, :]
+        return bold_signal
 
-        # solve equations
-        for step in range(1, t_int.shape[0]):
-            state[step, :] = scheme(state[step - 1, :], self.balloon_dfun,
-                                    neural_activity[step, :], local_coupling, stimulus)
-            if numpy.isnan(state[step, :]).any():
-                LOG.warning("NaNs detected...")
 
-        # NOTE: just for the sake of clarity, define the variables used in the BOLD model
-        s = state[:, 0, :]
-        f = state[:, 1, :]
-        v = state[:, 2, :]
-        q = state[:, 3, :]
+    def neural_input(self, start, stop, time_series=None, mode=None):
+        """
+        Neural input (time, node, mode) for time points start to stop of the
+        transformation mode of time_series, by default those of the analyzer.
+        """
+        time_series = self.time_series if time_series is None else time_series
+        mode = self.neural_input_transformation if mode is None else mode
+        data = time_series.data
+        if mode == "abs_diff":
+            return abs(numpy.diff(numpy.asarray(data[start:stop + 1, 0]), axis=0))
+        elif mode == "sum":
+            return numpy.asarray(data[start:stop]).sum(axis=1)
+        return numpy.asarray(data[start:stop, 0], dtype=numpy.float64)
 
-        #import pdb; pdb.set_trace()
 
-        # BOLD models
+    def bold_signal(self, v, q, k):
+        """
+        BOLD signal from the venous volume v and deoxyhemoglobin content q, given
+        the coefficients k of `compute_derived_parameters`.
+        """
+        k1, k2, k3 = k[0], k[1], k[2]
         if self.bold_model == "nonlinear":
             """
             Non-linear BOLD model equations.
             Page 391. Eq. (13) top in [Stephan2007]_
             """
-            y_bold = numpy.array(self.V0 * (k1 * (1. - q) + k2 * (1. - q / v) + k3 * (1. - v)))
-            y_b = y_bold[:, numpy.newaxis, :, :]
-            LOG.debug("Max value: %s" % str(y_b.max()))
-
+            return self.V0 * (k1 * (1. - q) + k2 * (1. - q / v) + k3 * (1. - v))
         else:
             """
             Linear BOLD model equations.
             Page 391. Eq. (13) bottom in [Stephan2007]_ 
             """
-            y_bold = numpy.array(self.V0 * ((k1 + k2) * (1. - q) + (k3 - k2) * (1. - v)))
-            y_b = y_bold[:, numpy.newaxis, :, :]
-
-        sample_period = 1. / self.dt
+            return self.V0 * ((k1 + k2) * (1. - q) + (k3 - k2) * (1. - v))
 
-        bold_signal = time_series.TimeSeriesRegion(
-            data=y_b,
-            time=t_int,
-            sample_period=sample_period,
-            sample_period_unit='s',
-            use_storage=False)
 
-        return bold_signal
+    def _integrate_block(self, state, neural_activity):
+        """
+        Advance state through the neural activity (time, node, mode), in place,
+        returning v and q after each step, (time, 2, node, mode).
+        """
+        # NOTE: the following variables are not used in this integration but
+        # required due to the way integrators scheme has been defined.
+        local_coupling = 0.0
+        stimulus = 0.0
+        scheme = self.integrator.scheme
+        v_q = numpy.empty((neural_activity.shape[0], 2) + state.shape[1:])
+        current = state
+        for step in range(neural_activity.shape[0]):
+            current = scheme(current, self.balloon_dfun, neural_activity[step, numpy.newaxis],
+                             local_coupling, stimulus)
+            v_q[step] = current[2:]
+        state[:] = current
+        return v_q
+
+
+    def _numba_integrate_block(self):
+        "Compiled counterpart of `_integrate_block`, or the latter if the integrator is not supported."
+        heun = type(self.integrator) is integrators_module.HeunDeterministic
+        euler = type(self.integrator) is integrators_module.EulerDeterministic
+        if not (heun or euler) or self.integrator.clamped_state_variable_values is not None:
+            LOG.warning("Numba integration is not available for %s, integrating with NumPy."
+                        % self.integrator.__class__.__name__)
+            return self._integrate_block
+        from ._numba import balloon_integrate
+        constants = (self.integrator.dt, heun, 1. / self.tau_s, 1. / self.tau_f, 1. / self.tau_o,
+                     1. / self.alpha, self.E0)
+
+        def integrate(state, neural_activity):
+            n_step = neural_activity.shape[0]
+            flat_state = state.reshape((state.shape[0], -1))
+            v_q = numpy.empty((n_step, 2, flat_state.shape[1]))
+            balloon_integrate(flat_state, neural_activity.reshape((n_step, -1)), v_q, *constants)
+            state[:] = flat_state.reshape(state.shape)
+            return v_q.reshape((n_step, 2) + state.shape[1:])
+        return integrate
 
 
     def compute_derived_parameters(self):
@@ -342,32 +415,28 @@ class BalloonModel(core.Type):
         return numpy.array([k1, k2, k3])
 
 
-    def input_transformation(self, time_series, mode):
+    def input_time(self, time_series, mode):
         """
-        Perform an operation on the input time-series.
+        Time (s) of the input time-series, once transformed by mode.
         """
-
         LOG.debug("Computing: %s on the input time series" % str(mode))
-
-        if mode == "none":
-            ts = time_series.data[:, 0, :, :]
-            ts = ts[:, numpy.newaxis, :, :]
-            t_int = time_series.time / 1000.  # (s)
-
-        elif mode == "abs_diff":
-            ts = abs(numpy.diff(time_series.data, axis=0))
-            t_int = (time_series.time[1:] - time_series.time[0:-1]) / 1000.  # (s)
-
-        elif mode == "sum":
-            ts = numpy.sum(time_series.data, axis=1)
-            ts = ts[:, numpy.newaxis, :, :]
-            t_int = time_series.time / 1000.  # (s)
-
-        else:
+        if mode not in ("none", "abs_diff", "sum"):
             LOG.error("Bad operation/transformation mode, must be one of:")
             LOG.error("('abs_diff', 'sum', 'none')")
             raise Exception("Bad transformation mode") 
 
+        t_int = time_series.time / 1000.  # (s)
+        if mode == "abs_diff":
+            t_int = t_int[1:] - t_int[0:-1]
+        return t_int
+
+
+    def input_transformation(self, time_series, mode):
+        """
+        Perform an operation on the input time-series.
+        """
+        t_int = self.input_time(time_series, mode)
+        ts = self.neural_input(0, t_int.shape[0], time_series, mode)[:, numpy.newaxis]
         return ts, t_int
 
 
@@ -35,8 +35,11 @@ Useful graph analyses.
 
 """
 
+import multiprocessing
 import numpy
 import networkx
+import scipy.sparse
+from scipy.sparse import csgraph
 
 
 def betweenness_bin(A):
@@ -62,9 +65,19 @@ def betweenness_bin(A):
     **Reference:**    [1] Kintali (2008) arXiv:0809.1906v2 [cs.DS] (generalization to directed and disconnected graphs)
     
     **Author:**        Paula Sanz Leon
+
+    .. note:: For sparse matrices, and large dense matrices with few
+              connections, shortest paths are counted by breadth first
+              search from blocks of sources, see `betweenness_sparse`.
     
     """
-    
+
+    # Binarize without modifying the original matrix (in case A is weighted)
+    A = A > 0
+    if _use_sparse(A):
+        return betweenness_sparse(A)
+    A = A.astype(numpy.float64)
+
     n   = len(A)
     I   = numpy.eye(n)        # logical ID matrix                                        
     d   = 1                   # path length
@@ -153,22 +166,27 @@ def efficiency_bin(A, compute_local_efficiency=False):
     """
     
     # Binarize without modifying the original matrix (in case A is weighted)
-    G = A.copy()
-    G[G > 0] = 1.0 
+    G = A > 0
+    sparse = _use_sparse(G)
+    G = scipy.sparse.csr_matrix(G, dtype=numpy.float64) if sparse else G.astype(numpy.float64)
 
     number_of_nodes = G.shape[0]     
     if compute_local_efficiency:
         E = numpy.zeros((number_of_nodes,1))  
-        k = G.sum(axis=1)   # degree
+        k = numpy.asarray(G.sum(axis=1)).ravel()   # degree
         for u in range(number_of_nodes):
-            indices = (G[u, :] > 0)
             if k[u] >= 2:   # degree must be at least two
-                e = distance_inv(G[numpy.ix_(indices,indices)])
+                if sparse:
+                    indices = G.indices[G.indptr[u]:G.indptr[u + 1]]
+                    e = distance_inv(G[indices][:, indices].toarray())
+                else:
+                    indices = (G[u, :] > 0)
+                    e = distance_inv(G[numpy.ix_(indices,indices)])
                 E[u,:] = e.sum() / (k[u] ** 2 - k[u])     # local efficiency
         return E
     else:
-        e = distance_inv(G)
-        E = e.sum() / (number_of_nodes ** 2 - number_of_nodes)
+        e = inverse_distance_sum_sparse(G) if sparse else distance_inv(G).sum()
+        E = e / (number_of_nodes ** 2 - number_of_nodes)
         
         return E
 
@@ -186,6 +204,7 @@ def distance_inv(G):
     n = 1
     nPATH = G.copy()                     # n-path matrix
     L[nPATH != 0] = 1.                   # shortest n-path matrix
+    numpy.fill_diagonal(L, 0.0)          # self connections are not paths
 
     while L.sum() != 0:
         D += n * L
@@ -200,6 +219,126 @@ def distance_inv(G):
 
 
 
+# dense algebraic path counting is used below this number of nodes, or above this density
+_sparse_min_nodes = 256
+_sparse_max_density = 0.1
+
+
+def _use_sparse(A):
+    "Whether shortest paths in A are better searched on a sparse matrix than counted algebraically."
+    if scipy.sparse.issparse(A):
+        return True
+    n = A.shape[0]
+    return n >= _sparse_min_nodes and numpy.count_nonzero(A) < _sparse_max_density * n ** 2
+
+
+def _source_blocks(n, block_nbytes, pair_nbytes):
+    "Blocks of sources for which pair_nbytes per (source, node) pair fit in block_nbytes."
+    block = max(1, block_nbytes // (pair_nbytes * n))
+    for start in range(0, n, block):
+        yield numpy.r_[start:min(start + block, n)]
+
+
+def _bfs_levels(A, sources):
+    """
+    Breadth first search from each of the sources at once on the binary CSR
+    matrix A, where the frontier of each path length is a sparse (n_source, n)
+    matrix, expanded by a product with A.
+
+    :returns: generator of, for each path length, the flat (source, node)
+              indices of the nodes reached, in source order, and the number of
+              shortest paths to each of them.
+
+    """
+    n_source, n = len(sources), A.shape[0]
+    visited = numpy.zeros(n_source * n, dtype=bool)
+    rows, cols = numpy.r_[:n_source], numpy.asarray(sources)
+    paths = numpy.ones(n_source)
+    while rows.size:
+        flat = rows.astype(numpy.intp) * n + cols
+        visited[flat] = True
+        yield flat, paths
+        indptr = numpy.searchsorted(rows, numpy.r_[:n_source + 1])
+        reached = scipy.sparse.csr_matrix((paths, cols, indptr), shape=(n_source, n)).dot(A).tocoo()
+        new = ~visited[reached.row.astype(numpy.intp) * n + reached.col]
+        rows, cols, paths = reached.row[new], reached.col[new], reached.data[new]
+
+
+def _binary_csr(A):
+    "Copy of A as a binary CSR matrix of float type."
+    A = scipy.sparse.csr_matrix(A, dtype=numpy.float64, copy=True)
+    A.eliminate_zeros()
+    A.data[:] = 1.0
+    return A
+
+
+def betweenness_sparse(A, block_nbytes=2 ** 26):
+    """
+    Node betweenness centrality of a binary (directed/undirected) connection
+    matrix, by the algorithm of Brandes: for each source, shortest paths are
+    counted forward level by level of a breadth first search, and dependencies
+    accumulated backward. Sources are processed in blocks, with each level
+    propagated for the whole block as a product of a sparse frontier with the
+    CSR matrix, so that time is O(n m) for m connections and memory is bounded
+    by block_nbytes, instead of the O(n^3) time and n^2 memory of
+    `betweenness_bin`, which it otherwise equals.
+
+    :param A: binary connection matrix, dense or scipy.sparse
+    :param block_nbytes: memory for the arrays of a block of sources
+
+    :returns: BC: node betweenness centrality vector.
+
+    **Reference:**    [1] Brandes (2001) J Math Sociol 25:163-177.
+
+    """
+
+    A = _binary_csr(A)
+    A_T = A.T.tocsr()
+    n = A.shape[0]
+    betweenness = numpy.zeros(n)
+    # paths, dependencies, their spread and the level indices, per (source, node) pair
+    for sources in _source_blocks(n, block_nbytes, 33):
+        n_source = len(sources)
+        sigma, delta, spread = numpy.zeros((3, n_source * n))
+        levels = []
+        for flat, paths in _bfs_levels(A, sources):
+            sigma[flat] = paths
+            levels.append(flat)
+        # the sources' own dependencies, at the first level, are not accumulated
+        for prev, level in reversed(list(zip(levels[1:-1], levels[2:]))):
+            rows, cols = numpy.divmod(level, n)
+            indptr = numpy.searchsorted(rows, numpy.r_[:n_source + 1])
+            values = (1.0 + delta[level]) / sigma[level]
+            back = scipy.sparse.csr_matrix((values, cols, indptr), shape=(n_source, n)).dot(A_T).tocoo()
+            back_flat = back.row.astype(numpy.intp) * n + back.col
+            spread[back_flat] = back.data
+            delta[prev] = sigma[prev] * spread[prev]
+            spread[back_flat] = 0.0
+        betweenness += delta.reshape((n_source, n)).sum(axis=0)
+    return betweenness
+
+
+def inverse_distance_sum_sparse(A, block_nbytes=2 ** 26):
+    """
+    Sum of the inverse shortest path lengths between distinct nodes of a binary
+    connection matrix, i.e. of `distance_inv`, by breadth first search from
+    blocks of sources on a CSR matrix, without forming the n^2 distance matrix.
+
+    :param A: binary connection matrix, dense or scipy.sparse
+    :param block_nbytes: memory for the visited nodes and level indices of a block of sources
+
+    """
+
+    A = _binary_csr(A)
+    total = 0.0
+    for sources in _source_blocks(A.shape[0], block_nbytes, 9):
+        for length, (flat, _) in enumerate(_bfs_levels(A, sources)):
+            if length:
+                total += flat.size / float(length)
+    return total
+
+
+
 def get_components_sizes(A):
     """
     Get connected components sizes.
@@ -233,6 +372,10 @@ def get_components_sizes(A):
     else:
         pass
 
+    if _use_sparse(A):
+        _, labels = csgraph.connected_components(scipy.sparse.csr_matrix(A > 0), connection='weak')
+        return numpy.bincount(labels).max()
+
     # Binarize without modifying the original matrix (in case A is weighted)
     temp_A = A.copy()
     temp_A[temp_A > 0] = 1.0    
@@ -243,12 +386,147 @@ def get_components_sizes(A):
     
     # build a networkX graph to get largest connected component.
     components = networkx.connected_components(networkx.from_numpy_matrix(numpy.matrix(temp_A)))
-    # For the time being returns the size of the largest component
-    component_sizes = [len(x) for x in components][0]
+    # components are not sorted by size
+    component_sizes = max(len(x) for x in components)
     return component_sizes
 
 
 
+def _bfs(adjacency, sources):
+    """
+    Breadth first search from several sources at once, on a binary (n, n)
+    adjacency matrix of float type, dense or sparse, where adjacency[i, j] is
+    an edge from i to j.
+
+    :returns:
+        - path lengths (n_source, n), inf for unreachable nodes
+        - number of parents of each node, i.e. of its neighbours one step
+          closer to the source, (n_source, n)
+
+    """
+    rows = numpy.r_[:len(sources)]
+    distance = numpy.empty((len(sources), adjacency.shape[0]))
+    distance.fill(numpy.inf)
+    distance[rows, sources] = 0.0
+    parents = numpy.zeros(distance.shape, numpy.int32)
+    frontier = numpy.zeros(distance.shape)
+    frontier[rows, sources] = 1.0
+    level = 0
+    while frontier.any():
+        level += 1
+        counts = adjacency.T.dot(frontier.T).T
+        reached = (counts > 0) & numpy.isinf(distance)
+        distance[reached] = level
+        parents[reached] = counts[reached]
+        frontier = reached.astype(frontier.dtype)
+    return distance, parents
+
+
+def _inverse_sum(distance):
+    "Sum of inverse path lengths over each row, excluding zero lengths of the sources."
+    inverse = numpy.zeros(distance.shape)
+    numpy.reciprocal(distance, out=inverse, where=distance > 0)
+    return inverse.sum(axis=1)
+
+
+
+class LesionGraph(object):
+    """
+    A connectivity matrix from which nodes are deleted one at a time, keeping
+    node degree, all-pairs shortest path lengths of the binary directed graph,
+    and the weakly connected components up to date.
+
+    Instead of recomputing distances after each deletion, the number of
+    parents of each node on the shortest paths from each source is kept: a
+    source's path lengths can only change when a node loses its last parent,
+    so that only those sources are searched again. Likewise, only the
+    component of the deleted node is split again.
+
+    >>> graph = LesionGraph(weights)
+    >>> graph.remove(3)
+    >>> graph.efficiency, graph.largest_component
+
+    Deleted nodes are kept as isolated nodes, so that the global efficiency
+    is normalized by the number of nodes of the original matrix, as by
+    `efficiency_bin`, and results match those computed on the matrix with the
+    rows and columns of deleted nodes set to zero.
+
+    """
+
+    def __init__(self, weights):
+        self.weights = numpy.array(weights, dtype=numpy.float64)
+        self.adjacency = (self.weights > 0.0).astype(numpy.float64)
+        self.n_node = n = self.weights.shape[0]
+        self.alive = numpy.ones(n, dtype=bool)
+        self.degree = self.adjacency.sum(axis=0) + self.adjacency.sum(axis=1)
+        self.sparse = scipy.sparse.csr_matrix(self.adjacency)
+        self.distance, self.parents = _bfs(self.sparse, numpy.r_[:n])
+        self.inverse_sum = _inverse_sum(self.distance)
+        self.n_label, self.labels = csgraph.connected_components(self.sparse, connection='weak')
+
+    @property
+    def strength(self):
+        "Sum of in and out strength, summed again so that equal strengths remain tied."
+        return self.weights.sum(axis=1) + self.weights.sum(axis=0)
+
+    @property
+    def efficiency(self):
+        "Global efficiency of the binary graph, as by `efficiency_bin`."
+        return self.inverse_sum.sum() / (self.n_node ** 2 - self.n_node)
+
+    @property
+    def largest_component(self):
+        "Size of the largest weakly connected component, as by `get_components_sizes`."
+        return numpy.bincount(self.labels).max()
+
+    def remove(self, node):
+        "Delete all edges to and from node."
+        if not self.alive[node]:
+            return
+        self.alive[node] = False
+        adjacency = self.adjacency
+        children = adjacency[node] > 0.0
+        neighbours = children | (adjacency[:, node] > 0.0)
+        neighbours[node] = False
+
+        self.degree -= adjacency[node] + adjacency[:, node]
+        self.degree[node] = 0.0
+        for matrix in (self.weights, adjacency):
+            matrix[node] = 0.0
+            matrix[:, node] = 0.0
+        sparse = self.sparse
+        sparse.data[sparse.indptr[node]:sparse.indptr[node + 1]] = 0.0
+        sparse.data[sparse.indices == node] = 0.0
+        sparse.eliminate_zeros()
+
+        # sources reaching the node lose it, and its children lose a parent
+        through, = numpy.nonzero(numpy.isfinite(self.distance[:, node]))
+        through = through[through != node]
+        distance = self.distance[through]
+        lost = children & (distance == distance[:, node, numpy.newaxis] + 1)
+        self.parents[through] -= lost
+        self.inverse_sum[through] -= 1.0 / distance[:, node]
+        stale = through[((self.parents[through] == 0) & lost).any(axis=1)]
+        self.distance[node] = self.distance[:, node] = numpy.inf
+        self.parents[node] = self.parents[:, node] = 0
+        self.inverse_sum[node] = 0.0
+        if stale.size:
+            self.distance[stale], self.parents[stale] = _bfs(sparse, stale)
+            self.inverse_sum[stale] = _inverse_sum(self.distance[stale])
+
+        # only the node's component can split, and only if it joined several neighbours
+        label = self.labels[node]
+        self.labels[node] = self.n_label
+        self.n_label += 1
+        if neighbours.sum() > 1:
+            members, = numpy.nonzero(self.labels == label)
+            n_split, split = csgraph.connected_components(sparse[members][:, members], connection='weak')
+            if n_split > 1:
+                self.labels[members] = numpy.where(split == 0, label, self.n_label + split - 1)
+                self.n_label += n_split - 1
+
+
+
 def sequential_random_deletion(white_matter, random_sequence, nor):
     """
     
@@ -277,39 +555,24 @@ def sequential_random_deletion(white_matter, random_sequence, nor):
     
     """
 
+    return _random_deletion(white_matter.weights, random_sequence, nor)
+
+
+
+def _random_deletion(weights, random_sequence, nor):
     node_strength = numpy.zeros((nor, nor - 2))
     node_degree   = numpy.zeros((nor, nor - 2))
     global_efficieny = numpy.zeros(nor - 2)
     largest_component = numpy.zeros(nor - 2)
-    temp_strength = white_matter.weights.copy()
-    temp_degree   = white_matter.weights.copy()
-    temp_degree[temp_degree > 0.0] = 1.0
+    graph = LesionGraph(weights)
 
     for i, idx in enumerate(random_sequence):
-            # delete rows
-            temp_strength[idx, :] = 0.0
-            temp_degree[idx, :]   = 0.0
-        
-            # delete columns
-            temp_strength[:, idx] = 0.0
-            temp_degree[:, idx]   = 0.0
-        
-            # strength
-            in_strength     =  temp_strength.sum(axis=1)  
-            out_strength    =  temp_strength.sum(axis=0)
-            node_strength[:, i] = in_strength + out_strength
-        
-            # degree
-            in_degree       = temp_degree.sum(axis=1)
-            out_degree      = temp_degree.sum(axis=0)
-            node_degree[:, i] = in_degree + out_degree
-        
-            # efficiency
-            global_efficieny[i] = efficiency_bin(temp_degree)
-        
-            # largest connected component
-            largest_component[i] = get_components_sizes(temp_degree)
-            
+            graph.remove(idx)
+            node_strength[:, i] = graph.strength
+            node_degree[:, i]   = graph.degree
+            global_efficieny[i] = graph.efficiency
+            largest_component[i] = graph.largest_component
+
     return node_strength, node_degree, global_efficieny, largest_component
 
 
@@ -351,51 +614,72 @@ def sequential_targeted_deletion(white_matter, nor):
     node_betweenness_centrality = numpy.zeros((nor, nor - 2))
     global_efficiency = numpy.zeros((nor - 2, 3))
     largest_component = numpy.zeros((nor - 2, 3))
-    temp_strength = white_matter.weights.copy()
-    temp_degree   = white_matter.weights.copy()
-    temp_bc       = white_matter.weights.copy()
-    temp_degree[temp_degree > 0.0] = 1.0
+    # one graph lesioned by each of strength, degree and betweenness centrality
+    graphs = [LesionGraph(white_matter.weights) for _ in range(3)]
+    by_strength, by_degree, by_bc = graphs
 
     for idx in range(nor - 2):
 
-            # strength
-            in_strength     = temp_strength.sum(axis=1)
-            out_strength    = temp_strength.sum(axis=0)
-            node_strength[:, idx] = in_strength + out_strength
-        
-            # degree
-            in_degree       = temp_degree.sum(axis=1)
-            out_degree      = temp_degree.sum(axis=0)
-            node_degree[:, idx] = in_degree + out_degree
-            
-            # betweeness centrality
-            
-            node_betweenness_centrality[:, idx] = betweenness_bin(temp_bc)
-            
-            # define target index
-            sorted_strength_indices    = numpy.argsort(node_strength[:, idx])
-            sorted_degree_indices      = numpy.argsort(node_degree[:, idx])
-            sorted_bc_indices          = numpy.argsort(node_betweenness_centrality[:, idx])
-            
-            # lesion
-            temp_strength[sorted_strength_indices[-1], :] = 0.0
-            temp_strength[:, sorted_strength_indices[-1]] = 0.0
+            node_strength[:, idx] = by_strength.strength
+            node_degree[:, idx] = by_degree.degree
+            node_betweenness_centrality[:, idx] = betweenness_bin(by_bc.weights)
+
+            # lesion the target of each graph
+            by_strength.remove(numpy.argsort(node_strength[:, idx])[-1])
+            by_degree.remove(numpy.argsort(node_degree[:, idx])[-1])
+            by_bc.remove(numpy.argsort(node_betweenness_centrality[:, idx])[-1])
+
+            # global efficiency and largest connected component (BU)
+            global_efficiency[idx] = [graph.efficiency for graph in graphs]
+            largest_component[idx] = [graph.largest_component for graph in graphs]
 
-            temp_degree[sorted_degree_indices[-1], :] = 0.0
-            temp_degree[:, sorted_degree_indices[-1]] = 0.0
-            
-            temp_bc[sorted_bc_indices[-1], :] = 0.0
-            temp_bc[:, sorted_bc_indices[-1]] = 0.0
-            
-            # global efficiency (BU)
-            global_efficiency[idx, 0] = efficiency_bin(temp_strength)  # compute the global eff of the binary matrix ver
-            global_efficiency[idx, 1] = efficiency_bin(temp_degree)
-            global_efficiency[idx, 2] = efficiency_bin(temp_bc)
-        
-            # largest connected component (BU)
-            largest_component[idx, 0] = get_components_sizes(temp_strength)
-            largest_component[idx, 1] = get_components_sizes(temp_degree)
-            largest_component[idx, 2] = get_components_sizes(temp_bc)
-            
     return node_strength, node_degree, node_betweenness_centrality, global_efficiency, largest_component
 
+
+
+# per worker process weights, set by the pool initializer
+_worker_weights = None
+
+
+def _init_worker(weights):
+    global _worker_weights
+    _worker_weights = weights
+
+
+def _random_deletion_one(args):
+    random_sequence, nor = args
+    return _random_deletion(_worker_weights, random_sequence, nor)
+
+
+def random_deletion_ensemble(white_matter, random_sequences, nor, n_proc=None):
+    """
+    Runs `sequential_random_deletion` for each of several random sequences, in
+    a pool of worker processes.
+
+    :param white_matter: a connectivity with a 'weights' attribute; only the
+                  weights are sent, once, to each worker.
+    :param random_sequences: int array (number_of_sequences, nor - 2)
+    :param nor: number of nodes of the original connectivity matrix.
+    :param n_proc: number of worker processes, by default the number of CPUs;
+                  with a single process, sequences are run in this process.
+
+    :returns: the results of `sequential_random_deletion`, each stacked along
+              a first axis of sequences.
+
+    """
+
+    n_proc = n_proc or multiprocessing.cpu_count()
+    tasks = [(random_sequence, nor) for random_sequence in random_sequences]
+    if n_proc == 1:
+        results = [_random_deletion(white_matter.weights, *task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(n_proc, _init_worker, (white_matter.weights, ))
+        try:
+            results = pool.map(_random_deletion_one, tasks)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+    return tuple(numpy.array(result) for result in zip(*results))
@@ -43,6 +43,7 @@ import tvb.datatypes.mode_decompositions as mode_decompositions
 import tvb.basic.traits.core as core
 import tvb.basic.traits.types_basic as basic
 import tvb.basic.traits.util as util
+from tvb.analyzers.pca import principal_components, project_components
 from tvb.basic.logger.builder import get_logger
 
 
@@ -59,7 +60,10 @@ class fastICA(core.Type):
     ICA takes time-points as observations and nodes as variables.
     
     It uses the FastICA algorithm implemented in the scikit-learn toolkit, and
-    its intended usage is as a `blind source separation` method.
+    its intended usage is as a `blind source separation` method. The data is
+    first whitened by the leading principal components of all state variables
+    and modes at once, see `tvb.analyzers.pca.principal_components`, so that
+    only n_components x nodes matrices are formed.
     
     See also: http://scikit-learn.org/stable/modules/generated/sklearn.decomposition.fastica.html#sklearn.decomposition.fastica
 
@@ -75,6 +79,13 @@ class fastICA(core.Type):
         required=False,
         default=None,
         doc="Number of principal components to unmix.")
+
+    block_nbytes = basic.Integer(
+        label="Bytes per block",
+        default=2 ** 26,
+        required=False,
+        doc="""Approximate memory used for a chunk of time of the time-series,
+        which is read at once.""")
     
     def evaluate(self):
         "Run FastICA on the given time series data."
@@ -91,15 +102,21 @@ class fastICA(core.Type):
             msg %= n_time, n_comp
             raise ValueError(msg)
 
+        # whitening by the principal components, as done by fastica, for all state variables and modes
+        weights, singular_values, _, mean, _ = principal_components(data, n_comp, standardize=False,
+                                                                    block_nbytes=self.block_nbytes)
+        K = weights / singular_values[:, numpy.newaxis] # whitening matrix
+        whitened = project_components(data, K, mean, block_nbytes=self.block_nbytes)
+
         # ICA operates on matrices, here we perform for all state variables and modes
         W = numpy.zeros((n_comp, n_comp, n_svar, n_mode))  # unmixing
-        K = numpy.zeros((n_comp, n_node, n_svar, n_mode)) # whitening matrix
         src = numpy.zeros((n_time, n_comp, n_svar, n_mode)) # component time series
 
         for mode in range(n_mode):
             for var in range(n_svar):
                 sl = Ellipsis, var, mode
-                K[sl], W[sl], src[sl] = fastica(data[:, var, :, mode], self.n_components)
+                _, W[sl], _ = fastica(whitened[sl] * numpy.sqrt(n_time), whiten=False)
+                src[sl] = whitened[sl].dot(W[sl].T)
 
         return mode_decompositions.IndependentComponents(source=self.time_series, component_time_series=src,
             prewhitening_matrix=K, unmixing_matrix=W, n_components=n_comp, use_storage=False)
@@ -38,12 +38,32 @@ TODO: Convert sampen to a traited class
 
 """
 import numpy
+from numpy.lib.stride_tricks import as_strided
+from scipy.spatial import cKDTree
 
 
 
-def sampen(y, m=2, r=None, qse=False, taus=1, info=False,
-           tile=numpy.tile, na=numpy.newaxis, abs=numpy.abs,
-           log=numpy.log, r_=numpy.r_):
+def _match_counts(y, m, r):
+    """
+    Counts, for each column of y (time, node), the pairs of templates of length m and
+    m + 1 whose Chebyshev distance is less than r (node, ), with a KD-tree of the
+    templates, which only compares templates in nearby cells instead of all pairs.
+
+    """
+    c1, c2 = numpy.zeros(y.shape[1], int), numpy.zeros(y.shape[1], int)
+    for node in range(y.shape[1]):
+        signal = numpy.ascontiguousarray(y[:, node])
+        # the tree counts distances up to and including its radius
+        radius = numpy.nextafter(r[node], 0)
+        for n, counts in ((m, c1), (m + 1, c2)):
+            templates = as_strided(signal, (signal.size - n + 1, n), signal.strides * 2)
+            tree = cKDTree(templates)
+            # ordered pairs, including each template with itself
+            counts[node] = (tree.count_neighbors(tree, radius, p=numpy.inf) - templates.shape[0]) // 2
+    return c1, c2
+
+
+def sampen(y, m=2, r=None, qse=False, taus=1, info=False, log=numpy.log):
     """
     Computes (quadratic) sample entropy of a given input signal y, with
     embedding dimension n, and a match tolerance of r (ref 2). If an array
@@ -58,6 +78,11 @@ def sampen(y, m=2, r=None, qse=False, taus=1, info=False,
     of r, giving the quadratic sample entropy, such that results from different
     values of r can be meaningfully compared (ref 2).
 
+    If y has more than one dimension, its first is time, and entropies are
+    computed for every signal, e.g. every node of a time series' data, at once,
+    with r the tolerance of each signal if an array, and are returned with the
+    shape of y less time, after the scales if any.
+
     ref 1: Costa, M., Goldberger, A. L., and Peng C.-K. (2002) Multiscale Entropy
             Analysis of Complex Physiologic Time Series. Phys Rev Lett 89 (6).
 
@@ -71,43 +96,33 @@ def sampen(y, m=2, r=None, qse=False, taus=1, info=False,
 
     """
 
+    # default value of r
+    if r is None:
+        r = 0.15 * y.std(axis=0)
+
     # if multiple scales given, run on each
     if type(taus) in (list, numpy.ndarray):
         return numpy.array([sampen(y, m=m, r=r, qse=qse, taus=int(tau)) for tau in taus])
 
-    # helper function to reformat arrays for matching
-    subseq = lambda y, n: y[tile(r_[0:n], (y.size - n + 1, 1)) + r_[0:y.size - n + 1][:, na]]
-
-    # default value of r
-    if r is None:
-        r = 0.15 * y.std()
-
     # if we have a scale factor, coarsen time series 
     if taus > 1:
-        y = y[:y.shape[0] / taus * taus].reshape((-1, taus)).mean(axis=1)
+        y = y[:y.shape[0] // taus * taus].reshape((-1, taus) + y.shape[1:]).mean(axis=1)
 
-    # compute embedding of signal dims m, m+1, initialize match counts to 0
-    Y1 = subseq(y, m)
-    Y2 = subseq(y, m + 1)
-    c1 = 0
-    c2 = 0
-
-    # check for matches
-    for i in range(Y1.shape[0] - 1):
-        c1 += (abs(tile(Y1[i], (Y1.shape[0] - i - 1, 1)) - Y1[i + 1:]) < r).all(axis=1).sum()
-
-    for i in range(Y2.shape[0] - 1):
-        c2 += (abs(tile(Y2[i], (Y2.shape[0] - i - 1, 1)) - Y2[i + 1:]) < r).all(axis=1).sum()
+    # count matches of embeddings of dims m, m+1 of each signal
+    shape = y.shape[1:]
+    y = y.reshape((y.shape[0], -1))
+    r = numpy.broadcast_to(r, shape).ravel() * numpy.ones(y.shape[1])
+    c1, c2 = _match_counts(y, m, r)
 
     # ref 2, last paragraph of methods, warn inaccurate estimate
-    if c2 < 5:
-        print("m+1 template match count is low, %d < 5" % c2)
+    if c2.min() < 5:
+        print("m+1 template match count is low, %d < 5" % c2.min())
 
     p = c2 * 1.0 / c1
     e = -log(p / (2 * r) if qse else p)
+    e, p, c2, c1 = [numpy.reshape(x, shape)[()] for x in (e, p, c2, c1)]
 
     if info:
         return e, p, c2, c1
     else:
         return e
-
@@ -95,33 +95,71 @@ def coherence_mlab(data, sample_rate, nfft=256):
     return coh, freq
 
 
-def coherence(data, sample_rate, nfft=256, imag=False):
-    "Vectorized coherence calculation by windowed FFT"
+def _windowed_spectra(data, nfft):
+    "Hamming windowed FFTs of data (time, ...) in non-overlapping windows of nfft samples, as (..., window, freq)."
     nt, ns, nn, nm = data.shape
-    nwin = nt / nfft
+    nwin = nt // nfft
     if nwin < 1:
         raise ValueError(
             "Not enough time points ({0}) to compute an FFT, given a "
             "window size of nfft={1}.".format(nt, nfft))
     # ignore leftover data; need shape (nn, ... , nwin, nfft)
-    wins = data[:nwin * nfft]\
-        .copy()\
+    wins = numpy.asarray(data[:nwin * nfft])\
         .transpose((2, 1, 3, 0))\
         .reshape((nn, ns, nm, nwin, nfft))
-    wins *= hamming(nfft)
-    F = numpy.fft.fft(wins)
+    return numpy.fft.fft(wins * hamming(nfft))
+
+
+def coherence(data, sample_rate, nfft=256, imag=False):
+    """
+    Vectorized coherence calculation by windowed FFT, i.e. the squared magnitude (or
+    imaginary part, if imag) of the window averaged cross-spectrum, normalised by the
+    window averaged power spectra.
+
+    """
+    F = _windowed_spectra(data, nfft)
+    nn = F.shape[0]
     fs = numpy.fft.fftfreq(nfft, 1e3 / sample_rate)
     # broadcasts to [node_i, node_j, ..., window, time]
-    G = F[:, numpy.newaxis] * F.conj()
-    if imag:
-        G = G.imag
-    dG = numpy.array([G[i, i] for i in range(nn)])
-    C = (numpy.abs(G)**2 / (dG[:, numpy.newaxis] * dG)).mean(axis=-2)
+    G = (F[:, numpy.newaxis] * F.conj()).mean(axis=-2)
+    dG = numpy.array([G[i, i].real for i in range(nn)])
+    C = (G.imag if imag else numpy.abs(G)) ** 2 / (dG[:, numpy.newaxis] * dG)
     mask = fs > 0.0
-    # C_ = numpy.abs(C.mean(axis=0).mean(axis=0))
     return numpy.transpose(C[..., mask], (4, 0, 1, 2, 3)), fs[mask]
 
 
+def coherence_blocked(data, sample_rate, nfft=256, imag=False, block_nbytes=2 ** 26):
+    """
+    Coherence as computed by `coherence`, without its (node, node, ..., window, freq)
+    cross-spectra. For each state variable and mode, window averaged cross-spectra are
+    accumulated by matrix products over windows, for blocks of nodes of about block_nbytes,
+    and only blocks of the upper triangle are computed, their transposes being equal.
+
+    """
+    nt, ns, nn, nm = data.shape
+    fs = numpy.fft.fftfreq(nfft, 1e3 / sample_rate)
+    mask = fs > 0.0
+    nf = mask.sum()
+    C = numpy.zeros((nf, nn, nn, ns, nm))
+    nb = max(1, int(numpy.sqrt(block_nbytes / (16.0 * nf))))
+    for var in range(ns):
+        for mode in range(nm):
+            # (freq, node, window)
+            F = _windowed_spectra(data[:, var:var + 1, :, mode:mode + 1], nfft)[:, 0, 0][..., mask]
+            F = F.transpose((2, 0, 1)).copy()
+            nwin = F.shape[-1]
+            power = (F.real ** 2 + F.imag ** 2).mean(axis=-1)
+            for i in range(0, nn, nb):
+                Fi = F[:, i:i + nb]
+                for j in range(i, nn, nb):
+                    G = numpy.matmul(Fi, F[:, j:j + nb].conj().swapaxes(-1, -2)) / nwin
+                    Cij = (G.imag if imag else numpy.abs(G)) ** 2
+                    Cij /= power[:, i:i + nb, numpy.newaxis] * power[:, numpy.newaxis, j:j + nb]
+                    C[:, i:i + nb, j:j + nb, var, mode] = Cij
+                    C[:, j:j + nb, i:i + nb, var, mode] = Cij.swapaxes(-1, -2)
+    return C, fs[mask]
+
+
 class NodeCoherence(core.Type):
     "Adapter for cross-coherence algorithm(s)"
 
@@ -135,12 +173,26 @@ class NodeCoherence(core.Type):
         default=256,
         doc="""Should be a power of 2...""")
 
+    memory_budget = basic.Integer(
+        label="Memory budget (bytes)",
+        default=2 ** 30,
+        required=False,
+        doc="""Largest memory the cross-spectra of all node pairs and windows may take. Above it,
+        cross-spectra are accumulated for blocks of node pairs instead.""")
+
     def evaluate(self):
         "Evaluate coherence on time series."
         cls_attr_name = self.__class__.__name__+".time_series"
         self.time_series.trait["data"].log_debug(owner=cls_attr_name)
         srate = self.time_series.sample_rate
-        coh, freq = coherence(self.time_series.data, srate, nfft=self.nfft)
+        nt, ns, nn, nm = self.time_series.data.shape
+        # complex cross-spectra of all node pairs and windows, and their average
+        nbytes = 16 * nn ** 2 * ns * nm * (nt // self.nfft + 1) * self.nfft
+        if nbytes > self.memory_budget:
+            LOG.info("cross-spectra require %.1f MB, computing coherence by blocks", nbytes * 2 ** -20)
+            coh, freq = coherence_blocked(self.time_series.data, srate, nfft=self.nfft)
+        else:
+            coh, freq = coherence(self.time_series.data, srate, nfft=self.nfft)
         util.log_debug_array(LOG, coh, "coherence")
         util.log_debug_array(LOG, freq, "freq")
         spec = spectral.CoherenceSpectrum(
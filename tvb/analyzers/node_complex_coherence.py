@@ -49,11 +49,9 @@ LOG = get_logger(__name__)
 SUPPORTED_WINDOWING_FUNCTIONS = ("hamming", "bartlett", "blackman", "hanning")
 
 
-# NOTE: Work only with 2D TimeSeries -- otherwise a MemoryError will raise
-# My first attempts made use of itertools on the 4D TimeSeries but they were
-# fruitless.
-# Nested `for` loops seem a 'good' solution instead of creating enormous ndarrays
-# to compute the FFT and derived complex spectra at once
+# NOTE: 4D TimeSeries are averaged over state variables and modes first. Spectra
+# are computed for blocks of epochs and cross-spectra for chunks of frequencies,
+# so that peak memory is bounded by `block_nbytes` rather than the recording length.
 
 class NodeComplexCoherence(core.Type):
     """
@@ -169,6 +167,14 @@ class NodeComplexCoherence(core.Type):
         order=-1,
         doc="""This attribute appears to be related to an input projection matrix... Which is not yet implemented""")
 
+    block_nbytes = basic.Integer(
+        label="Bytes per block",
+        default=2 ** 26,
+        required=False,
+        order=-1,
+        doc="""Approximate memory used for the spectra of a block of epochs, and for the cross-spectra
+        of a chunk of frequencies, which are computed at once.""")
+
 
     def evaluate(self):
         """
@@ -181,8 +187,10 @@ class NodeComplexCoherence(core.Type):
         tpts = self.time_series.data.shape[0]
         time_series_length = tpts * self.time_series.sample_period
 
-        if len(self.time_series.data.shape) > 2:
-            time_series_data = numpy.squeeze((self.time_series.data.mean(axis=-1)).mean(axis=1))
+        time_series_data = numpy.asarray(self.time_series.data)
+        if time_series_data.ndim > 2:
+            time_series_data = time_series_data.mean(axis=-1).mean(axis=1)
+        nchan = time_series_data.shape[1]
 
         # Divide time-series into epochs, no overlapping
         if self.epoch_length > 0.0:
@@ -192,7 +200,7 @@ class NodeComplexCoherence(core.Type):
             tpts = epoch_tpts
         else:
             self.epoch_length = time_series_length
-            nepochs = int(numpy.ceil(time_series_length / self.epoch_length))
+            nepochs, epoch_tpts = 1, tpts
 
         # Segment time-series, overlapping if necessary
         nseg = int(numpy.floor(time_series_length / self.segment_length))
@@ -202,102 +210,56 @@ class NodeComplexCoherence(core.Type):
             nseg = int(numpy.floor((tpts - seg_tpts) / seg_shift_tpts) + 1)
         else:
             self.segment_length = time_series_length
-            seg_tpts = time_series_data.shape[0]
+            nseg, seg_tpts, seg_shift_tpts = 1, tpts, tpts
 
         # Frequency
         nfreq = int(numpy.min([self.max_freq, numpy.floor((seg_tpts + self.zeropad) / 2.0) + 1]))
 
-        result_shape, av_result_shape = self.result_shape(self.time_series.data.shape, self.max_freq, self.epoch_length,
-                                                          self.segment_length, self.segment_shift,
-                                                          self.time_series.sample_period, self.zeropad,
-                                                          self.average_segments)
-        cs = numpy.zeros(result_shape, dtype=numpy.complex128)
-        av = numpy.matrix(numpy.zeros(av_result_shape, dtype=numpy.complex128))
-        coh = numpy.zeros(result_shape, dtype=numpy.complex128)
-
         # Apply windowing function
+        win = numpy.ones(seg_tpts)
         if self.window_function is not None:
             if self.window_function not in SUPPORTED_WINDOWING_FUNCTIONS:
                 LOG.error("Windowing function is: %s" % self.window_function)
                 LOG.error("Must be in: %s" % str(SUPPORTED_WINDOWING_FUNCTIONS))
-
-            window_function = eval("".join(("numpy.", self.window_function)))
-            win = window_function(seg_tpts)
-            window_mask = (numpy.kron(numpy.ones((time_series_data.shape[1], 1)), win)).T
-
-        nave = 0
-
-        for j in numpy.arange(nepochs):
-            data = time_series_data[j * epoch_tpts:(j + 1) * epoch_tpts, :]
-
-            for i in numpy.arange(nseg):  # average over all segments;
-                time_series = data[i * seg_shift_tpts: i * seg_shift_tpts + seg_tpts, :]
-
-                if self.detrend_ts:
-                    time_series = sp_signal.detrend(time_series, axis=0)
-
-                datalocfft = numpy.fft.fft(time_series * window_mask, axis=0)
-                datalocfft = numpy.matrix(datalocfft)
-
-                for f in numpy.arange(nfreq):  # for all frequencies
-                    if self.npat == 1:
-                        if not self.average_segments:
-                            cs[:, :, f, i] += numpy.conjugate(datalocfft[f, :].conj().T * datalocfft[f, :])
-                            av[:, f, i] += numpy.conjugate(datalocfft[f, :].conj().T)
-                        else:
-                            cs[:, :, f] += numpy.conjugate(datalocfft[f, :].conj().T * datalocfft[f, :])
-                            av[:, f] += numpy.conjugate(datalocfft[f, :].conj().T)
-                    else:
-                        if not self.average_segments:
-                            cs[:, :, f, j, i] = numpy.conjugate(datalocfft[f, :].conj().T * datalocfft[f, :])
-                            av[:, f, j, i] = numpy.conjugate(datalocfft[f, :].conj().T)
-                        else:
-                            cs[:, :, f, j] += numpy.conjugate(datalocfft[f, :].conj().T * datalocfft[f, :])
-                            av[:, f, j] += numpy.conjugate(datalocfft[f, :].conj().T)
-                del datalocfft
-
-            nave += 1.0
-
-        # End of FORs
-        if not self.average_segments:
-            cs = cs / nave
-            av = av / nave
-        else:
-            nave = nave * nseg
-            cs = cs / nave
-            av = av / nave
+            win = getattr(numpy, self.window_function)(seg_tpts)
+
+        # cross-spectra are summed over epochs and, if averaged, segments (the last axis of spectra)
+        nout = 1 if self.average_segments else nseg
+        cs = numpy.zeros((nout, nfreq, nchan, nchan), dtype=numpy.complex128)
+        av = numpy.zeros((nchan, nfreq, nout), dtype=numpy.complex128)
+        seg_index = (numpy.arange(nseg) * seg_shift_tpts).reshape((-1, 1)) + numpy.arange(seg_tpts)
+        epochs = time_series_data[:nepochs * epoch_tpts].reshape((nepochs, epoch_tpts, nchan))
+        epoch_block = max(1, self.block_nbytes // (16 * nseg * seg_tpts * nchan))
+        freq_block = max(1, self.block_nbytes // (16 * nchan * (nout * nchan + epoch_block * nseg)))
+        for lo in range(0, nepochs, epoch_block):
+            # (epoch, segment, time, channel)
+            segments = epochs[lo:lo + epoch_block][:, seg_index]
+            if self.detrend_ts:
+                segments = sp_signal.detrend(segments, axis=2)
+            spectra = self._spectra(segments * win.reshape((-1, 1)), nfreq)
+            # (out, frequency, channel, summed epochs and segments)
+            spectra = spectra.transpose((1, 2, 3, 0)) if nout > 1 else spectra.transpose((2, 3, 0, 1))
+            spectra = spectra.reshape((nout, nfreq, nchan, -1))
+            for flo in range(0, nfreq, freq_block):
+                block = spectra[:, flo:flo + freq_block]
+                cs[:, flo:flo + freq_block] += numpy.matmul(block, block.conj().swapaxes(-1, -2))
+            av += spectra.sum(axis=-1).transpose((2, 1, 0))
+
+        nave = nepochs * nseg if self.average_segments else nepochs
+        cs = cs.transpose((2, 3, 1, 0))
+        cs /= nave
+        av /= nave
 
         # Subtract average
-        for f in numpy.arange(nfreq):
-            if self.subtract_epoch_average:
-                if self.npat == 1:
-                    if not self.average_segments:
-                        for i in numpy.arange(nseg):
-                            cs[:, :, f, i] = cs[:, :, f, i] - av[:, f, i] * av[:, f, i].conj().T
-                    else:
-                        cs[:, :, f] = cs[:, :, f] - av[:, f] * av[:, f].conj().T
-                else:
-                    if not self.average_segments:
-                        for i in numpy.arange(nseg):
-                            for j in numpy.arange(nepochs):
-                                cs[:, :, f, j, i] = cs[:, :, f, j, i] - av[:, f, j, i] * av[:, f, j, i].conj().T
-
-                    else:
-                        for j in numpy.arange(nepochs):
-                            cs[:, :, f, j] = cs[:, :, f, j] - av[:, f, j] * av[:, f, j].conj().T
+        if self.subtract_epoch_average:
+            cs -= av[:, numpy.newaxis] * av[numpy.newaxis].conj()
 
         # Compute Complex Coherence
-        ndim = len(cs.shape)
-        if ndim == 3:
-            for i in numpy.arange(cs.shape[2]):
-                temp = numpy.matrix(cs[:, :, i])
-                coh[:, :, i] = cs[:, :, i] / numpy.sqrt(temp.diagonal().conj().T * temp.diagonal())
-
-        elif ndim == 4:
-            for i in numpy.arange(cs.shape[2]):
-                for j in numpy.arange(cs.shape[3]):
-                    temp = numpy.matrix(numpy.squeeze(cs[:, :, i, j]))
-                    coh[:, :, i, j] = temp / numpy.sqrt(temp.diagonal().conj().T * temp.diagonal().T)
+        diagonal = cs[numpy.arange(nchan), numpy.arange(nchan)]
+        coh = cs / numpy.sqrt(diagonal[:, numpy.newaxis].conj() * diagonal[numpy.newaxis])
+
+        if self.average_segments:
+            cs, coh = cs[..., 0], coh[..., 0]
 
         util.log_debug_array(LOG, cs, "result")
         spectra = spectral.ComplexCoherenceSpectrum(source=self.time_series,
@@ -310,6 +272,14 @@ class NodeComplexCoherence(core.Type):
         return spectra
 
 
+    @staticmethod
+    def _spectra(segments, nfreq):
+        "Returns the first nfreq frequencies of the FFT of segments along their third axis."
+        if nfreq <= segments.shape[2] // 2 + 1:
+            return numpy.fft.rfft(segments, axis=2)[:, :, :nfreq]
+        return numpy.fft.fft(segments, axis=2)[:, :, :nfreq]
+
+
     @staticmethod
     def result_shape(input_shape, max_freq, epoch_length, segment_length,
                      segment_shift, sample_period, zeropad, average_segments):
@@ -40,11 +40,11 @@ a PrincipalComponents datatype.
 #      project source timesereis to component timeserries, etc
 
 import numpy
-import matplotlib.mlab as mlab
 #TODO: Currently built around the Simulator's 4D timeseries -- generalise...
 import tvb.datatypes.time_series as time_series
 import tvb.datatypes.mode_decompositions as mode_decompositions
 import tvb.basic.traits.core as core
+import tvb.basic.traits.types_basic as basic
 import tvb.basic.traits.util as util
 from tvb.basic.logger.builder import get_logger
 
@@ -60,21 +60,37 @@ class PCA(core.Type):
     PCA takes time-points as observations and nodes as variables.
     
     NOTE: The TimeSeries must be longer(more time-points) than the number of
-          nodes -- Mostly a problem for TimeSeriesSurface datatypes, which, if 
-          sampled at 1024Hz, would need to be greater than 16 seconds long.
+          components, by default the number of nodes -- Mostly a problem for
+          TimeSeriesSurface datatypes, for which only the leading components
+          should be computed.
     """
     
     time_series = time_series.TimeSeries(
         label = "Time Series",
         required = True,
         doc = """The timeseries to which the PCA is to be applied. NOTE: The 
-            TimeSeries must be longer(more time-points) than the number of nodes
-            -- Mostly a problem for surface times-series, which, if sampled at
-            1024Hz, would need to be greater than 16 seconds long.""")
+            TimeSeries must be longer(more time-points) than the number of
+            components -- Mostly a problem for surface times-series, which, if
+            sampled at 1024Hz, would need to be greater than 16 seconds long
+            for all components.""")
+
+    n_components = basic.Integer(
+        label = "Number of components",
+        default = None,
+        required = False,
+        doc = """Number of leading principal components to compute. By default,
+            all components are computed, with a weights matrix of size
+            nodes x nodes for each state-variable and mode, ~ 2GB for the
+            default surface.""")
+
+    block_nbytes = basic.Integer(
+        label = "Bytes per block",
+        default = 2 ** 26,
+        required = False,
+        doc = """Approximate memory used for a chunk of time of the time-series,
+            which is read at once.""")
     
-    #TODO: Maybe should support first N components or neccessary components to
-    #      explain X% of the variance. NOTE: For default surface the weights
-    #      matrix has a size ~ 2GB * modes * vars...
+    #TODO: Maybe should support neccessary components to explain X% of the variance.
     
     def evaluate(self):
         """
@@ -84,30 +100,21 @@ class PCA(core.Type):
         self.time_series.trait["data"].log_debug(owner = cls_attr_name)
         
         ts_shape = self.time_series.data.shape
+        n_comp = self.n_components or ts_shape[2]
         
-        #Need more measurements than variables
-        if ts_shape[0] < ts_shape[2]:
-            msg = "PCA requires a longer timeseries (tpts > number of nodes)."
+        #Need more measurements than components
+        if ts_shape[0] < n_comp:
+            msg = "PCA requires a longer timeseries (tpts > number of components)."
             LOG.error(msg)
             raise Exception(msg)
         
-        #(nodes, nodes, state-variables, modes)
-        weights_shape = (ts_shape[2], ts_shape[2], ts_shape[1], ts_shape[3])
+        weights_shape, fractions_shape = self.result_shape(ts_shape)
         LOG.info("weights shape will be: %s" % str(weights_shape))
-        
-        fractions_shape = (ts_shape[2], ts_shape[1], ts_shape[3])
         LOG.info("fractions shape will be: %s" % str(fractions_shape))
         
-        weights = numpy.zeros(weights_shape)
-        fractions = numpy.zeros(fractions_shape)
-        
-        #One inter-node temporal covariance matrix for each state-var & mode.
-        for mode in range(ts_shape[3]):
-            for var in range(ts_shape[1]):
-                data = self.time_series.data[:, var, :, mode]
-                data_pca = mlab.PCA(data)
-                fractions[:, var, mode ] = data_pca.fracs
-                weights[:, :, var, mode] = data_pca.Wt
+        #All state-vars & modes at once, reading the time series in chunks.
+        weights, _, fractions, _, _ = principal_components(self.time_series.data, n_comp,
+                                                           block_nbytes=self.block_nbytes)
         
         util.log_debug_array(LOG, fractions, "fractions")
         util.log_debug_array(LOG, weights, "weights")
@@ -126,9 +133,9 @@ class PCA(core.Type):
         Returns the shape of the main result of the PCA analysis -- compnnent 
         weights matrix and a vector of fractions.
         """
-        weights_shape = (input_shape[2], input_shape[2], input_shape[1],
-                         input_shape[3])
-        fractions_shape = (input_shape[2], input_shape[1], input_shape[3])
+        n_comp = self.n_components or input_shape[2]
+        weights_shape = (n_comp, input_shape[2], input_shape[1], input_shape[3])
+        fractions_shape = (n_comp, input_shape[1], input_shape[3])
         return [weights_shape, fractions_shape]
     
     
@@ -148,10 +155,140 @@ class PCA(core.Type):
         attributes such as norm_source, component_time_series, etc.
         """
         result_size = self.result_size(input_shape)
+        n_comp = self.n_components or input_shape[2]
+        component_size = numpy.prod(input_shape) * 8.0 * n_comp / input_shape[2]
         extend_size = result_size #Main arrays
         extend_size = extend_size + numpy.prod(input_shape) * 8.0 #norm_source
-        extend_size = extend_size + numpy.prod(input_shape) * 8.0 #component_time_series
-        extend_size = extend_size + numpy.prod(input_shape) * 8.0 #normalised_component_time_series
+        extend_size = extend_size + component_size #component_time_series
+        extend_size = extend_size + component_size #normalised_component_time_series
         return extend_size
 
 
+def _time_chunks(data, block_nbytes):
+    "Slices of the time axis of data, of about block_nbytes as 64-bit floats."
+    n_time = data.shape[0]
+    step = max(1, int(block_nbytes // (8 * numpy.prod(data.shape[1:]))))
+    for start in range(0, n_time, step):
+        yield slice(start, min(start + step, n_time))
+
+
+def _moments(data, block_nbytes):
+    "Mean and standard deviation over time, in a single pass over chunks of time."
+    # sums about the first time point avoid cancellation for large means
+    shift = numpy.array(data[0], dtype=numpy.float64)
+    sum_1, sum_2 = numpy.zeros((2, ) + shift.shape)
+    for chunk in _time_chunks(data, block_nbytes):
+        centered = numpy.asarray(data[chunk], dtype=numpy.float64) - shift
+        sum_1 += centered.sum(axis=0)
+        sum_2 += (centered ** 2).sum(axis=0)
+    mean = sum_1 / data.shape[0]
+    variance = numpy.maximum(sum_2 / data.shape[0] - mean ** 2, 0.0)
+    return shift + mean, numpy.sqrt(variance)
+
+
+def _covariance_product(data, mean, scale, basis, block_nbytes):
+    """
+    Product of the (node, node) covariance A^T A of each (state variable, mode)
+    slice A of the centered and scaled data with basis (slice, node, k), or the
+    covariance itself if basis is None, and the sums of squares of the slices.
+    """
+    n_time, n_svar, n_node, n_mode = data.shape
+    n_col = n_node if basis is None else basis.shape[-1]
+    product = numpy.zeros((n_svar * n_mode, n_node, n_col))
+    total = numpy.zeros(n_svar * n_mode)
+    for chunk in _time_chunks(data, block_nbytes):
+        slices = (numpy.asarray(data[chunk], dtype=numpy.float64) - mean) / scale
+        slices = slices.transpose((1, 3, 0, 2)).reshape((n_svar * n_mode, -1, n_node))
+        slices_T = slices.transpose((0, 2, 1))
+        if basis is None:
+            product += numpy.matmul(slices_T, slices)
+        else:
+            product += numpy.matmul(slices_T, numpy.matmul(slices, basis))
+        total += (slices ** 2).sum(axis=(1, 2))
+    return product, total
+
+
+def _orthonormalize(vectors):
+    "Orthonormal bases of the columns of each matrix of a stack."
+    return numpy.array([numpy.linalg.qr(matrix)[0] for matrix in vectors])
+
+
+def principal_components(data, n_components=None, standardize=True, n_oversamples=10, n_iter=4,
+                         block_nbytes=2 ** 26, random_state=0):
+    """
+    Leading principal components of each (state variable, mode) slice of a
+    (time, state variable, node, mode) array, with time points as observations
+    and nodes as variables, as computed by matplotlib.mlab.PCA.
+
+    The data is only read in chunks of time of about block_nbytes, so that it
+    may be a memory mapped or chunked array on disk, and all slices are
+    decomposed at once. When the (node, node) covariances of all slices do not
+    fit in block_nbytes, the requested components are found by randomized SVD:
+    the range of the covariance is sampled with n_components + n_oversamples
+    random vectors, refined by n_iter power iterations, each one pass over the
+    data, and the components are obtained from the covariance projected onto
+    that range, so that no (node, node) array is formed. Otherwise, the full
+    covariance is decomposed.
+
+    :returns:
+        - weights (component, node, state variable, mode), the unit vector of
+          each component, with its largest element positive
+        - singular values (component, state variable, mode) of the centered,
+          and standardized, data
+        - fractions (component, state variable, mode) of the variance explained
+        - mean and scale (state variable, node, mode) removed from the data
+
+    **References:** Halko, Martinsson & Tropp (2011) SIAM Review 53:217-288.
+
+    """
+
+    n_time, n_svar, n_node, n_mode = data.shape
+    n_comp = n_components or n_node
+    mean, scale = _moments(data, block_nbytes)
+    if not standardize:
+        scale = numpy.ones_like(scale)
+
+    n_sample = min(n_node, n_comp + n_oversamples)
+    if n_sample < n_node and 8 * n_svar * n_mode * n_node ** 2 > block_nbytes:
+        random = numpy.random.RandomState(random_state)
+        basis = _orthonormalize(random.randn(n_svar * n_mode, n_node, n_sample))
+        for i in range(n_iter + 1):
+            product, total = _covariance_product(data, mean, scale, basis, block_nbytes)
+            if i < n_iter:
+                basis = _orthonormalize(product)
+        covariance = numpy.matmul(basis.transpose((0, 2, 1)), product)
+    else:
+        basis = None
+        covariance, total = _covariance_product(data, mean, scale, None, block_nbytes)
+
+    # eigenvalues are ascending
+    eigenvalues, vectors = numpy.linalg.eigh(covariance)
+    eigenvalues = numpy.maximum(eigenvalues[:, ::-1][:, :n_comp], 0.0)
+    vectors = vectors[:, :, ::-1][:, :, :n_comp]
+    if basis is not None:
+        vectors = numpy.matmul(basis, vectors)
+    largest = abs(vectors).argmax(axis=1)
+    signs = numpy.sign(vectors[numpy.r_[:vectors.shape[0]][:, numpy.newaxis], largest, numpy.r_[:n_comp]])
+    vectors *= signs[:, numpy.newaxis]
+
+    weights = vectors.reshape((n_svar, n_mode, n_node, n_comp)).transpose((3, 2, 0, 1))
+    singular_values = numpy.sqrt(eigenvalues).reshape((n_svar, n_mode, n_comp)).transpose((2, 0, 1))
+    fractions = (eigenvalues / total[:, numpy.newaxis]).reshape((n_svar, n_mode, n_comp)).transpose((2, 0, 1))
+    return weights, singular_values, fractions, mean, scale
+
+
+def project_components(data, weights, mean, scale=1.0, block_nbytes=2 ** 26):
+    """
+    Time series of components (time, component, state variable, mode), from
+    data centered and scaled as for `principal_components`, and weights
+    (component, node, state variable, mode), reading data in chunks of time.
+    """
+    n_time, n_svar, n_node, n_mode = data.shape
+    components = numpy.empty((n_time, weights.shape[0], n_svar, n_mode))
+    # (state variable, mode, node, component)
+    weights = weights.transpose((2, 3, 1, 0))
+    for chunk in _time_chunks(data, block_nbytes):
+        slices = (numpy.asarray(data[chunk], dtype=numpy.float64) - mean) / scale
+        product = numpy.matmul(slices.transpose((1, 3, 0, 2)), weights)
+        components[chunk] = product.transpose((2, 3, 0, 1))
+    return components
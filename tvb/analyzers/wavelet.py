@@ -40,7 +40,7 @@ WaveletSpectrum datatype.
 """
 
 import numpy
-import scipy.signal as signal
+from scipy.fftpack import next_fast_len
 import tvb.datatypes.time_series as time_series
 import tvb.datatypes.spectral as spectral
 import tvb.basic.traits.core as core
@@ -111,7 +111,27 @@ class ContinuousWaveletTransform(core.Type):
         default = 5.0,
         required = True,
         doc = """NFC. Must be greater than 5. Ratios of the center frequencies to bandwidths.""")
-    
+
+    coefficients_dtype = basic.String(
+        label = "Coefficients type",
+        default = "complex128",
+        required = False,
+        doc = """Complex type of the resulting coefficients, 'complex128' or 'complex64', which
+            halves their memory.""")
+
+    coefficients_path = basic.String(
+        label = "Coefficients file",
+        default = "",
+        required = False,
+        doc = """If given, the coefficients are written per block of channels to a memory
+            mapped npy file at this path, instead of being held in memory.""")
+
+    block_nbytes = basic.Integer(
+        label = "Bytes per block",
+        default = 2 ** 26,
+        required = False,
+        doc = """Approximate memory used for the spectra of a block of channels, which are
+            transformed at once, bounding the transient memory for long, large time series.""")
     
     
     def evaluate(self):
@@ -173,30 +193,32 @@ class ContinuousWaveletTransform(core.Type):
         
         coef_shape = (nf, nt, ts_shape[1], ts_shape[2], ts_shape[3])
         
-        coef = numpy.zeros(coef_shape, dtype = numpy.complex128)
+        if self.coefficients_path:
+            coef = numpy.lib.format.open_memmap(self.coefficients_path, 'w+', self.coefficients_dtype, coef_shape)
+        else:
+            coef = numpy.zeros(coef_shape, dtype = self.coefficients_dtype)
         util.log_debug_array(LOG, coef, "coef")
-        scales = numpy.arange(0, nf, 1)
-        for i in scales:
+        wavelets = []
+        for i in range(nf):
             f0 = freqs[i]
             SDt = sigma_t[(0, i)]
             A = Amp[(0, i)]
             x = numpy.arange(0, 4.0 * SDt * sample_rate, 1) / sample_rate
             wvlt = A * numpy.exp(-x**2 / (2.0 * SDt**2) ) * numpy.exp(2j * numpy.pi * f0 * x )
-            wvlt = numpy.hstack((numpy.conjugate(wvlt[-1:0:-1]), wvlt))
-            #util.log_debug_array(LOG, wvlt, "wvlt")
-            
-            for var in range(ts_shape[1]):
-                for node in range(ts_shape[2]):
-                    for mode in range(ts_shape[3]):
-                        data = self.time_series.data[:, var, node, mode]
-                        wt = signal.convolve(data, wvlt, 'same')
-                        #util.log_debug_array(LOG, wt, "wt")
-                        res = wt[0::temporal_step]
-                        #NOTE: this is a horrible horrible quick hack (alas, a solution) to avoid broadcasting errors
-                        # when using dt and sample periods which are not powers of 2.
-                        coef[i, :, var, node, mode] = res if len(res) == nt else res[:coef.shape[1]] 
-                        
-        
+            wavelets.append(numpy.hstack((numpy.conjugate(wvlt[-1:0:-1]), wvlt)))
+
+        data = numpy.asarray(self.time_series.data).reshape((ts_shape[0], -1))
+        coef_channels = coef.reshape((nf, nt, -1))
+        _, n_fft = fft_length(ts_shape[0], max(map(len, wavelets)), temporal_step)
+        # input, spectra, spectral product and its decimated transforms of each channel
+        n_block = max(1, int(self.block_nbytes // (8 * ts_shape[0] + 40 * n_fft)))
+        for lo in range(0, data.shape[1], n_block):
+            block = slice(lo, lo + n_block)
+            for i, wt in enumerate(convolve_decimated(data[:, block], wavelets, temporal_step, nt)):
+                coef_channels[i, :, block] = wt
+        if self.coefficients_path:
+            coef.flush()
+
         util.log_debug_array(LOG, coef, "coef")
         
         spectra = spectral.WaveletCoefficients(
@@ -250,3 +272,31 @@ class ContinuousWaveletTransform(core.Type):
         return extend_size
 
 
+def fft_length(n_time, n_kernel, step):
+    """
+    Decimated and full transform lengths for `convolve_decimated`: a multiple of step,
+    long enough to avoid circular wrap around.
+
+    """
+    n_dec = next_fast_len(-(-(n_time + n_kernel - 1) // step))
+    return n_dec, n_dec * step
+
+
+def convolve_decimated(data, kernels, step, n_out):
+    """
+    Convolve the columns of data (time, channel) with each of the kernels, as by
+    scipy.signal.convolve with mode 'same', and yield every step-th sample of the first
+    n_out, for one kernel after the other. The data are transformed once, and each
+    kernel's spectral product is decimated in the frequency domain, by folding it into
+    step times fewer bins before the inverse transform.
+
+    """
+    n_dec, n_fft = fft_length(data.shape[0], max(len(kernel) for kernel in kernels), step)
+    spectra = numpy.fft.fft(data, n_fft, axis=0)
+    freqs = numpy.fft.fftfreq(n_fft) * n_fft
+    for kernel in kernels:
+        # output sample 0 of mode 'same' is sample (len(kernel) - 1) // 2 of the full convolution
+        shift = numpy.exp(2j * numpy.pi * freqs * ((len(kernel) - 1) // 2) / n_fft)
+        product = spectra * (numpy.fft.fft(kernel, n_fft) * shift)[:, numpy.newaxis]
+        folded = product.reshape((step, n_dec, -1)).sum(axis=0)
+        yield numpy.fft.ifft(folded, axis=0)[:n_out] / step
@@ -46,12 +46,18 @@ Important:
 
 import six
 import numpy
+import collections
 from scipy import sparse
 from tvb.basic.logger.builder import get_logger
 from tvb.basic.traits.util import get
 from tvb.basic.traits.core import Type
 from tvb.basic.traits.types_basic import DType
 
+try:
+    import h5py as hdf5
+except ImportError:
+    hdf5 = None
+
 
 class MappedTypeLight(Type):
     """
@@ -177,6 +183,126 @@ class MappedTypeLight(Type):
         return array_data[data_slice]
 
 
+class ChunkedArray(object):
+    """
+    Read-only array-like view of a large array on disk, such as a chunked HDF5
+    dataset or a ``numpy.memmap``, to be set as the data of a mapped type in
+    library mode. Indexing reads the chunks of ``chunk_size`` rows along the
+    first (time) axis which it touches, keeping the ``cache_chunks`` most
+    recently used chunks in memory, so that overlapping windows, as read by
+    sliding window analyzers, are read from disk only once.
+
+    The first index selects rows, and the remaining indices are then applied to
+    the selected rows, which matches NumPy indexing except for several index
+    arrays, which apply to their axes independently.
+
+    """
+
+    def __init__(self, source, chunk_size=None, cache_chunks=16):
+        self.source = source
+        if chunk_size is None:
+            chunk_size = (getattr(source, 'chunks', None) or (None, ))[0]
+        if chunk_size is None:
+            # default to chunks of about 1 MB
+            row_nbytes = numpy.prod(source.shape[1:], dtype=int) * numpy.dtype(source.dtype).itemsize
+            chunk_size = 2 ** 20 // max(row_nbytes, 1)
+        self.chunk_size = max(int(chunk_size), 1)
+        self.cache_chunks = cache_chunks
+        self._cache = collections.OrderedDict()
+        self._file = None
+
+    @classmethod
+    def from_npy(cls, path, **kwds):
+        "Memory map an npy file."
+        return cls(numpy.load(path, mmap_mode='r'), **kwds)
+
+    @classmethod
+    def from_h5(cls, path, dataset='data', **kwds):
+        "Open a dataset of an HDF5 file, which remains open until close is called."
+        if hdf5 is None:
+            raise ImportError('Reading HDF5 files requires h5py.')
+        h5_file = hdf5.File(path, 'r')
+        array = cls(h5_file[dataset], **kwds)
+        array._file = h5_file
+        return array
+
+    def close(self):
+        "Drop cached chunks and close the file opened by from_h5, if any."
+        self._cache.clear()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def shape(self):
+        return tuple(self.source.shape)
+
+    @property
+    def dtype(self):
+        return numpy.dtype(self.source.dtype)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def size(self):
+        return int(numpy.prod(self.shape, dtype=int))
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None):
+        return numpy.asarray(self[:], dtype=dtype)
+
+    def _chunk(self, i_chunk):
+        "Chunk i_chunk, from the cache if present."
+        if i_chunk in self._cache:
+            chunk = self._cache.pop(i_chunk)
+        else:
+            lo = i_chunk * self.chunk_size
+            chunk = numpy.asarray(self.source[lo:lo + self.chunk_size])
+            while len(self._cache) >= self.cache_chunks > 0:
+                self._cache.popitem(last=False)
+        if self.cache_chunks > 0:
+            self._cache[i_chunk] = chunk
+        return chunk
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key, )
+        if len(key) == 0 or key[0] is Ellipsis:
+            rows, rest = slice(None), key
+        else:
+            rows, rest = key[0], key[1:]
+        n_row = self.shape[0]
+        squeeze = isinstance(rows, six.integer_types + (numpy.integer, ))
+        if isinstance(rows, slice):
+            rows = numpy.arange(*rows.indices(n_row))
+        else:
+            rows = numpy.asarray(rows)
+            if rows.dtype == bool:
+                rows, = rows.nonzero()
+            rows = rows.reshape((-1, )).astype(int)
+            if ((rows < -n_row) | (rows >= n_row)).any():
+                raise IndexError('index out of bounds for axis 0 with size %d' % (n_row, ))
+            rows %= n_row
+        rest = (slice(None), ) + rest
+        parts = []
+        # split rows into runs within the same chunk, preserving their order
+        i_chunks = rows // self.chunk_size
+        bounds = numpy.r_[0, numpy.nonzero(numpy.diff(i_chunks))[0] + 1, rows.size]
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            if hi > lo:
+                chunk = self._chunk(int(i_chunks[lo]))
+                parts.append(chunk[rows[lo:hi] - i_chunks[lo] * self.chunk_size][rest])
+        if parts:
+            data = numpy.concatenate(parts)
+        else:
+            data = numpy.empty((0, ) + self.shape[1:], self.dtype)[rest]
+        return data[0] if squeeze else data
+
+
 class Array(Type):
     """
     Traits type that wraps a NumPy NDArray.
@@ -259,7 +385,11 @@ class Array(Type):
         """
         name = ".".join((owner, self.trait.name))
         sts = str(self.__class__)
-        if self.trait.value is not None and self.trait.value.size != 0:
+        if isinstance(self.trait.value, ChunkedArray):
+            # statistics would read the whole array
+            self.logger.debug("%s: %s shape: %s" % (sts, name, self.trait.value.shape))
+            self.logger.debug("%s: %s actual dtype: %s" % (sts, name, self.trait.value.dtype))
+        elif self.trait.value is not None and self.trait.value.size != 0:
             shape = str(self.trait.value.shape)
             dtype = str(self.trait.value.dtype)
             tvb_dtype = str(self.trait.value.dtype)
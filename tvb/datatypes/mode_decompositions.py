@@ -61,7 +61,8 @@ class PrincipalComponents(MappedType):
     weights = arrays.FloatArray(
         label="Principal vectors",
         doc="""The vectors of the 'weights' with which each time-series is
-            represented in each component.""",
+            represented in each component, (components, nodes, state-variables,
+            modes), for the leading components only if fewer were computed.""",
         file_storage=core.FILE_STORAGE_EXPAND)
 
     fractions = arrays.FloatArray(
@@ -170,7 +171,7 @@ class PrincipalComponents(MappedType):
         """Compnent time-series."""
         # TODO: Generalise -- it currently assumes 4D TimeSeriesSimulator...
         ts_shape = self.source.data.shape
-        component_ts = numpy.zeros(ts_shape)
+        component_ts = numpy.zeros((ts_shape[0], ts_shape[1], self.weights.shape[0], ts_shape[3]))
         for var in range(ts_shape[1]):
             for mode in range(ts_shape[3]):
                 w = self.weights[:, :, var, mode]
@@ -185,7 +186,7 @@ class PrincipalComponents(MappedType):
         """normalised_Compnent time-series."""
         # TODO: Generalise -- it currently assumes 4D TimeSeriesSimulator...
         ts_shape = self.source.data.shape
-        component_ts = numpy.zeros(ts_shape)
+        component_ts = numpy.zeros((ts_shape[0], ts_shape[1], self.weights.shape[0], ts_shape[3]))
         for var in range(ts_shape[1]):
             for mode in range(ts_shape[3]):
                 w = self.weights[:, :, var, mode]
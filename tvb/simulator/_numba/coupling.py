@@ -28,9 +28,12 @@
 #
 #
 
+import math
 import numpy
+import numba
 from numba import cuda, float32, int32
-from .util import CUDA_SIM
+from .util import CUDA_SIM, jit_device
+from tvb.simulator import coupling as py_coupling
 
 
 def cu_simple_cfun(offset, cvar):
@@ -56,10 +59,10 @@ def next_pow_of_2(i):
 # TODO rework for sweep over cfe pars e.g. variants for const & parametrize cfes
 
 
-def cu_linear_cfe_pre(ai, aj, offset):
-    "Construct CUDA device function for pre-summation linear coupling function."
+def cu_linear_cfe_pre(ai, aj, offset, target='cuda'):
+    "Construct CUDA (or CPU) device function for pre-summation linear coupling function."
     ai, aj, offset = float32(ai), float32(aj), float32(offset)
-    @cuda.jit(device=True)
+    @jit_device(target)
     def cfe(xi, xj):
         return ai * xi + aj * xj + offset
     return cfe
@@ -68,30 +71,30 @@ def cu_linear_cfe_pre(ai, aj, offset):
 # NB Difference handled by linear_pre(ai=-1, aj=1)
 
 
-def cu_linear_cfe_post(slope, offset):
-    "Construct CUDA device function for post-summation linear coupling function."
+def cu_linear_cfe_post(slope, offset, target='cuda'):
+    "Construct CUDA (or CPU) device function for post-summation linear coupling function."
     slope, offset = float32(slope), float32(offset)
-    @cuda.jit(device=True)
+    @jit_device(target)
     def cfe(gx):
         return slope * gx + offset
     return cfe
 
 
-def cu_tanh_cfe_pre(a, b, midpoint, sigma):
-    "Construct CUDA device function for HyperbolicTangent coupling function."
+def cu_tanh_cfe_pre(a, b, midpoint, sigma, target='cuda'):
+    "Construct CUDA (or CPU) device function for HyperbolicTangent coupling function."
     a, b, midpoint, sigma = [float32(_) for _ in (a, b, midpoint, sigma)]
     from math import tanh
-    @cuda.jit(device=True)
+    @jit_device(target)
     def cfe(xi, xj):
         return a * (1 +  tanh((b * xj - midpoint) / sigma))
     return cfe
 
 
-def cu_sigm_cfe_post(cmin, cmax, midpoint, a, sigma):
-    "Construct CUDA device function for Sigmoidal coupling function."
+def cu_sigm_cfe_post(cmin, cmax, midpoint, a, sigma, target='cuda'):
+    "Construct CUDA (or CPU) device function for Sigmoidal coupling function."
     cmin, cmax, midpoint, a, sigma = [float32(_) for _ in (cmin, cmax, midpoint, a, sigma)]
     from math import exp
-    @cuda.jit(device=True)
+    @jit_device(target)
     def cfe(gx):
         return cmin + ((cmax - cmin) / (1.0 + exp(-a *((gx - midpoint) / sigma))))
     return cfe
@@ -100,10 +103,10 @@ def cu_sigm_cfe_post(cmin, cmax, midpoint, a, sigma):
 # TODO Sigmoidal Jansen Rit & PreSigmoidal are model specific hacks
 
 
-def cu_kura_cfe_pre():
-    "Construct CUDA device function for Kuramoto coupling function, pre-summation."
+def cu_kura_cfe_pre(target='cuda'):
+    "Construct CUDA (or CPU) device function for Kuramoto coupling function, pre-summation."
     from math import sin
-    @cuda.jit(device=True)
+    @jit_device(target)
     def cfe(xi, xj):
         # TODO slow for large argument
         return sin(xj - xi)
@@ -116,14 +119,18 @@ def _cu_mod_pow_2(i, n):
     return i & (n - 1)
 
 
+def _check_horizon(horizon, fname):
+    if horizon < 2 or (horizon & (horizon - 1)) != 0:
+        msg = "%s argument `horizon` should be a positive power of 2, but received %d"
+        msg %= fname, horizon
+        raise ValueError(msg)
+
+
 # TODO http://stackoverflow.com/a/30524712
 def cu_delay_cfun(horizon, cfpre, cfpost, n_cvar, n_thread_per_block, step_stride=0, aff_node_stride=0):
     "Construct CUDA device function for delayed coupling with given pre & post summation functions."
 
-    if horizon < 2 or (horizon & (horizon - 1)) != 0:
-        msg = "cu_delay_cfun argument `horizon` should be a positive power of 2, but received %d"
-        msg %= horizon
-        raise ValueError(msg)
+    _check_horizon(horizon, 'cu_delay_cfun')
 
     # 0 except for testing
     step_stride = int32(step_stride)
@@ -170,3 +177,144 @@ def cu_delay_cfun(horizon, cfpre, cfpost, n_cvar, n_thread_per_block, step_strid
             )
 
     return dcfun
+
+
+def nb_delay_cfun(horizon, cfpre, cfpost):
+    """
+    Construct CPU device function for delayed coupling with given pre & post summation functions,
+    compiled with the 'cpu' target, counterpart of `cu_delay_cfun` for one coupling variable.
+    The buffer is laid out (n_thread, n_node, horizon), so that each thread, i.e. parameter set,
+    reads contiguous memory.
+
+    """
+
+    _check_horizon(horizon, 'nb_delay_cfun')
+    mask = int32(horizon - 1)
+
+    @numba.njit
+    def dcfun(delays, weights, state, buf, i_post, i_thread, step):
+        H = float32(0.0)
+        x_i = state[i_thread, i_post]
+        for i_pre in range(weights.shape[1]):
+            weight = weights[i_post, i_pre]
+            if weight == 0.0:
+                continue
+            H += weight * cfpre(x_i, buf[i_thread, i_pre, (step - delays[i_post, i_pre]) & mask])
+        return cfpost(H)
+
+    return dcfun
+
+
+# CPU kernels fusing the sparse history query with coupling evaluation. Pre & post
+# summation functions receive parameters as (n_par, n_node) arrays and the node index.
+
+
+@numba.njit
+def _nb_pre_xj(x_i, x_j, pars, i):
+    return x_j
+
+
+@numba.njit
+def _nb_pre_diff(x_i, x_j, pars, i):
+    return x_j - x_i
+
+
+@numba.njit
+def _nb_pre_sin_diff(x_i, x_j, pars, i):
+    return math.sin(x_j - x_i)
+
+
+@numba.njit
+def _nb_pre_tanh(x_i, x_j, pars, i):
+    a, b, midpoint, sigma = pars[0, i], pars[1, i], pars[2, i], pars[3, i]
+    return a * (1 + math.tanh((b * x_j - midpoint) / sigma))
+
+
+@numba.njit
+def _nb_post_id(gx, pars, i):
+    return gx
+
+
+@numba.njit
+def _nb_post_scale(gx, pars, i):
+    return pars[0, i] * gx
+
+
+@numba.njit
+def _nb_post_linear(gx, pars, i):
+    return pars[0, i] * gx + pars[1, i]
+
+
+def nb_sparse_delay_cfun(pre, post):
+    "Construct CPU function for sparse delayed coupling with given pre & post summation functions."
+
+    @numba.njit
+    def cfun(step, buffer, idelays, indptr, col, weights, pre_pars, post_pars, out):
+        n_time, n_cvar, n_node, n_mode = buffer.shape
+        t_now = (step - 1) % n_time
+        for i_post in range(n_node):
+            for i_cvar in range(n_cvar):
+                for i_mode in range(n_mode):
+                    x_i = buffer[t_now, i_cvar, i_post, i_mode]
+                    aff = 0.0
+                    # afferent non-zero weights of i_post, CSR style
+                    for i_nnz in range(indptr[i_post], indptr[i_post + 1]):
+                        # cheaper than the modulo of a signed integer
+                        t_delayed = t_now - idelays[i_nnz]
+                        if t_delayed < 0:
+                            t_delayed += n_time
+                        x_j = buffer[t_delayed, i_cvar, col[i_nnz], i_mode]
+                        aff += weights[i_nnz] * pre(x_i, x_j, pre_pars, i_post)
+                    out[i_cvar, i_post, i_mode] = post(aff, post_pars, i_post)
+
+    return cfun
+
+
+# coupling class -> pre, post, pre parameters, post parameters (as functions of coupling & history)
+_nb_sparse_cfun_spec = {
+    py_coupling.Linear: (_nb_pre_xj, _nb_post_linear, lambda k, h: (), lambda k, h: (k.a, k.b)),
+    py_coupling.Scaling: (_nb_pre_xj, _nb_post_scale, lambda k, h: (), lambda k, h: (k.a, )),
+    py_coupling.HyperbolicTangent: (_nb_pre_tanh, _nb_post_id,
+                                    lambda k, h: (k.a, k.b, k.midpoint, k.sigma), lambda k, h: ()),
+    py_coupling.Difference: (_nb_pre_diff, _nb_post_scale, lambda k, h: (), lambda k, h: (k.a, )),
+    # Kuramoto.post normalizes by the leading dimension of the summed coupling
+    py_coupling.Kuramoto: (_nb_pre_sin_diff, _nb_post_scale, lambda k, h: (), lambda k, h: (k.a / h.n_cvar, )),
+}
+_nb_sparse_cfuns = {}
+
+
+class NbSparseCoupling(object):
+    """
+    Evaluates a SparseCoupling with a single compiled loop over the non-zero weights, reading
+    the history ring buffer directly and writing into a preallocated output array, which is
+    returned by, and overwritten on, each call.
+
+    """
+
+    def __init__(self, coupling, history):
+        coupling_class = type(coupling)
+        if coupling_class not in _nb_sparse_cfun_spec:
+            raise NotImplementedError('No Numba kernel available for %s.' % (coupling_class.__name__, ))
+        pre, post, pre_pars, post_pars = _nb_sparse_cfun_spec[coupling_class]
+        if coupling_class not in _nb_sparse_cfuns:
+            _nb_sparse_cfuns[coupling_class] = nb_sparse_delay_cfun(pre, post)
+        self.cfun = _nb_sparse_cfuns[coupling_class]
+        self.pre_pars = self._node_pars(pre_pars(coupling, history), history.n_node)
+        self.post_pars = self._node_pars(post_pars(coupling, history), history.n_node)
+        # non-zero weights are sorted by row, so row pointers delimit each node's afferents
+        self.indptr = numpy.searchsorted(history.nnz_row_el_idx, numpy.r_[:history.n_node + 1]).astype('i')
+        self.out = numpy.zeros((history.n_cvar, history.n_node, history.n_mode))
+
+    @staticmethod
+    def _node_pars(pars, n_node):
+        "Broadcast global or per node parameters to an (n_par, n_node) array."
+        node_pars = numpy.zeros((len(pars), n_node))
+        for i, par in enumerate(pars):
+            node_pars[i] = numpy.asarray(par, dtype=numpy.float64).ravel()
+        return node_pars
+
+    def __call__(self, step, history):
+        h = history
+        self.cfun(step, h.buffer, h.nnz_idelays, self.indptr, h.nnz_col_el_idx, h.nnz_weights,
+                  self.pre_pars, self.post_pars, self.out)
+        return self.out
@@ -28,7 +28,11 @@
 #
 #
 
+import math
+import numpy
+import numba
 from numba import cuda, float32
+from .coupling import nb_delay_cfun, next_pow_of_2
 
 def make_loop(cfun, model, n_svar):
     "Construct CUDA device function for integration loop."
@@ -49,3 +53,81 @@ def make_loop(cfun, model, n_svar):
     # TODO hack
     loop.n_svar = n_svar
     return loop
+
+
+def make_cpu_sweep(horizon, dcfun, dfun, n_inner):
+    """
+    Construct parallel CPU kernel advancing a sweep by n_inner Euler-Maruyama steps, with one
+    parameter set, i.e. coupling scaling and noise intensity, per thread, counterpart of the CUDA
+    kernel in `gpu_bench.make_kernel`. As parameter sets are independent, each thread advances
+    its set through all n_inner steps without synchronization.
+
+    """
+
+    mask = numba.int32(horizon - 1)
+    n_inner = numba.int32(n_inner)
+
+    @numba.njit(parallel=True)
+    def kernel(step, state, buf, dt, weights, delays, g_values, s_values, Z):
+        n_thread, n_node = state.shape
+        for i_thread in numba.prange(n_thread):
+            update = numpy.empty((n_node, ), numpy.float32)
+            g = g_values[i_thread]
+            s = math.sqrt(dt) * math.sqrt(2.0 * s_values[i_thread])
+            for i_step in range(n_inner):
+                for i_node in range(n_node):
+                    buf[i_thread, i_node, (step + i_step) & mask] = state[i_thread, i_node]
+                for i_post in range(n_node):
+                    c = dcfun(delays, weights, state, buf, i_post, i_thread, step + i_step)
+                    update[i_post] = dt * dfun(state[i_thread, i_post], g * c) + s * Z[i_step, i_thread, i_post]
+                for i_post in range(n_node):
+                    state[i_thread, i_post] += update[i_post]
+
+    return kernel
+
+
+class CpuSweep(object):
+    """
+    Runs a sweep of a delayed network over coupling scaling and noise intensity on all cores.
+
+    The model and coupling are device functions built for the 'cpu' target, e.g.::
+
+        dfun = cu_expr('omega + c', ('x', 'c'), {'omega': 0.6}, target='cpu')
+        cfpre = cu_kura_cfe_pre(target='cpu')
+        cfpost = cu_linear_cfe_post(1.0 / n_node, 0.0, target='cpu')
+        sweep = CpuSweep(weights, idelays, dfun, cfpre, cfpost, dt=0.1)
+        states = sweep.run(1000, couplings, noises, initial_state=0.1)
+
+    """
+
+    def __init__(self, weights, delays, dfun, cfpre, cfpost, dt, n_inner=100):
+        self.weights = numpy.ascontiguousarray(weights, numpy.float32)
+        self.delays = numpy.ascontiguousarray(delays, numpy.int32)
+        self.horizon = next_pow_of_2(self.delays.max() + 1)
+        self.dt = float(dt)
+        self.n_inner = n_inner
+        dcfun = nb_delay_cfun(self.horizon, cfpre, cfpost)
+        self.kernel = make_cpu_sweep(self.horizon, dcfun, dfun, n_inner)
+
+    def run(self, n_step, couplings, noises, initial_state, random_state=None):
+        """
+        Advance all parameter sets by n_step steps, rounded up to a multiple of n_inner, from a
+        constant history of initial_state, returning the state after each n_inner steps as an
+        array of shape (n_step // n_inner, n_param, n_node).
+
+        """
+        g_values = numpy.ascontiguousarray(couplings, numpy.float32).ravel()
+        s_values = numpy.ascontiguousarray(noises, numpy.float32).ravel()
+        n_param, n_node = g_values.size, self.weights.shape[0]
+        state = numpy.zeros((n_param, n_node), numpy.float32) + initial_state
+        buf = numpy.zeros((n_param, n_node, self.horizon), numpy.float32) + state[..., numpy.newaxis]
+        rng = random_state or numpy.random.RandomState()
+        Z = numpy.zeros((self.n_inner, n_param, n_node), numpy.float32)
+        n_chunk = int(math.ceil(float(n_step) / self.n_inner))
+        states = numpy.zeros((n_chunk, n_param, n_node), numpy.float32)
+        for i in range(n_chunk):
+            if s_values.any():
+                Z[:] = rng.standard_normal(Z.shape)
+            self.kernel(i * self.n_inner, state, buf, self.dt, self.weights, self.delays, g_values, s_values, Z)
+            states[i] = state
+        return states
@@ -45,8 +45,17 @@ _cu_expr_type_map = {
 }
 
 
-def cu_expr(expr, parameters, constants, return_fn=False):
-    "Generate CUDA device function for given expression, with parameters and constants."
+def jit_device(target='cuda'):
+    "Decorator compiling device functions for a target, 'cuda' or 'cpu'."
+    if target == 'cuda':
+        return numba.cuda.jit(device=True)
+    elif target == 'cpu':
+        return numba.njit
+    raise ValueError('unknown target %r, expected "cuda" or "cpu"' % (target, ))
+
+
+def cu_expr(expr, parameters, constants, return_fn=False, target='cuda'):
+    "Generate CUDA (or CPU) device function for given expression, with parameters and constants."
     ns = {}
     template = "from math import *\ndef fn(%s):\n    return %s"
     for name, value in constants.items():
@@ -58,7 +67,7 @@ def cu_expr(expr, parameters, constants, return_fn=False):
     template %= ', '.join(parameters), expr
     exec template in ns
     fn = ns['fn']
-    cu_fn = numba.cuda.jit(device=True)(fn)
+    cu_fn = jit_device(target)(fn)
     if return_fn:
         return cu_fn, fn
     return cu_fn
\ No newline at end of file
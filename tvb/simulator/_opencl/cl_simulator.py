@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Experimental OpenCL backend running a whole region simulation on the device.
+
+The history ring buffer, delayed sparse coupling, deterministic integration
+and a temporal average monitor are generated into a single kernel, and all
+arrays remain resident on the device; the host only reads the temporal average
+at each monitor period. When the network fits in one work-group, a whole
+period is advanced by one kernel launch, synchronizing nodes between steps
+with a barrier; otherwise one launch per step is enqueued.
+
+"""
+
+import numpy
+import pyopencl
+import pyopencl.array
+from .models import CLComponent
+from .. import models, coupling, integrators, monitors
+from ..common import get_logger
+
+LOG = get_logger(__name__)
+
+
+# model derivatives of state x given long-range coupling, for uniform parameters
+_cl_dfuns = {
+    models.Generic2dOscillator: ('tau I a b c d e f g beta alpha gamma', """
+        float V = x[0], W = x[1];
+        dx[0] = d * tau * (alpha * W - f * V*V*V + e * V*V + g * V + gamma * I + gamma * coupling[0]);
+        dx[1] = d * (a + b * V + c * V*V - beta * W) / tau;"""),
+    models.Kuramoto: ('omega', """
+        dx[0] = omega + coupling[0];"""),
+    models.Linear: ('gamma', """
+        dx[0] = gamma * x[0] + coupling[0];"""),
+}
+
+# pre & post expressions of the long-range coupling, with their parameters
+_cl_cfuns = {
+    coupling.Linear: ('x_j', 'a * gx + b', lambda k, n_cvar: {'a': k.a, 'b': k.b}),
+    coupling.Scaling: ('x_j', 'a * gx', lambda k, n_cvar: {'a': k.a}),
+    coupling.HyperbolicTangent: ('a * (1.0f + tanh((b * x_j - midpoint) / sigma))', 'gx',
+                                 lambda k, n_cvar: {'a': k.a, 'b': k.b, 'midpoint': k.midpoint, 'sigma': k.sigma}),
+    coupling.Difference: ('x_j - x_i', 'a * gx', lambda k, n_cvar: {'a': k.a}),
+    # Kuramoto.post normalizes by the leading dimension of the summed coupling
+    coupling.Kuramoto: ('sin(x_j - x_i)', 'a * gx', lambda k, n_cvar: {'a': k.a / n_cvar}),
+}
+
+# integration of x given derivative function and coupling
+_cl_schemes = {
+    integrators.EulerDeterministic: """
+            dfun(x, coupling, dx1);
+            for (int k = 0; k < N_SVAR; k++)
+                x[k] += DT * dx1[k];""",
+    integrators.HeunDeterministic: """
+            dfun(x, coupling, dx1);
+            for (int k = 0; k < N_SVAR; k++)
+                xi[k] = x[k] + DT * dx1[k];
+            dfun(xi, coupling, dx2);
+            for (int k = 0; k < N_SVAR; k++)
+                x[k] += DT * (dx1[k] + dx2[k]) / 2.0f;""",
+}
+
+_cl_source_template = """
+#define N_NODE %(n_node)d
+#define N_TIME %(n_time)d
+#define N_SVAR %(n_svar)d
+#define N_CVAR %(n_cvar)d
+#define N_VOI %(n_voi)d
+#define DT %(dt)rf
+
+__constant int cvar[N_CVAR] = {%(cvar)s};
+__constant int voi[N_VOI] = {%(voi)s};
+
+void dfun(const float *x, const float *coupling, float *dx)
+{
+    %(dfun_pars)s
+    %(dfun)s
+}
+
+float pre(float x_i, float x_j)
+{
+    %(cfun_pars)s
+    return %(pre)s;
+}
+
+float post(float gx)
+{
+    %(cfun_pars)s
+    return %(post)s;
+}
+
+__kernel void step(__global float *state,          // (n_svar, n_node)
+                   __global float *buffer,         // (n_time, n_cvar, n_node)
+                   __global const int *indptr,     // (n_node + 1, )
+                   __global const int *col,        // (n_nnz, )
+                   __global const int *idelays,    // (n_nnz, )
+                   __global const float *weights,  // (n_nnz, )
+                   __global float *tavg,           // (n_voi, n_node)
+                   const int step0, const int n_step)
+{
+    float x[N_SVAR], xi[N_SVAR], dx1[N_SVAR], dx2[N_SVAR], coupling[N_CVAR];
+    for (int s = step0; s < step0 + n_step; s++)
+    {
+        int t_now = (s - 1) %% N_TIME, t_next = s %% N_TIME;
+        for (int i = get_global_id(0); i < N_NODE; i += get_global_size(0))
+        {
+            for (int k = 0; k < N_SVAR; k++)
+                x[k] = state[k * N_NODE + i];
+            for (int k = 0; k < N_CVAR; k++)
+            {
+                float x_i = buffer[(t_now * N_CVAR + k) * N_NODE + i], gx = 0.0f;
+                for (int jj = indptr[i]; jj < indptr[i + 1]; jj++)
+                {
+                    int t = t_now - idelays[jj];
+                    if (t < 0)
+                        t += N_TIME;
+                    float x_j = buffer[(t * N_CVAR + k) * N_NODE + col[jj]];
+                    gx += weights[jj] * pre(x_i, x_j);
+                }
+                coupling[k] = post(gx);
+            }
+            %(scheme)s
+            for (int k = 0; k < N_SVAR; k++)
+                state[k * N_NODE + i] = x[k];
+            for (int k = 0; k < N_CVAR; k++)
+                buffer[(t_next * N_CVAR + k) * N_NODE + i] = x[cvar[k]];
+            for (int k = 0; k < N_VOI; k++)
+                tavg[k * N_NODE + i] += x[voi[k]];
+        }
+        // delayed state of step s is read by other nodes in following steps
+        barrier(CLK_GLOBAL_MEM_FENCE);
+    }
+}
+"""
+
+
+def _uniform(owner, pars):
+    "Format parameters as float declarations, requiring uniform values across nodes."
+    decls = []
+    for name in sorted(pars):
+        value = numpy.unique(numpy.asarray(pars[name]))
+        if value.size != 1:
+            raise NotImplementedError('Parameter %s of %s must be uniform across nodes.'
+                                      % (name, owner.__class__.__name__))
+        decls.append('const float %s = %rf;' % (name, float(value[0])))
+    return '\n    '.join(decls)
+
+
+class CLSimulator(CLComponent):
+    """
+    Runs a configured region `Simulator` with a single `TemporalAverage` monitor
+    on an OpenCL device, from the simulator's current state and history.
+
+    >>> cl_sim = CLSimulator(sim)
+    >>> cl_sim.configure_opencl(*context_and_queue(create_cpu_context()))
+    >>> (time, tavg), = cl_sim.run(simulation_length=1e3)
+
+    Results are computed in single precision.
+
+    """
+
+    def __init__(self, simulator):
+        self.simulator = sim = simulator
+        for component, specs in ((sim.model, _cl_dfuns), (sim.coupling, _cl_cfuns), (sim.integrator, _cl_schemes)):
+            if type(component) not in specs:
+                raise NotImplementedError('No OpenCL implementation available for %s.'
+                                          % (component.__class__.__name__, ))
+        if sim.surface is not None or sim.stimulus is not None or sim.model.number_of_modes != 1:
+            raise NotImplementedError('OpenCL simulation requires a region simulation without '
+                                      'stimulus, for a model with a single mode.')
+        if sim.integrator.clamped_state_variable_values is not None:
+            raise NotImplementedError('OpenCL simulation does not support clamped state variables.')
+        if len(sim.monitors) != 1 or not isinstance(sim.monitors[0], monitors.TemporalAverage):
+            raise NotImplementedError('OpenCL simulation requires a single TemporalAverage monitor.')
+        self.monitor = sim.monitors[0]
+        # monitor voi index the model's variables of interest
+        svar_voi = [sim.model.state_variables.index(name) for name in sim.model.variables_of_interest]
+        self.voi = numpy.array([svar_voi[i] for i in self.monitor.voi], 'i')
+        self.n_svar, self.n_node = sim.current_state.shape[:2]
+        h = sim.history
+        # one more slot than the host history, so that writes never alias reads of the same step
+        self.n_time = h.n_time + 1
+        self._opencl_program_source = self._source()
+
+    def _source(self):
+        sim, h = self.simulator, self.simulator.history
+        dfun_pars, dfun = _cl_dfuns[type(sim.model)]
+        pre, post, cfun_pars = _cl_cfuns[type(sim.coupling)]
+        cfun_pars = cfun_pars(sim.coupling, h.n_cvar)
+        return _cl_source_template % {
+            'n_node': self.n_node, 'n_time': self.n_time, 'n_svar': self.n_svar, 'n_cvar': h.n_cvar,
+            'n_voi': self.voi.size, 'dt': float(sim.integrator.dt),
+            'cvar': ', '.join(str(i) for i in h.cvars), 'voi': ', '.join(str(i) for i in self.voi),
+            'dfun_pars': _uniform(sim.model, dict((name, getattr(sim.model, name)) for name in dfun_pars.split())),
+            'dfun': dfun,
+            'cfun_pars': _uniform(sim.coupling, cfun_pars), 'pre': pre, 'post': post,
+            'scheme': _cl_schemes[type(sim.integrator)],
+        }
+
+    def configure_opencl(self, context, queue):
+        super(CLSimulator, self).configure_opencl(context, queue)
+        self._kernel = self._program.step
+        sim, h = self.simulator, self.simulator.history
+        # copy host history to the longer device ring buffer
+        buffer = numpy.zeros((self.n_time, h.n_cvar, self.n_node), 'f')
+        for step in range(sim.current_step - h.n_time + 1, sim.current_step + 1):
+            buffer[step % self.n_time] = h.buffer[step % h.n_time, ..., 0]
+        indptr = numpy.searchsorted(h.nnz_row_el_idx, numpy.r_[:self.n_node + 1])
+        to_device = lambda ary, dtype: pyopencl.array.to_device(queue, numpy.ascontiguousarray(ary, dtype))
+        self._arrays = {
+            'state': to_device(sim.current_state[..., 0], 'f'),
+            'buffer': to_device(buffer, 'f'),
+            'indptr': to_device(indptr, 'i'),
+            'col': to_device(h.nnz_col_el_idx, 'i'),
+            'idelays': to_device(h.nnz_idelays, 'i'),
+            'weights': to_device(h.nnz_weights, 'f'),
+            'tavg': pyopencl.array.zeros(queue, (self.voi.size, self.n_node), 'f'),
+        }
+        # a single work-group can advance a whole period per launch
+        device = queue.device
+        wg_size = self._kernel.get_work_group_info(pyopencl.kernel_work_group_info.WORK_GROUP_SIZE, device)
+        self._single_group = self.n_node <= wg_size
+        LOG.info('OpenCL simulation of %d nodes on %s, %s', self.n_node, device.name,
+                 'one launch per period' if self._single_group else 'one launch per step')
+
+    def _launch(self, step, n_step):
+        args = [self._arrays[key].data for key in 'state buffer indptr col idelays weights tavg'.split()]
+        if self._single_group:
+            self._kernel(self._queue, (self.n_node, ), (self.n_node, ), *(args + [numpy.int32(step),
+                                                                               numpy.int32(n_step)]))
+        else:
+            for i in range(n_step):
+                self._kernel(self._queue, (self.n_node, ), None, *(args + [numpy.int32(step + i), numpy.int32(1)]))
+
+    def _sync_history(self):
+        "Copy the latest steps of the device ring buffer back to the host history."
+        sim, h = self.simulator, self.simulator.history
+        buffer = self._arrays['buffer'].get()
+        for step in range(sim.current_step - h.n_time + 1, sim.current_step + 1):
+            h.buffer[step % h.n_time, ..., 0] = buffer[step % self.n_time]
+
+    def run(self, simulation_length=None):
+        """
+        Run the simulation, returning temporal average times and data as `Simulator.run`.
+        The simulator's current step, state and history are then those of the device, so
+        that it may be continued on the host; a monitor period in progress is not.
+
+        """
+        if not hasattr(self, '_kernel'):
+            msg = "OpenCL components must be configured via the `configure_opencl` method prior to use."
+            raise RuntimeError(msg)
+        sim, istep = self.simulator, self.monitor.istep
+        if simulation_length is not None:
+            sim.simulation_length = simulation_length
+        n_steps = int(numpy.ceil(sim.simulation_length / sim.integrator.dt))
+        times, data = [], []
+        step, end = sim.current_step + 1, sim.current_step + n_steps + 1
+        while step < end:
+            # advance up to and including the next sampled step
+            n_step = min(end - step, istep - (step - 1) % istep)
+            self._launch(step, n_step)
+            step += n_step
+            if (step - 1) % istep == 0:
+                times.append((step - 1 - istep / 2.0) * sim.integrator.dt)
+                data.append(self._arrays['tavg'].get() / istep)
+                self._arrays['tavg'].fill(0.0)
+        sim.current_step += n_steps
+        sim.current_state = self._arrays['state'].get().astype('d')[..., numpy.newaxis]
+        self._sync_history()
+        data = numpy.array(data, 'd').reshape((-1, self.voi.size, self.n_node, 1))
+        return [(numpy.array(times), data)]
@@ -39,7 +39,7 @@ import pyopencl
 import pyopencl.array
 import numpy
 from ..models import ReducedWongWang
-DEBUG = True
+DEBUG = False
 class CLComponent(object):
 
     def configure_opencl(self, context, queue):
@@ -134,8 +134,6 @@ class CLModel(CLComponent):
             raise TypeError('unsupported data type %r', type(state_variables))
 
         # run the kernel and wait
-        print("Run kernel...")
-
         pyopencl.enqueue_nd_range_kernel(self._queue, self._kernel, (n_nodes,), None).wait()
 
         # return derivatives following input type
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Batched simulation of several parameter sets of the same network.
+
+A parameter sweep typically runs many simulators which differ only in a few
+scalars. Here the instances are stacked along the node axis of a single
+simulation, so that the history, coupling, model dfun, integrator and monitors
+advance all instances in one vectorized step, and the per-step interpreter
+overhead is paid once for the whole batch.
+
+"""
+
+import numpy
+from tvb.simulator import coupling, monitors
+from .common import get_logger
+from .history import BatchSparseHistory
+from .simulator import Simulator
+
+
+LOG = get_logger(__name__)
+
+
+class BatchSimulator(Simulator):
+    """
+    A Simulator which advances several parameter sets of one network in a single loop.
+
+    The parameters which vary between instances are given by ``sweep``, a dict
+    mapping attribute paths to arrays with one value per instance, e.g.::
+
+        sim = BatchSimulator(connectivity=conn, coupling=coupling.Linear(),
+                             monitors=[monitors.TemporalAverage()])
+        sim.sweep = {'coupling.a': numpy.r_[0.001:0.01:10j],
+                     'conduction_speed': numpy.r_[1.0:10.0:10j]}
+        sim.configure()
+        (t, tavg), = sim.run(simulation_length=1e3)
+
+    where ``tavg`` then has shape (n_time, n_inst, n_voi, n_node, n_mode).
+
+    Supported keys are ``conduction_speed``, ``model.<parameter>``,
+    ``integrator.noise.nsig`` and ``coupling.<parameter>`` for couplings whose
+    parameters enter post-summation. Internally, state has shape
+    (n_var, n_inst * n_node, n_mode) with the instance as the leading part of
+    the node axis, which allows model dfuns to treat per-instance parameters
+    as spatialized parameters.
+
+    """
+
+    _coupling_classes = coupling.Linear, coupling.Difference, coupling.Kuramoto
+    _monitor_classes = monitors.Raw, monitors.SubSample, monitors.TemporalAverage, monitors.Bold, \
+                       monitors.ProgressLogger
+
+    sweep = None
+    n_inst = None
+
+    @property
+    def good_history_shape(self):
+        "Returns expected history shape."
+        return self.horizon, len(self.model.state_variables), self.number_of_nodes, self.model.number_of_modes
+
+    def preconfigure(self):
+        "Configure basic fields, checking components are supported in batch mode."
+        super(BatchSimulator, self).preconfigure()
+        if self.surface is not None or self.stimulus is not None:
+            raise NotImplementedError('Batch simulation does not support surfaces or stimuli.')
+        if not self.sweep:
+            raise ValueError('Batch simulation requires a non-empty sweep.')
+        sizes = set(numpy.asarray(values).size for values in self.sweep.values())
+        if len(sizes) != 1:
+            raise ValueError('All sweep values must have the same number of instances, found %r.' % (sizes, ))
+        self.n_inst, = sizes
+        if not isinstance(self.coupling, coupling.SparseCoupling):
+            raise NotImplementedError('Batch simulation requires a SparseCoupling.')
+        if isinstance(self.coupling, coupling.PreSigmoidal):
+            raise NotImplementedError('PreSigmoidal reads delays of the full connectivity, '
+                                      'unsupported in batch mode.')
+        for monitor in self.monitors:
+            if not isinstance(monitor, self._monitor_classes):
+                raise NotImplementedError('Monitor %s mixes nodes, unsupported in batch mode.' % (monitor, ))
+        self.number_of_nodes = self.n_inst * self.connectivity.number_of_regions
+        LOG.info('Batch simulation of %d instances, %d total nodes', self.n_inst, self.number_of_nodes)
+
+    def configure(self, full_configure=True):
+        "Configure simulator, expanding swept parameters to all instances."
+        if full_configure:
+            self.preconfigure()
+        self._configure_sweep()
+        return super(BatchSimulator, self).configure(full_configure=False)
+
+    def _configure_sweep(self):
+        n_reg = self.connectivity.number_of_regions
+        for key, values in self.sweep.items():
+            values = numpy.asarray(values, dtype=numpy.float64).reshape((-1, ))
+            # each instance's value is repeated for its nodes, instance-major
+            per_node = numpy.repeat(values, n_reg)
+            if key == 'conduction_speed':
+                continue
+            path = key.split('.')
+            owner = self
+            for name in path[:-1]:
+                owner = getattr(owner, name)
+            if owner is self.coupling:
+                if not isinstance(self.coupling, self._coupling_classes):
+                    raise NotImplementedError('Cannot sweep parameters of %s.' % (self.coupling, ))
+                per_node = per_node.reshape((-1, 1))
+            elif owner not in (self.model, getattr(self.integrator, 'noise', None)):
+                raise ValueError('Unsupported sweep key %r.' % (key, ))
+            if not hasattr(owner, path[-1]):
+                raise AttributeError('%r has no parameter %r' % (owner, path[-1]))
+            setattr(owner, path[-1], per_node)
+
+    def _configure_history(self, initial_conditions):
+        # per-instance delays in integration steps, (n_inst, n_node, n_node)
+        if 'conduction_speed' in self.sweep:
+            speeds = numpy.asarray(self.sweep['conduction_speed'], dtype=numpy.float64).reshape((-1, 1, 1))
+            delays = self.connectivity.tract_lengths / speeds
+            self._idelays = numpy.rint(delays / self.integrator.dt).astype(numpy.int32)
+        else:
+            self._idelays = numpy.tile(self.connectivity.idelays, (self.n_inst, 1, 1))
+        self.horizon = self._idelays.max() + 1
+        # initial conditions given for one instance are used for all
+        if initial_conditions is not None and initial_conditions.shape[2] == self.connectivity.number_of_regions:
+            initial_conditions = numpy.tile(initial_conditions, (1, 1, self.n_inst, 1))
+        super(BatchSimulator, self)._configure_history(initial_conditions)
+
+    def _create_history(self):
+        return BatchSparseHistory(
+            self.connectivity.weights,
+            self._idelays,
+            self.model.cvar,
+            self.model.number_of_modes
+        )
+
+    def _loop_monitor_output(self, step, state):
+        output = super(BatchSimulator, self)._loop_monitor_output(step, state)
+        if output is not None:
+            output = [self._split_instances(sample) for sample in output]
+        return output
+
+    def _loop_monitor_block_output(self, step, states):
+        outputs = super(BatchSimulator, self)._loop_monitor_block_output(step, states)
+        return [[self._split_instances(sample) for sample in output] for output in outputs]
+
+    def _split_instances(self, sample):
+        "Move instances from the node axis to a leading axis of a monitor sample."
+        if sample is None:
+            return None
+        time, data = sample
+        n_voi, _, n_mode = data.shape
+        data = data.reshape((n_voi, self.n_inst, -1, n_mode)).transpose((1, 0, 2, 3))
+        return [time, data]
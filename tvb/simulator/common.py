@@ -37,9 +37,11 @@ A module of classes and functions of common use.
 
 """
 
+import io
 import numpy
 import os
 import re
+import struct
 import zipfile
 import logging
 from ..basic.logger.builder import GLOBAL_LOGGER_BUILDER
@@ -125,6 +127,42 @@ try:
 except AttributeError:
     numpy_add_at = _add_at
 
+class GroupMean(object):
+    """
+    Mean of an array over groups of elements along an axis, where an integer
+    index such as a region mapping assigns each element to its group. Elements
+    are sorted by group once, so that each reduction is a single `take` and
+    `numpy.add.reduceat`, instead of a product with a dense (n_group, n_element)
+    averaging matrix. Empty groups have a zero mean.
+
+    >>> mean = GroupMean([1, 0, 1, 2])
+    >>> mean(numpy.array([1.0, 2.0, 3.0, 4.0]))
+    array([2., 2., 4.])
+
+    """
+
+    def __init__(self, index, n_group=None):
+        index = numpy.asarray(index).ravel()
+        counts = numpy.bincount(index, minlength=n_group or 0)
+        self.n_group = counts.size
+        self.order = numpy.argsort(index, kind='mergesort')
+        self.groups, = numpy.nonzero(counts)
+        self.starts = numpy.r_[0, numpy.cumsum(counts)[:-1]][self.groups]
+        self.counts = counts[self.groups]
+
+    def __call__(self, array, axis=0):
+        array = numpy.asarray(array)
+        axis = axis % array.ndim
+        sums = numpy.add.reduceat(array.take(self.order, axis=axis), self.starts, axis=axis)
+        counts = self.counts.reshape((-1, ) + (1, ) * (array.ndim - axis - 1))
+        if self.groups.size == self.n_group:
+            return sums / counts
+        shape = array.shape[:axis] + (self.n_group, ) + array.shape[axis + 1:]
+        out = numpy.zeros(shape, dtype=sums.dtype)
+        out[(slice(None), ) * axis + (self.groups, )] = sums / counts
+        return out
+
+
 # loose couple psutil so it's an optional dependency
 try:
     import psutil
@@ -267,6 +305,47 @@ def zip_directory(path, zip_file):
         zip_file.close()
 
 
+def save_snapshot(path, arrays):
+    """
+    Write a dict of arrays to an uncompressed npz file at path. The file is written
+    next to path and renamed into place, so an interrupted write never corrupts a
+    previous snapshot.
+
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as fd:
+        numpy.savez(fd, **arrays)
+    getattr(os, 'replace', os.rename)(tmp_path, path)
+
+
+def load_snapshot(path):
+    """
+    Load the arrays of an uncompressed npz file, as written by `save_snapshot`,
+    without reading them: each stored member is memory mapped copy-on-write in
+    place, so writes to the arrays never reach the file. Scalars, empty arrays and
+    compressed or object members are read normally.
+
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as fd:
+        for info in zf.infolist():
+            key = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            # local file header is 30 bytes, then file name and extra field
+            fd.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack('<HH', fd.read(4))
+            fd.seek(info.header_offset + 30 + name_len + extra_len)
+            version = numpy.lib.format.read_magic(fd)
+            read_header = getattr(numpy.lib.format, 'read_array_header_%d_%d' % version)
+            shape, fortran_order, dtype = read_header(fd)
+            if (info.compress_type != zipfile.ZIP_STORED or dtype.hasobject
+                    or len(shape) == 0 or 0 in shape):
+                arrays[key] = numpy.load(io.BytesIO(zf.read(info.filename)))
+            else:
+                arrays[key] = numpy.memmap(fd, dtype=dtype, mode='c', offset=fd.tell(), shape=shape,
+                                           order='F' if fortran_order else 'C')
+    return arrays
+
+
 def total_ms(duration="", hours=0, minutes=0, seconds=0):
     re_times = re.compile(r'\s*(\d+\.?\d*)\s*(sec|ms|hr|min|s|m|h)\s*$')
     re_decimals = re.compile(r'^[0-9]+([,.][0-9]+)?$')
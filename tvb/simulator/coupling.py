@@ -125,6 +125,10 @@ class Coupling(core.Type):
     """
     _base_classes = ["Coupling", 'SparseCoupling']
 
+    # whether `pre` depends on the current state x_i, in which case coupling
+    # cannot be evaluated ahead of time for a block of steps.
+    pre_uses_current_state = False
+
     def __call__(self, step, history):
         g_ij = history.es_weights
         x_i, x_j = history.query(step)
@@ -163,18 +167,39 @@ class SparseCoupling(Coupling):
         assert x_j.shape == (h.n_cvar, h.n_nnzw, h.n_mode)
         #                              ^ from (columns)
 
-        sum = numpy.zeros_like(x_i)
         x_i = x_i[:, h.nnz_row_el_idx]
         assert x_i.shape == (h.n_cvar, h.n_nnzw, h.n_mode)
         #                              ^ to (rows)
 
         pre = self.pre(x_i, x_j)
-        assert pre.shape == (h.n_cvar, h.n_nnzw, h.n_mode)
+        assert pre.shape[1:] == (h.n_nnzw, h.n_mode)
+
+        return self.post(self._reduce(pre, h))
 
+    def _reduce(self, pre, history):
+        "Sum weighted pre-summation values over afferents, i.e. over the second to last axis."
+        h = history # type: SparseHistory
+        sum = numpy.zeros(pre.shape[:-2] + (h.n_node, h.n_mode))
         weights_col = h.nnz_weights.reshape((h.n_nnzw, 1))
         lri, nzr = self._lri(h.nnz_row_el_idx)
-        sum[:, nzr] = numpy.add.reduceat(weights_col * pre, lri, axis=1)
-        return self.post(sum)
+        sum[..., nzr, :] = numpy.add.reduceat(weights_col * pre, lri, axis=-2)
+        return sum
+
+    def block(self, step, n_step, history):
+        """
+        Evaluate coupling for n_step steps from step at once, returning an array of shape
+        (n_step, n_cvar, n_node, n_mode). This requires that `pre` does not depend on the
+        current state and that n_step does not exceed `history.max_block_steps`.
+
+        """
+        h = history # type: SparseHistory
+        if self.pre_uses_current_state:
+            raise ValueError('%s depends on current state, cannot evaluate a block.' % (self, ))
+        x_j = h.query_sparse_block(step, n_step)
+        assert x_j.shape == (n_step, h.n_cvar, h.n_nnzw, h.n_mode)
+
+        pre = self.pre(None, x_j)
+        return self.post(self._reduce(pre, h))
 
 class Linear(SparseCoupling):
     r"""
@@ -276,7 +301,7 @@ class HyperbolicTangent(SparseCoupling):
         return simple_gen_astr(self, 'a b midpoint sigma')
 
 
-class Sigmoidal(Coupling):
+class Sigmoidal(SparseCoupling):
     r"""
     Provides a sigmoidal coupling function of the form
 
@@ -332,7 +357,7 @@ class Sigmoidal(Coupling):
         return self.cmin + ((self.cmax - self.cmin) / (1.0 + numpy.exp(-self.a *((gx - self.midpoint) / self.sigma))))
 
 
-class SigmoidalJansenRit(Coupling):
+class SigmoidalJansenRit(SparseCoupling):
     r"""
     Provides a sigmoidal coupling function as described in the 
     Jansen and Rit model, of the following form
@@ -383,14 +408,15 @@ class SigmoidalJansenRit(Coupling):
         return simple_gen_astr(self, 'cmin cmax midpoint a r')
 
     def pre(self, x_i, x_j):
-        pre = self.cmax / (1.0 + numpy.exp(self.r * (self.midpoint - (x_j[:, 0] - x_j[:, 1]))))
-        return pre[:, numpy.newaxis]
+        # coupling variables are on the third to last axis in sparse & dense layouts
+        pre = self.cmax / (1.0 + numpy.exp(self.r * (self.midpoint - (x_j[..., 0, :, :] - x_j[..., 1, :, :]))))
+        return pre[..., numpy.newaxis, :, :]
 
     def post(self, gx):
         return self.a * gx
 
 
-class PreSigmoidal(Coupling):
+class PreSigmoidal(SparseCoupling):
     r"""
     Provides a pre-summation sigmoidal coupling function with a static or dynamic
     and local or global threshold.
@@ -458,24 +484,70 @@ class PreSigmoidal(Coupling):
         super(PreSigmoidal, self).configure()
         self.sliceT = 0 if self.globalT else slice(None)
 
+    # delayed states are read outside the sparse layout, down to the current state
+    pre_uses_current_state = True
+
+    def _delayed(self, step, history, delays, nodes, mask):
+        """
+        State of nodes at the given delays as (n_cvar, n, n_mode), read from the history
+        buffer, and zero where mask is not set, as in the dense delayed state.
+
+        """
+        h = history # type: SparseHistory
+        time_idx = (step - 1 - delays + h.n_time) % h.n_time
+        return h.buffer[time_idx, :, nodes].transpose((1, 0, 2)) * mask[:, numpy.newaxis]
+
+    def _indices(self, history):
+        "Delays, nodes & weight masks of the entries of the dense delayed state read, by use."
+        if not hasattr(self, '_cached_indices'):
+            h = history # type: SparseHistory
+            delays = h.delays.astype('i')
+            row, col = h.nnz_row_el_idx, h.nnz_col_el_idx
+            first, nodes = numpy.zeros(h.n_node, 'i'), numpy.r_[:h.n_node]
+            self._cached_indices = {
+                # target's own state, at the reverse connection
+                'target': (delays[col, row], row, h.nnz_mask[col, row]),
+                # node output, at the self connection
+                'self': (delays[nodes, nodes], nodes, h.nnz_mask[nodes, nodes]),
+                # global threshold, per connection and per node
+                'first_col': (delays[col, 0], first[col], h.nnz_mask[col, 0]),
+                'first': (delays[:, 0], first, h.nnz_mask[:, 0]),
+            }
+            order = numpy.argsort(col, kind='mergesort')
+            starts, = numpy.nonzero(numpy.diff(numpy.r_[-1, col[order]]))
+            self._cached_indices['columns'] = order, starts, col[order][starts]
+        return self._cached_indices
+
     # override __call__ directly simpler than pre/post form
-    # TODO check use of arrays dims here
-    def __call__(self, step, history, na=numpy.newaxis):
-        g_ij = history.es_weights
-        x_i, x_j = history.query(step)
-        if self.dynamic:
-            _ = (self.P * x_j[:,0] - x_j[:,1,self.sliceT])[:,na]
-        else:
-            _ = self.P * x_j - self.theta[self.sliceT,na]
-        A_j = self.H * (self.Q + numpy.tanh(self.G * _))
+    def __call__(self, step, history):
+        # evaluates the dense form on the entries it reads: afferents of a node are summed over
+        # the first axis of the delayed state, i.e. over targets of its efferents, and entries
+        # of zero weight read as zero
+        h = history # type: SparseHistory
+        idx = self._indices(h)
         if self.dynamic:
-            c_0 = (g_ij[:,0] * A_j[:,0]).sum(axis=0)
-            c_1 = numpy.diag(A_j[:,0,:,0])[:, na]
+            _, x_j = h.query_sparse(step)
+            x_i = self._delayed(step, h, *idx['self'])
+            if self.globalT:
+                theta_j = self._delayed(step, h, *idx['first_col'])[1]
+                theta_i = self._delayed(step, h, *idx['first'])[1, :, 0]
+            else:
+                theta_j, theta_i = x_j[1], x_i[1, :, 0]
+            A_j = self.H * (self.Q + numpy.tanh(self.G * (self.P * x_j[0] - theta_j)))
+            order, starts, cols = idx['columns']
+            c_0 = numpy.zeros((h.n_node, h.n_mode))
+            c_0[cols] = numpy.add.reduceat((h.nnz_weights.reshape((-1, 1)) * A_j)[order], starts, axis=0)
+            c_1 = self.H * (self.Q + numpy.tanh(self.G * (self.P * x_i[0, :, 0] - theta_i)))[:, numpy.newaxis]
             if self.globalT:
                 c_1[:] = c_1.mean()
             return numpy.array([c_0, c_1])
         else: # static threshold
-            return (g_ij.transpose((2, 1, 0, 3)) * A_j).sum(axis=0)
+            x_t = self._delayed(step, h, *idx['target'])
+            theta = self.theta[self.sliceT]
+            if not self.globalT and theta.size > 1:
+                theta = theta[h.nnz_row_el_idx, numpy.newaxis]
+            A_j = self.H * (self.Q + numpy.tanh(self.G * (self.P * x_t - theta)))
+            return self._reduce(A_j, h)
 
 
 class Difference(SparseCoupling):
@@ -489,6 +561,8 @@ class Difference(SparseCoupling):
 
     """
 
+    pre_uses_current_state = True
+
     a = arrays.FloatArray(
         label=":math:`a`",
         default=numpy.array([0.1,]),
@@ -516,6 +590,8 @@ class Kuramoto(SparseCoupling):
     """
    
 
+    pre_uses_current_state = True
+
     a = arrays.FloatArray(
         label=":math:`a`",
         default=numpy.array([1.0,]),
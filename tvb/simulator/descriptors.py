@@ -173,6 +173,14 @@ class Dim(Final):
                or numpy.issubdtype(type(value), numpy.integer)
 
 
-# TODO
 class Workspace(StaticAttr):
-    pass
\ No newline at end of file
+    """
+    Base class for preallocated work arrays. Subclasses declare dimensions as Dim and
+    arrays as writable NDArray attributes over those dimensions; dimensions are set
+    by keyword at construction and arrays are allocated on first access, then reused.
+
+    """
+
+    def __init__(self, **dims):
+        for name, value in dims.items():
+            setattr(self, name, value)
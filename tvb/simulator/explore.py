@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Parameter exploration over a process pool.
+
+Structural data such as a connectivity's weights and tract lengths, or a
+surface's local connectivity, is written once to memory mapped files by
+`SharedArrays`, so that worker processes map the same read-only pages instead
+of each unpickling a copy. Each configuration is then simulated by a worker,
+which sends back only the result of a reduction, e.g. metrics from
+`tvb.analyzers`, instead of the full time series::
+
+    def build(shared, a):
+        return simulator.Simulator(connectivity=shared.connectivity(),
+                                   coupling=coupling.Linear(a=numpy.r_[a]),
+                                   monitors=[monitors.TemporalAverage()])
+
+    shared = SharedArrays.from_connectivity(conn)
+    exploration = ParameterExploration(build, MetricReduction([KuramotoIndex]), shared)
+    for params, metrics in exploration.run([{'a': a} for a in a_values], simulation_length=1e3):
+        ...
+
+As configurations and results are pickled, ``build`` and the reduction must be
+module level functions or instances of module level classes.
+
+"""
+
+import os
+import shutil
+import tempfile
+import multiprocessing
+import numpy
+import scipy.sparse
+from tvb.datatypes.connectivity import Connectivity
+from tvb.datatypes.time_series import TimeSeries
+from .common import get_logger
+
+
+LOG = get_logger(__name__)
+
+
+class SharedArrays(object):
+    """
+    Read-only arrays written once to ``.npy`` files in a directory, and memory
+    mapped by each process which loads them. Instances pickle only the file
+    names, and sparse matrices are shared through their CSR arrays.
+
+    """
+
+    _connectivity_fields = 'weights tract_lengths centres region_labels speed cortical hemispheres orientations areas'
+
+    def __init__(self, arrays, directory=None):
+        self.directory = directory or tempfile.mkdtemp(prefix='tvb-shared-')
+        self.names, self.sparse, self.small = [], {}, {}
+        for name, array in arrays.items():
+            if scipy.sparse.issparse(array):
+                array = array.tocsr()
+                for part in 'data indices indptr'.split():
+                    self._write('%s.%s' % (name, part), getattr(array, part))
+                self.sparse[name] = array.shape
+            elif numpy.asarray(array).size == 0:
+                # cannot map empty files
+                self.small[name] = numpy.asarray(array)
+            else:
+                self._write(name, array)
+            self.names.append(name)
+        self._arrays = None
+        LOG.info('Shared %d arrays in %s', len(self.names), self.directory)
+
+    def _write(self, name, array):
+        numpy.save(os.path.join(self.directory, name + '.npy'), numpy.ascontiguousarray(array))
+
+    def _map(self, name):
+        return numpy.load(os.path.join(self.directory, name + '.npy'), mmap_mode='r')
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_arrays'] = None
+        return state
+
+    def load(self):
+        "Return dict of memory mapped arrays, mapped once per process."
+        if self._arrays is None:
+            arrays = dict(self.small)
+            for name in self.names:
+                if name in self.sparse:
+                    parts = [self._map('%s.%s' % (name, part)) for part in 'data indices indptr'.split()]
+                    arrays[name] = scipy.sparse.csr_matrix(tuple(parts), shape=self.sparse[name], copy=False)
+                elif name not in arrays:
+                    arrays[name] = self._map(name)
+            self._arrays = arrays
+        return self._arrays
+
+    def __getitem__(self, name):
+        return self.load()[name]
+
+    @classmethod
+    def from_connectivity(cls, connectivity, directory=None, **arrays):
+        "Share a connectivity's structural arrays, along with further named arrays."
+        for name in cls._connectivity_fields.split():
+            arrays['connectivity.' + name] = getattr(connectivity, name)
+        return cls(arrays, directory)
+
+    def connectivity(self):
+        "Build a connectivity on the shared arrays, as shared by from_connectivity."
+        arrays = self.load()
+        kwds = dict((name, arrays['connectivity.' + name]) for name in self._connectivity_fields.split())
+        return Connectivity(**kwds)
+
+    def close(self):
+        "Remove the shared files."
+        self._arrays = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class MetricReduction(object):
+    """
+    Reduces the output of one monitor to the values of time series metrics
+    from `tvb.analyzers`, e.g. `KuramotoIndex` or `GlobalVariance`, returned
+    as a dict keyed by metric class name.
+
+    """
+
+    def __init__(self, metrics, monitor=0, **metric_kwds):
+        self.metrics = metrics
+        self.monitor = monitor
+        self.metric_kwds = metric_kwds
+
+    def __call__(self, simulator, output):
+        time, data = output[self.monitor]
+        time_series = TimeSeries(time=time, data=data, sample_period=simulator.monitors[self.monitor].period)
+        time_series.configure()
+        results = {}
+        for metric_class in self.metrics:
+            results[metric_class.__name__] = metric_class(time_series=time_series, **self.metric_kwds).evaluate()
+        return results
+
+
+# per worker process state, set by the pool initializer
+_worker_shared = None
+
+
+def _init_worker(shared):
+    global _worker_shared
+    _worker_shared = shared
+    shared.load()
+
+
+def _explore_one(args):
+    build, reduction, params, simulation_length = args
+    sim = build(_worker_shared, **params)
+    sim.configure()
+    output = sim.run(simulation_length=simulation_length)
+    return params, reduction(sim, output)
+
+
+class ParameterExploration(object):
+    """
+    Simulates configurations in a pool of worker processes, where the simulator
+    for each configuration is ``build(shared, **params)``, and ``reduction(sim, output)``
+    gives the result sent back from the worker.
+
+    """
+
+    def __init__(self, build, reduction, shared, n_proc=None):
+        self.build = build
+        self.reduction = reduction
+        self.shared = shared
+        self.n_proc = n_proc or multiprocessing.cpu_count()
+
+    def run(self, configurations, simulation_length):
+        "Iterate over (params, result) pairs for each configuration, in order of completion."
+        pool = multiprocessing.Pool(self.n_proc, _init_worker, (self.shared, ))
+        try:
+            tasks = [(self.build, self.reduction, params, simulation_length) for params in configurations]
+            LOG.info('Exploring %d configurations with %d processes', len(tasks), self.n_proc)
+            for params, result in pool.imap_unordered(_explore_one, tasks):
+                yield params, result
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
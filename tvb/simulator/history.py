@@ -133,6 +133,7 @@ class SparseHistory(DenseHistory):
     nnz_col_el_idx = NDArray((n_nnzw, ), 'i')
     nnz_weights = NDArray((n_nnzw, ), 'f')
     nnz_row_idx = NDArray((n_nnzr, ), 'i')
+    _delayed_state_ready = False
 
     def __init__(self, weights, delays, cvars, n_mode):
         super(SparseHistory, self).__init__(weights, delays, cvars, n_mode)
@@ -151,7 +152,6 @@ class SparseHistory(DenseHistory):
         nodes_ = numpy.tile(numpy.r_[:n], (n, 1))[self.nnz_mask, numpy.newaxis] * m
         modes_ = numpy.r_[:m]
         self.const_indices = icvars_ + nodes_ + modes_
-        self.delayed_state[:] = 0.0
 
         LOG.info('history has n_time=%d n_cvar=%d n_node=%d n_nmode=%d, requires %.2f MB',
                  self.n_time, self.n_cvar, self.n_node, self.n_mode, self.nbytes*2**-20)
@@ -161,6 +161,10 @@ class SparseHistory(DenseHistory):
 
     def query(self, step, out=None):
         current, delayed = self.query_sparse(step)
+        if not self._delayed_state_ready:
+            # dense delayed state is only allocated for couplings which require it
+            self.delayed_state[:] = 0.0
+            self._delayed_state_ready = True
         self.delayed_state.transpose((1, 0, 2, 3))[:, self.nnz_mask] = delayed
         return current, self.delayed_state
 
@@ -171,6 +175,25 @@ class SparseHistory(DenseHistory):
         current_state = self.buffer[(step - 1) % self.n_time]
         return current_state, delayed_state
 
+    def query_sparse_block(self, step, n_step):
+        "Query delayed state for n_step steps from step, as (n_step, n_cvar, n_nnzw, n_mode)."
+        steps = numpy.r_[step:step + n_step].reshape((-1, 1))
+        time_indices = (steps - 1 - self.nnz_idelays + self.n_time) % self.n_time # type: numpy.ndarray
+        time_indices = time_indices.reshape((n_step, 1, -1, 1)) * self.time_stride
+        return self.buffer.take(time_indices + self.const_indices)
+
+    def update_block(self, step, new_states):
+        "Update buffer with states of shape (n_step, n_svar, n_node, n_mode) from step."
+        steps = numpy.r_[step:step + new_states.shape[0]]
+        self.buffer[steps % self.n_time] = new_states[:, self.cvars]
+
+    @property
+    def max_block_steps(self):
+        "Largest number of steps for which delayed state is available ahead of time."
+        if self.n_nnzw == 0:
+            return self.n_time
+        return int(self.nnz_idelays.min()) + 1
+
     @property
     def nbytes(self):
         arrays = 'nnz_mask const_indices nnz_idelays nnz_row_el_idx nnz_col_el_idx nnz_weights nnz_row_idx'.split()
@@ -179,6 +202,56 @@ class SparseHistory(DenseHistory):
         return nbytes
 
 
+class BatchSparseHistory(SparseHistory):
+    """
+    Sparse history for several instances of the same network, each with its own delays.
+
+    Instances are stacked instance-major along the node axis, i.e. node ``j`` of
+    instance ``i`` is stored at index ``i * n_node_inst + j``, so that the buffer
+    and the sparse indices remain compatible with `SparseCoupling`, while no
+    (n_node, n_node) array of the stacked network is ever allocated.
+
+    """
+
+    n_inst = Dim()
+
+    def __init__(self, weights, delays, cvars, n_mode):
+        # weights (n_node, n_node) shared, delays (n_inst, n_node, n_node) per instance
+        n_inst, n_node, _ = delays.shape
+        self.n_inst = n_inst
+        self.n_time, self.n_cvar, self.n_node, self.n_mode = delays.max() + 1, len(cvars), n_inst * n_node, n_mode
+        self.cvars = cvars
+        self.time_stride = self.n_cvar * self.n_node * self.n_mode
+        nnz_mask = weights != 0.0
+        row, col = numpy.argwhere(nnz_mask).T
+        offsets = numpy.r_[:n_inst].reshape((-1, 1)) * n_node
+        self.n_nnzw = n_inst * row.size
+        # instance-major stacking keeps the elements sorted by row, as reduceat requires
+        self.nnz_row_el_idx = (row + offsets).ravel()
+        self.nnz_col_el_idx = (col + offsets).ravel()
+        self.nnz_weights = numpy.tile(weights[nnz_mask], n_inst)
+        self.nnz_idelays = delays[:, nnz_mask].ravel().astype('i')
+        nnz_row_idx = numpy.unique(self.nnz_row_el_idx)
+        self.n_nnzr = len(nnz_row_idx)
+        self.nnz_row_idx = nnz_row_idx
+        # build const indices
+        icvars_ = numpy.r_[:self.n_cvar].reshape((-1, 1, 1)) * self.n_node * n_mode
+        nodes_ = self.nnz_col_el_idx.reshape((-1, 1)) * n_mode
+        self.const_indices = icvars_ + nodes_ + numpy.r_[:n_mode]
+
+        LOG.info('batch history has n_inst=%d n_time=%d n_cvar=%d n_node=%d n_nmode=%d, requires %.2f MB',
+                 self.n_inst, self.n_time, self.n_cvar, self.n_node, self.n_mode, self.nbytes*2**-20)
+
+    def query(self, step, out=None):
+        raise NotImplementedError('Batched history only provides sparse queries, '
+                                  'please use a SparseCoupling.')
+
+    @property
+    def nbytes(self):
+        arrays = 'const_indices nnz_idelays nnz_row_el_idx nnz_col_el_idx nnz_weights nnz_row_idx cvars buffer'
+        return sum([getattr(self, ary).nbytes for ary in arrays.split()])
+
+
 # implement in order  NumPy, Numba & OpenCL versions
 
 # simulator.history becomes impl instance
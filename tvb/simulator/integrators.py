@@ -52,11 +52,28 @@ from tvb.basic.traits import core, types_basic as basic
 from tvb.datatypes import arrays
 from . import noise
 from .common import get_logger, simple_gen_astr
+from .descriptors import Workspace, Dim, NDArray
 
 
 LOG = get_logger(__name__)
 
 
+class SchemeWorkspace(Workspace):
+    "Work arrays for in place integration schemes, with the shape of the state."
+
+    n_svar, n_node, n_mode = Dim(), Dim(), Dim()
+    _shape = n_svar, n_node, n_mode
+    inter = NDArray(_shape, 'd', read_only=False)
+    dX = NDArray(_shape, 'd', read_only=False)
+    tmp = NDArray(_shape, 'd', read_only=False)
+    stimulus = NDArray(_shape, 'd', read_only=False)
+    noise = NDArray(_shape, 'd', read_only=False)
+
+    @property
+    def shape(self):
+        return self.n_svar, self.n_node, self.n_mode
+
+
 class Integrator(core.Type):
     """
     The Integrator class is a base class for the integration methods...
@@ -98,6 +115,35 @@ class Integrator(core.Type):
         default = None,
         order=-1)
 
+    in_place = basic.Bool(
+        label = "Integrate in place",
+        default = False,
+        required = False,
+        order = -1,
+        doc = """If True, schemes update the state array they are given and return
+        it, using work arrays preallocated for the state shape instead of
+        allocating new arrays on each step. The SciPy based integrators ignore
+        this option.""")
+
+    _workspace = None
+
+    def configure_workspace(self, state_shape):
+        "Preallocate work arrays for in place integration of states of given shape."
+        n_svar, n_node, n_mode = state_shape
+        self._workspace = SchemeWorkspace(n_svar=n_svar, n_node=n_node, n_mode=n_mode)
+        LOG.debug('%r preallocated workspace for state shape %r', self, state_shape)
+
+    def _workspace_for(self, X):
+        "Workspace for in place integration of X, (re)configured if absent or of the wrong shape."
+        if self._workspace is None or self._workspace.shape != X.shape:
+            self.configure_workspace(X.shape)
+        return self._workspace
+
+    def _add_stimulus(self, X, stimulus, ws):
+        "In place equivalent of X + dt * stimulus, keeping dt * stimulus in the workspace."
+        numpy.multiply(stimulus, self.dt, out=ws.stimulus)
+        X += ws.stimulus
+
 
     def scheme(self, X, dfun, coupling, local_coupling, stimulus):
         """
@@ -175,7 +221,8 @@ class HeunDeterministic(Integrator):
         cf. Equation 1.11, page 283.
 
         """
-        #import pdb; pdb.set_trace()
+        if self.in_place:
+            return self._scheme_in_place(X, dfun, coupling, local_coupling, stimulus)
         m_dx_tn = dfun(X, coupling, local_coupling)
         inter = X + self.dt * (m_dx_tn  + stimulus)
         self.clamp_state(inter)
@@ -186,6 +233,25 @@ class HeunDeterministic(Integrator):
         self.clamp_state(X_next)
         return X_next
 
+    def _scheme_in_place(self, X, dfun, coupling, local_coupling, stimulus):
+        ws = self._workspace_for(X)
+        # local names, as augmented assignment to the workspace attributes would copy
+        inter, dX = ws.inter, ws.dX
+        m_dx_tn = dfun(X, coupling, local_coupling)
+        numpy.add(m_dx_tn, stimulus, out=inter)
+        inter *= self.dt
+        inter += X
+        self.clamp_state(inter)
+
+        numpy.add(m_dx_tn, dfun(inter, coupling, local_coupling), out=dX)
+        dX *= self.dt
+        dX /= 2.0
+
+        X += dX
+        self._add_stimulus(X, stimulus, ws)
+        self.clamp_state(X)
+        return X
+
 
 class HeunStochastic(IntegratorStochastic):
     """
@@ -220,6 +286,9 @@ class HeunStochastic(IntegratorStochastic):
 
         noise *= noise_gfun
 
+        if self.in_place:
+            return self._scheme_in_place(X, dfun, coupling, local_coupling, stimulus, m_dx_tn, noise)
+
         inter = X + self.dt * m_dx_tn + noise + self.dt * stimulus
         self.clamp_state(inter)
 
@@ -229,6 +298,26 @@ class HeunStochastic(IntegratorStochastic):
         self.clamp_state(X_next)
         return X_next
 
+    def _scheme_in_place(self, X, dfun, coupling, local_coupling, stimulus, m_dx_tn, noise):
+        ws = self._workspace_for(X)
+        inter, dX, dt_stimulus = ws.inter, ws.dX, ws.stimulus
+        numpy.multiply(m_dx_tn, self.dt, out=inter)
+        inter += X
+        inter += noise
+        numpy.multiply(stimulus, self.dt, out=dt_stimulus)
+        inter += dt_stimulus
+        self.clamp_state(inter)
+
+        numpy.add(m_dx_tn, dfun(inter, coupling, local_coupling), out=dX)
+        dX *= self.dt
+        dX /= 2.0
+
+        X += dX
+        X += noise
+        X += dt_stimulus
+        self.clamp_state(X)
+        return X
+
 
 class EulerDeterministic(Integrator):
     """
@@ -253,6 +342,14 @@ class EulerDeterministic(Integrator):
 
         self.dX = dfun(X, coupling, local_coupling) 
 
+        if self.in_place:
+            dX = self._workspace_for(X).dX
+            numpy.add(self.dX, stimulus, out=dX)
+            dX *= self.dt
+            X += dX
+            self.clamp_state(X)
+            return X
+
         X_next = X + self.dt * (self.dX + stimulus)
         self.clamp_state(X_next)
         return X_next
@@ -285,6 +382,15 @@ class EulerStochastic(IntegratorStochastic):
         """
 
         noise = self.noise.generate(X.shape)
+        if self.in_place:
+            ws = self._workspace_for(X)
+            numpy.multiply(dfun(X, coupling, local_coupling), self.dt, out=ws.dX)
+            numpy.multiply(self.noise.gfun(X), noise, out=ws.noise)
+            X += ws.dX
+            X += ws.noise
+            self._add_stimulus(X, stimulus, ws)
+            self.clamp_state(X)
+            return X
         dX = dfun(X, coupling, local_coupling) * self.dt 
         noise_gfun = self.noise.gfun(X)
         X_next = X + dX + noise_gfun * noise + self.dt * stimulus
@@ -320,6 +426,9 @@ class RungeKutta4thOrderDeterministic(Integrator):
 
         """
 
+        if self.in_place:
+            return self._scheme_in_place(X, dfun, coupling, local_coupling, stimulus)
+
         dt = self.dt
         dt2 = dt / 2.0
         dt6 = dt / 6.0
@@ -341,6 +450,38 @@ class RungeKutta4thOrderDeterministic(Integrator):
         self.clamp_state(X_next)
         return X_next
 
+    def _scheme_in_place(self, X, dfun, coupling, local_coupling, stimulus):
+        ws = self._workspace_for(X)
+        inter, dX, tmp = ws.inter, ws.dX, ws.tmp
+        dt = self.dt
+        dt2 = dt / 2.0
+        dt6 = dt / 6.0
+
+        # dX accumulates k1 + 2 k2 + 2 k3 + k4 as the stages are evaluated
+        k1 = dfun(X, coupling, local_coupling)
+        numpy.multiply(k1, dt2, out=inter)
+        inter += X
+        self.clamp_state(inter)
+        k2 = dfun(inter, coupling, local_coupling)
+        numpy.multiply(k2, 2.0, out=dX)
+        dX += k1
+        numpy.multiply(k2, dt2, out=inter)
+        inter += X
+        self.clamp_state(inter)
+        k3 = dfun(inter, coupling, local_coupling)
+        numpy.multiply(k3, 2.0, out=tmp)
+        dX += tmp
+        numpy.multiply(k3, dt, out=inter)
+        inter += X
+        self.clamp_state(inter)
+        dX += dfun(inter, coupling, local_coupling)
+        dX *= dt6
+
+        X += dX
+        self._add_stimulus(X, stimulus, ws)
+        self.clamp_state(X)
+        return X
+
 
 class Identity(Integrator):
     """
@@ -365,6 +506,8 @@ class Identity(Integrator):
 
         """
 
+        if self.in_place:
+            return numpy.add(dfun(X, coupling, local_coupling), stimulus, out=X)
         return dfun(X, coupling, local_coupling) + stimulus
 
 
@@ -70,7 +70,7 @@ import tvb.datatypes.equations as equations
 import tvb.basic.traits.util as util
 import tvb.basic.traits.types_basic as basic
 import tvb.basic.traits.core as core
-from tvb.simulator.common import iround, numpy_add_at
+from tvb.simulator.common import iround, numpy_add_at, GroupMean
 
 
 LOG = get_logger(__name__)
@@ -137,6 +137,16 @@ class Monitor(core.Type):
 
         return self.sample(step, observed)
 
+    def record_block(self, step, observed):
+        """Record a block of samples of the observed state, starting at given step.
+
+        Returns a list holding the output of `record` for each step of the block;
+        subclasses may override this to consume the block without stepping.
+
+        """
+
+        return [self.record(step + i, observed_i) for i, observed_i in enumerate(observed)]
+
     def sample(self, step, state):
         """
         This method provides monitor output, and should be overridden by subclasses.
@@ -211,6 +221,10 @@ class Raw(Monitor):
         time = step * self.dt
         return [time, state]
 
+    def record_block(self, step, observed):
+        time = (step + numpy.r_[:observed.shape[0]]) * self.dt
+        return [[time_i, state] for time_i, state in zip(time, observed)]
+
 
 class SubSample(Monitor):
     """
@@ -224,6 +238,12 @@ class SubSample(Monitor):
             time = step * self.dt
             return [time, state[self.voi, :]]
 
+    def record_block(self, step, observed):
+        output = [None] * observed.shape[0]
+        for i in range((-step) % self.istep, observed.shape[0], self.istep):
+            output[i] = [(step + i) * self.dt, observed[i, self.voi]]
+        return output
+
 
 class SpatialAverage(Monitor):
     """
@@ -298,20 +318,13 @@ class SpatialAverage(Monitor):
             raise Exception(msg)
 
         util.log_debug_array(LOG, self.spatial_mask, "spatial_mask", owner=self.__class__.__name__)
-        spatial_sum = numpy.zeros((number_of_nodes, number_of_areas))
-        spatial_sum[numpy.arange(number_of_nodes), self.spatial_mask] = 1
-        spatial_sum = spatial_sum.T
-        util.log_debug_array(LOG, spatial_sum, "spatial_sum")
-        nodes_per_area = numpy.sum(spatial_sum, axis=1)[:, numpy.newaxis]
-        self.spatial_mean = spatial_sum / nodes_per_area
-        util.log_debug_array(LOG, self.spatial_mean, "spatial_mean", owner=self.__class__.__name__)
-
+        self.spatial_mean = GroupMean(self.spatial_mask, number_of_areas)
 
     def sample(self, step, state):
         if step % self.istep == 0:
             time = step * self.dt
-            monitored_state = numpy.dot(self.spatial_mean, state[self.voi, :])
-            return [time, monitored_state.transpose((1, 0, 2))]
+            monitored_state = self.spatial_mean(state[self.voi, :], axis=1)
+            return [time, monitored_state]
 
     def create_time_series(self, storage_path, connectivity=None, surface=None,
                            region_map=None, region_volume_map=None):
@@ -383,6 +396,61 @@ class TemporalAverage(Monitor):
             time = (step - self.istep / 2.0) * self.dt
             return [time, avg_stock]
 
+    def record_block(self, step, observed):
+        """
+        Fills the ``_stock`` with contiguous runs of the block, averaging it for
+        each step of the block which corresponds to the sample period.
+
+        """
+        output = [None] * observed.shape[0]
+        i = 0
+        while i < observed.shape[0]:
+            lo = (step + i - 1) % self.istep
+            n = min(self.istep - lo, observed.shape[0] - i)
+            self._stock[lo:lo + n] = observed[i:i + n, self.voi]
+            i += n
+            if (step + i - 1) % self.istep == 0:
+                time = (step + i - 1 - self.istep / 2.0) * self.dt
+                output[i - 1] = [time, numpy.mean(self._stock, axis=0)]
+        return output
+
+
+class ProjectionGroup(object):
+    """
+    Lazy projection monitors with equal period, variables of interest and sources,
+    which accumulate the source state once per step and share one stacked gain
+    matrix, applied once per period.
+
+    """
+
+    def __init__(self, monitors):
+        self.voi = monitors[0].voi
+        self.gain = numpy.vstack([monitor.gain for monitor in monitors])
+        self.rows = {}
+        lo = 0
+        for monitor in monitors:
+            self.rows[monitor] = slice(lo, lo + monitor.gain.shape[0])
+            lo += monitor.gain.shape[0]
+        self._source_sum = numpy.zeros((len(self.voi), self.gain.shape[1]))
+        self._accumulated_step = None
+        self._projected_step = None
+        self._projected = None
+        LOG.debug('Projection group of %d monitors, stacked gain shape %s', len(monitors), self.gain.shape)
+
+    def accumulate(self, step, state):
+        "Add state to the source sum, once per step for all monitors of the group."
+        if step != self._accumulated_step:
+            self._source_sum += state[self.voi].sum(axis=-1)
+            self._accumulated_step = step
+
+    def project(self, step, monitor):
+        "Project the source sum once per period for all monitors, returning the monitor's rows."
+        if step != self._projected_step:
+            self._projected = self.gain.dot(self._source_sum.T)
+            self._source_sum[:] = 0.0
+            self._projected_step = step
+        return self._projected[self.rows[monitor]]
+
 
 class Projection(Monitor):
     "Base class monitor providing lead field suppport."
@@ -395,6 +463,18 @@ class Projection(Monitor):
             " connectivity. For iEEG/EEG/MEG monitors, this must be specified when performing a region"
             " simulation but is optional for a surface simulation.")
 
+    lazy = basic.Bool(
+        label="Project once per period",
+        default=False,
+        required=False,
+        order=-1,
+        doc="""Accumulate the source state over each period and apply the gain
+        once per period instead of at every step, which is equivalent as the
+        projection is linear. Lazy projection monitors of a simulator with the
+        same period and variables of interest share one stacked gain matrix.""")
+
+    _group = None
+
     @staticmethod
     def oriented_gain(gain, orient):
         "Apply orientations to gain matrix."
@@ -507,9 +587,25 @@ class Projection(Monitor):
         LOG.debug('State shape %s, period in steps %s', self._state.shape, self._period_in_steps)
 
         LOG.info('Projection configured gain shape %s', self.gain.shape)
+        self._group = ProjectionGroup([self]) if self.lazy else None
+
+    @staticmethod
+    def group_lazy(monitors):
+        "Group configured lazy projection monitors which can share a stacked gain."
+        groups = {}
+        for monitor in monitors:
+            if isinstance(monitor, Projection) and monitor.lazy:
+                key = tuple(monitor.voi), monitor._period_in_steps, monitor.gain.shape[1]
+                groups.setdefault(key, []).append(monitor)
+        for members in groups.values():
+            group = ProjectionGroup(members)
+            for monitor in members:
+                monitor._group = group
 
     def sample(self, step, state):
         "Record state, returning sample at sampling frequency / period."
+        if self._group is not None:
+            return self._sample_lazy(step, state)
         self._state += self.gain.dot(state[self.voi].sum(axis=-1).T)
         if step % self._period_in_steps == 0:
             time = (step - self._period_in_steps / 2.0) * self.dt
@@ -517,6 +613,13 @@ class Projection(Monitor):
             self._state[:] = 0.0
             return time, sample.T[..., numpy.newaxis] # for compatibility
 
+    def _sample_lazy(self, step, state):
+        self._group.accumulate(step, state)
+        if step % self._period_in_steps == 0:
+            time = (step - self._period_in_steps / 2.0) * self.dt
+            sample = self._group.project(step, self) / self._period_in_steps
+            return time, sample.T[..., numpy.newaxis]
+
     _gain = None
 
     def _get_gain(self):
@@ -870,6 +973,65 @@ class Bold(Monitor):
             return [time, bold]
 
 
+class BoldStreaming(Bold):
+    """
+    Computes the same BOLD signal as the `Bold` monitor, without storing the
+    neural activity over the length of the HRF.
+
+    Instead of convolving the full stock with the HRF at every period, each
+    stock sample's contribution is accumulated, as soon as it is available,
+    into the outputs of the upcoming periods whose HRF window covers it. This
+    requires one accumulator per period spanned by the HRF, e.g. 11 instead of
+    5000 stock samples for a 20 s HRF and a 2 s period, and the same number of
+    operations per stock sample as the full convolution spread over a period.
+
+    """
+    _ui_name = "BOLD (streaming)"
+
+    def config_for_sim(self, simulator):
+        # Bold's stock is not required, so bypass its config_for_sim
+        Monitor.config_for_sim(self, simulator)
+        self.compute_hrf()
+        sample_shape = self.voi.shape[0], simulator.number_of_nodes, simulator.model.number_of_modes
+        # the interim stock is a running sum, the stock holds the pending outputs of
+        # the periods whose HRF window covers a stock sample
+        self._interim_stock = numpy.zeros(sample_shape)
+        n_pending = int(numpy.ceil(self._stock_steps * self._interim_istep / float(self.istep))) + 1
+        self._stock = numpy.zeros((n_pending,) + sample_shape)
+        LOG.debug("BOLD pending outputs %s %.2f MB" % (
+            self._stock.shape, self._stock.nbytes/2**20))
+
+    def _accumulate(self, i_stock, stock_sample):
+        "Add a stock sample's contribution to the outputs of the periods it affects."
+        hrf, n_stock, n_pending = self.hemodynamic_response_function[0], self._stock_steps, self._stock.shape[0]
+        # first period sampled on or after the stock sample
+        i_period = -(-i_stock * self._interim_istep // self.istep)
+        lag = i_period * self.istep // self._interim_istep - i_stock
+        while lag < n_stock:
+            # weights as in the rolled HRF of Bold.sample
+            self._stock[i_period % n_pending] += hrf[-lag % n_stock] * stock_sample
+            i_period += 1
+            lag = i_period * self.istep // self._interim_istep - i_stock
+
+    def sample(self, step, state):
+        # Accumulate the interim-stock at every step
+        self._interim_stock += state[self.voi, :]
+        # At stock's period, add the temporal average to the pending BOLD outputs
+        if step % self._interim_istep == 0:
+            self._accumulate(step // self._interim_istep, self._interim_stock / self._interim_istep)
+            self._interim_stock[:] = 0.0
+        # At the monitor's period, the pending output is complete
+        if step % self.istep == 0:
+            time = step * self.dt
+            pending = self._stock[(step // self.istep) % self._stock.shape[0]]
+            bold = pending.copy()
+            pending[:] = 0.0
+            if isinstance(self.hrf_kernel, equations.FirstOrderVolterra):
+                k1_V0 = self.hrf_kernel.parameters["k_1"] * self.hrf_kernel.parameters["V_0"]
+                bold = (bold - 1.0) * k1_V0
+            return [time, bold]
+
+
 class BoldRegionROI(Bold):
     """
     The BoldRegionROI monitor assumes that it is being used on a surface and
@@ -886,14 +1048,14 @@ class BoldRegionROI(Bold):
     def config_for_sim(self, simulator):
         super(BoldRegionROI, self).config_for_sim(simulator)
         self.region_mapping = simulator.surface.region_mapping
+        # average all nodes, including non-cortical ones, into the connectivity's regions
+        self._region_mean = GroupMean(simulator._regmap, simulator.connectivity.number_of_regions)
 
-    def sample(self, step, state, array=numpy.array):
+    def sample(self, step, state):
         result = super(BoldRegionROI, self).sample(step, state)
         if result:
             t, data = result
-            # TODO use reduceat
-            return [t, array([data.flat[self.region_mapping==i].mean()
-                              for i in range(self.region_mapping.max())])]
+            return [t, self._region_mean(data, axis=1)]
         else:
             return None
 
@@ -146,7 +146,30 @@ class Noise(core.Type):
         doc="""An instance of numpy's RandomState associated with this
         specific Noise object.""")
 
+    block_size = basic.Integer(
+        label="Noise block size",
+        default=1,
+        required=False,
+        order=-1,
+        doc="""Number of steps of random variates drawn at once and then served
+        one step at a time, which amortizes the per call overhead of the
+        generator for small networks. With the RandomState bit generator the
+        realization does not depend on the block size.""")
+
+    bit_generator = basic.String(
+        label="Bit generator",
+        default="RandomState",
+        required=False,
+        order=-1,
+        doc="""Source of random variates: 'RandomState' draws from random_stream,
+        while 'PCG64' or 'Philox' draw from a numpy.random.Generator with that
+        bit generator, seeded with the random_stream's init_seed, which requires
+        NumPy 1.17 or later.""")
+
     dt = None
+    _rng = None
+    _block = None
+    _block_index = 0
     # For use if coloured
     _E = None
     _sqrt_1_E2 = None
@@ -161,13 +184,83 @@ class Noise(core.Type):
         """
         super(Noise, self).configure()
         self.random_stream.configure()
+        # as the random_stream, a Generator restarts from the seed
+        self._rng = None
+        self.configure_stream()
 
     def __str__(self):
         return simple_gen_astr(self, 'dt ntau')
 
+    def configure_stream(self):
+        """
+        Set up the source of random variates according to ``bit_generator``,
+        discarding any block of variates drawn previously. A Generator is created
+        once, so that its stream continues when reconfigured.
+
+        """
+        self._block, self._block_index = None, 0
+        if self.bit_generator == 'RandomState':
+            self._rng = self.random_stream
+        elif self.bit_generator in ('PCG64', 'Philox'):
+            if (hasattr(self._rng, 'bit_generator')
+                    and type(self._rng.bit_generator).__name__ == self.bit_generator):
+                return
+            if not hasattr(numpy.random, 'Generator'):
+                raise ImportError('The %s bit generator requires NumPy 1.17 or later.' % (self.bit_generator, ))
+            # a default random_stream is a plain RandomState without init_seed
+            seed = getattr(self.random_stream, 'init_seed', RandomStream.init_seed.interface['default'])
+            bit_generator = getattr(numpy.random, self.bit_generator)(seed)
+            self._rng = numpy.random.Generator(bit_generator)
+        else:
+            raise ValueError('Unknown bit generator %r.' % (self.bit_generator, ))
+
+    def get_state(self):
+        """
+        State of the source of random variates: that of the random_stream, or of the
+        Generator's bit generator.
+
+        """
+        if self._rng is None:
+            self.configure_stream()
+        if self._rng is self.random_stream:
+            return self.random_stream.get_state()
+        return self._rng.bit_generator.state
+
+    def set_state(self, state):
+        """
+        Set the state of the source of random variates, as returned by get_state,
+        discarding any block of variates drawn previously.
+
+        """
+        self.configure_stream()
+        if self._rng is self.random_stream:
+            self.random_stream.set_state(state)
+        else:
+            self._rng.bit_generator.state = state
+
+    def _normal(self, shape, scale):
+        """
+        Draw scaled normal variates, from a block of block_size steps if configured. A block
+        is scaled once when drawn, and each of its steps is served only once.
+
+        """
+        if self._rng is None:
+            self.configure_stream()
+        shape = tuple(shape)
+        if self.block_size <= 1:
+            return scale * self._rng.standard_normal(shape)
+        if (self._block is None or self._block.shape[1:] != shape
+                or self._block_index == self._block.shape[0]):
+            self._block = scale * self._rng.standard_normal((self.block_size, ) + shape)
+            self._block_index = 0
+        variates = self._block[self._block_index]
+        self._block_index += 1
+        return variates
+
     def configure_white(self, dt, shape=None):
         """Set the time step (dt) of noise or integration time"""
         self.dt = dt
+        self.configure_stream()
         LOG.info('White noise configured with dt=%g', self.dt)
 
     def configure_coloured(self, dt, shape):
@@ -208,7 +301,8 @@ class Noise(core.Type):
         self.dt = dt
         self._E = numpy.exp(-self.dt / self.ntau)
         self._sqrt_1_E2 = numpy.sqrt((1.0 - self._E ** 2))
-        self._eta = self.random_stream.normal(size=shape)
+        self.configure_stream()
+        self._eta = self._rng.standard_normal(shape)
         self._dt_sqrt_lambda = self.dt * numpy.sqrt(1.0 / self.ntau)
         LOG.info('Colored noise configured with dt=%g E=%g sqrt_1_E2=%g eta=%g & dt_sqrt_lambda=%g',
                   self.dt, self._E, self._sqrt_1_E2, self._eta, self._dt_sqrt_lambda)
@@ -223,13 +317,13 @@ class Noise(core.Type):
 
     def coloured(self, shape):
         "Generate colored noise. [FoxVemuri_1988]_"
-        self._h = self._sqrt_1_E2 * self.random_stream.normal(size=shape)
+        self._h = self._normal(shape, self._sqrt_1_E2)
         self._eta =  self._eta * self._E + self._h
         return self._dt_sqrt_lambda * self._eta
 
     def white(self, shape):
         "Generate white noise."
-        noise = numpy.sqrt(self.dt) * self.random_stream.normal(size=shape)
+        noise = self._normal(shape, numpy.sqrt(self.dt))
         return noise
 
 
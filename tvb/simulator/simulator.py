@@ -41,6 +41,7 @@ simulation and the method for running the simulation.
 
 import time
 import math
+import pickle
 import numpy
 import scipy.sparse
 from tvb.basic.profile import TvbProfile
@@ -51,13 +52,23 @@ from tvb.basic.filters.chain import UIFilter, FilterChain
 from tvb.datatypes import cortex, connectivity, arrays, patterns
 from tvb.simulator import models, integrators, monitors, coupling
 
-from .common import psutil, get_logger, numpy_add_at
+from .common import psutil, get_logger, GroupMean, save_snapshot, load_snapshot
 from .history import SparseHistory, DenseHistory
 
 
 LOG = get_logger(__name__)
 
 
+def _pickled(obj):
+    "Pickle obj into a uint8 array, for storage in a snapshot."
+    return numpy.frombuffer(pickle.dumps(obj, 2), numpy.uint8)
+
+
+def _unpickled(array):
+    "Inverse of _pickled."
+    return pickle.loads(array.tobytes())
+
+
 # TODO with refactor, this becomes more of a builder, since iterator will account for
 # most of the runtime associated with a simulation.
 class Simulator(core.Type):
@@ -199,7 +210,45 @@ class Simulator(core.Type):
         order=9,
         doc="""The length of a simulation (default in milliseconds).""")
 
+    block_steps = basic.Integer(
+        label="Steps per block",
+        default=1,
+        required=False,
+        order=-1,
+        doc="""Number of integration steps advanced between history updates and
+        monitor dispatches. When larger than one, delayed coupling is evaluated for
+        a whole block of steps at once, which requires the block to be no longer
+        than the minimum delay (in steps) plus one; longer blocks are shortened.""")
+
+    numba_coupling = basic.Bool(
+        label="Numba coupling",
+        default=False,
+        required=False,
+        order=-1,
+        doc="""Evaluate delayed coupling with a compiled kernel which reads the
+        history buffer directly, instead of NumPy operations on the sparse delayed
+        state. Available for the Linear, Scaling, HyperbolicTangent, Difference and
+        Kuramoto coupling functions.""")
+
+    checkpoint_steps = basic.Integer(
+        label="Steps per checkpoint",
+        default=0,
+        required=False,
+        order=-1,
+        doc="""Number of integration steps between snapshots of the simulation
+        written to checkpoint_path, from which a later run can resume with the
+        restore method. No checkpoints are written when zero.""")
+
+    checkpoint_path = basic.String(
+        label="Checkpoint path",
+        default="",
+        required=False,
+        order=-1,
+        doc="""File to which checkpoints are written every checkpoint_steps steps,
+        each replacing the previous one.""")
+
     history = None # type: SparseHistory
+    _coupling_impl = None
 
     @property
     def good_history_shape(self):
@@ -247,6 +296,7 @@ class Simulator(core.Type):
             rm = self.surface.region_mapping
             unmapped = self.connectivity.unmapped_indices(rm)
             self._regmap = numpy.r_[rm, unmapped]
+            self._region_mean = GroupMean(self._regmap, self.connectivity.number_of_regions)
             self.number_of_nodes = self._regmap.shape[0]
             LOG.info('Surface simulation with %d vertices + %d non-cortical, %d total nodes',
                      rm.size, unmapped.size, self.number_of_nodes)
@@ -300,6 +350,9 @@ class Simulator(core.Type):
             self._configure_integrator_noise()
         # Setup history
         self._configure_history(self.initial_conditions)
+        self._configure_coupling()
+        if self.integrator.in_place:
+            self.integrator.configure_workspace(self.current_state.shape)
         # Configure Monitors to work with selected Model, etc...
         self._configure_monitors()
         # Estimate of memory usage.
@@ -310,9 +363,13 @@ class Simulator(core.Type):
     def _handle_random_state(self, random_state):
         if random_state is not None:
             if isinstance(self.integrator, integrators.IntegratorStochastic):
-                self.integrator.noise.random_stream.set_state(random_state)
-                msg = "random_state supplied with seed %s"
-                LOG.info(msg, self.integrator.noise.random_stream.get_state()[1][0])
+                noise = self.integrator.noise
+                noise.set_state(random_state)
+                if noise.bit_generator == 'RandomState':
+                    msg = "random_state supplied with seed %s"
+                    LOG.info(msg, noise.random_stream.get_state()[1][0])
+                else:
+                    LOG.info("random_state supplied for the %s bit generator", noise.bit_generator)
             else:
                 LOG.warn("random_state supplied for non-stochastic integration")
 
@@ -352,7 +409,7 @@ class Simulator(core.Type):
 
     def _loop_compute_node_coupling(self, step):
         "Compute delayed node coupling values."
-        coupling = self.coupling(step, self.history)
+        coupling = self._coupling_impl(step, self.history)
         if self.surface is not None:
             coupling = coupling[:, self._regmap]
         return coupling
@@ -367,10 +424,7 @@ class Simulator(core.Type):
     def _loop_update_history(self, step, n_reg, state):
         "Update history."
         if self.surface is not None and state.shape[1] > self.connectivity.number_of_regions:
-            region_state = numpy.zeros((n_reg, state.shape[0], state.shape[2]))         # temp (node, cvar, mode)
-            numpy_add_at(region_state, self._regmap, state.transpose((1, 0, 2)))        # sum within region
-            region_state /= numpy.bincount(self._regmap).reshape((-1, 1, 1))            # div by n node in region
-            state = region_state.transpose((1, 0, 2))                                   # (cvar, node, mode)
+            state = self._region_mean(state, axis=1)                                    # mean within region
         self.history.update(step, state)
 
     def _loop_monitor_output(self, step, state):
@@ -379,6 +433,63 @@ class Simulator(core.Type):
         if any(outputi is not None for outputi in output):
             return output
 
+    def _loop_compute_block_coupling(self, step, n_step):
+        "Compute delayed node coupling values for a block of steps."
+        coupling = self.coupling.block(step, n_step, self.history)
+        if self.surface is not None:
+            coupling = coupling[:, :, self._regmap]
+        return coupling
+
+    def _loop_update_history_block(self, step, n_reg, states):
+        "Update history with a block of states."
+        if self.surface is not None and states.shape[2] > self.connectivity.number_of_regions:
+            states = self._region_mean(states, axis=2)                                  # mean within region
+        self.history.update_block(step, states)
+
+    def _loop_monitor_block_output(self, step, states):
+        "Dispatch a block of states to monitors, returning outputs for steps with samples."
+        observed = self.model.observe(states.transpose((1, 0, 2, 3))).transpose((1, 0, 2, 3))
+        block_output = [monitor.record_block(step, observed) for monitor in self.monitors]
+        return [list(output) for output in zip(*block_output)
+                if any(outputi is not None for outputi in output)]
+
+    def _block_loop(self, n_steps, n_reg, local_coupling, stimulus):
+        "Integration loop which advances blocks of steps between history updates and monitor dispatches."
+        state = self.current_state
+        # coupling independent of current state can be computed for the whole block
+        block_coupling = (isinstance(self.coupling, coupling.SparseCoupling)
+                          and not self.coupling.pre_uses_current_state)
+        block_steps = self.block_steps
+        if block_coupling and block_steps > self.history.max_block_steps:
+            LOG.warning('Shortening blocks from %d to %d steps due to minimum delay.',
+                        block_steps, self.history.max_block_steps)
+            block_steps = self.history.max_block_steps
+        step, stop = self.current_step + 1, self.current_step + n_steps + 1
+        while step < stop:
+            n_block = min(block_steps, stop - step)
+            states = numpy.empty((n_block, ) + state.shape)
+            if block_coupling:
+                block_node_coupling = self._loop_compute_block_coupling(step, n_block)
+            for i in range(n_block):
+                if block_coupling:
+                    node_coupling = block_node_coupling[i]
+                else:
+                    node_coupling = self._loop_compute_node_coupling(step + i)
+                self._loop_update_stimulus(step + i, stimulus)
+                state = self.integrator.scheme(state, self.model.dfun, node_coupling, local_coupling, stimulus)
+                states[i] = state
+                if not block_coupling:
+                    self._loop_update_history(step + i, n_reg, state)
+            if block_coupling:
+                self._loop_update_history_block(step, n_reg, states)
+            block_output = self._loop_monitor_block_output(step, states)
+            if self.checkpoint_steps > 0 and (step + n_block - 1) // self.checkpoint_steps > (step - 1) // self.checkpoint_steps:
+                self.checkpoint(self.checkpoint_path, step + n_block - 1, state)
+            for output in block_output:
+                yield output
+            step += n_block
+        self.current_state = state
+
     def __call__(self, simulation_length=None, random_state=None):
         """
         Return an iterator which steps through simulation time, generating monitor outputs.
@@ -386,7 +497,8 @@ class Simulator(core.Type):
         See the run method for a convenient way to collect all output in one call.
 
         :param simulation_length: Length of the simulation to perform in ms.
-        :param random_state:  State of NumPy RNG to use for stochastic integration.
+        :param random_state:  State of NumPy RNG to use for stochastic integration, as returned
+                              by the noise's get_state.
         :return: Iterator over monitor outputs.
         """
 
@@ -398,6 +510,8 @@ class Simulator(core.Type):
         self._guesstimate_runtime()
         self._calculate_storage_requirement()
         self._handle_random_state(random_state)
+        if self.checkpoint_steps > 0 and not self.checkpoint_path:
+            raise ValueError('checkpoint_steps requires a checkpoint_path.')
         n_reg = self.connectivity.number_of_regions
         local_coupling = self._prepare_local_coupling()
         stimulus = self._prepare_stimulus()
@@ -405,19 +519,100 @@ class Simulator(core.Type):
 
         # integration loop
         n_steps = int(math.ceil(self.simulation_length / self.integrator.dt))
-        for step in range(self.current_step + 1, self.current_step + n_steps +1):
-            # needs implementing by hsitory + coupling?
-            node_coupling = self._loop_compute_node_coupling(step)
-            self._loop_update_stimulus(step, stimulus)
-            state = self.integrator.scheme(state, self.model.dfun, node_coupling, local_coupling, stimulus)
-            self._loop_update_history(step, n_reg, state)
-            output = self._loop_monitor_output(step, state)
-            if output is not None:
+        if self.block_steps > 1:
+            for output in self._block_loop(n_steps, n_reg, local_coupling, stimulus):
                 yield output
+        else:
+            for step in range(self.current_step + 1, self.current_step + n_steps +1):
+                # needs implementing by hsitory + coupling?
+                node_coupling = self._loop_compute_node_coupling(step)
+                self._loop_update_stimulus(step, stimulus)
+                state = self.integrator.scheme(state, self.model.dfun, node_coupling, local_coupling, stimulus)
+                self._loop_update_history(step, n_reg, state)
+                output = self._loop_monitor_output(step, state)
+                if self.checkpoint_steps > 0 and step % self.checkpoint_steps == 0:
+                    self.checkpoint(self.checkpoint_path, step, state)
+                if output is not None:
+                    yield output
+            self.current_state = state
 
-        self.current_state = state
         self.current_step = self.current_step + n_steps
 
+    _checkpoint_monitor_attrs = '_stock', '_interim_stock', '_state'
+
+    def checkpoint(self, path, step=None, state=None):
+        """
+        Write a snapshot of the simulation to path, as an uncompressed npz file, from
+        which a configured simulator of the same structure resumes with restore. The
+        snapshot holds the history, current state and step, the noise RNG state and
+        pending variates, and the accumulated state of the monitors.
+
+        :param path: File to write, replaced atomically if it exists.
+        :param step: Step of the snapshot, by default the current step.
+        :param state: State at that step, by default the current state.
+        """
+        step = self.current_step if step is None else step
+        state = self.current_state if state is None else state
+        arrays = {'current_step': numpy.array(step),
+                  'current_state': state,
+                  'history': self.history.buffer}
+        groups = set()
+        for i, monitor in enumerate(self.monitors):
+            for attr in self._checkpoint_monitor_attrs:
+                if isinstance(monitor.__dict__.get(attr), numpy.ndarray):
+                    arrays['monitor.%d.%s' % (i, attr)] = monitor.__dict__[attr]
+            group = getattr(monitor, '_group', None)
+            if group is not None and group not in groups:
+                groups.add(group)
+                arrays['monitor.%d._group._source_sum' % (i, )] = group._source_sum
+        if isinstance(self.integrator, integrators.IntegratorStochastic):
+            noise = self.integrator.noise
+            arrays['noise.random_stream'] = _pickled(noise.random_stream.get_state())
+            if noise._rng is not None and noise._rng is not noise.random_stream:
+                arrays['noise.bit_generator'] = _pickled(noise._rng.bit_generator.state)
+            if noise._eta is not None:
+                arrays['noise._eta'] = noise._eta
+            if noise._block is not None:
+                arrays['noise._block'] = noise._block
+                arrays['noise._block_index'] = numpy.array(noise._block_index)
+        save_snapshot(path, arrays)
+        LOG.debug('Checkpoint of step %d written to %s', step, path)
+
+    def restore(self, path):
+        """
+        Resume the simulation from a snapshot written by checkpoint. The simulator must be
+        configured with the same structure as the one checkpointed; continuing it is then
+        bit-identical to continuing the checkpointed run. Arrays of the snapshot are memory
+        mapped copy-on-write rather than read, except for the history, which is copied once
+        into the simulator's ring buffer.
+
+        :param path: File written by checkpoint.
+        """
+        arrays = load_snapshot(path)
+        self.current_step = int(arrays['current_step'])
+        self.current_state = arrays['current_state']
+        self.history.buffer = arrays['history']
+        for key, value in arrays.items():
+            if key.startswith('monitor.'):
+                _, i, attr = key.split('.', 2)
+                monitor = self.monitors[int(i)]
+                if attr == '_group._source_sum':
+                    monitor._group._source_sum = value
+                else:
+                    setattr(monitor, attr, value)
+        if 'noise.random_stream' in arrays:
+            noise = self.integrator.noise
+            noise.random_stream.set_state(_unpickled(arrays['noise.random_stream']))
+            noise.configure_stream()
+            if 'noise.bit_generator' in arrays:
+                noise._rng.bit_generator.state = _unpickled(arrays['noise.bit_generator'])
+            if 'noise._eta' in arrays:
+                noise._eta = arrays['noise._eta']
+            if 'noise._block' in arrays:
+                noise._block = arrays['noise._block']
+                noise._block_index = int(arrays['noise._block_index'])
+        LOG.info('Restored step %d from %s', self.current_step, path)
+
     def _configure_history(self, initial_conditions):
         """
         Set initial conditions for the simulation using either the provided
@@ -470,21 +665,27 @@ class Simulator(core.Type):
         self.current_state = history[self.current_step % self.horizon].copy()
         LOG.debug('initial state has shape %r' % (self.current_state.shape, ))
         if self.surface is not None and history.shape[2] > self.connectivity.number_of_regions:
-            n_reg = self.connectivity.number_of_regions
-            (nt, ns, _, nm), ax = history.shape, (2, 0, 1, 3)
-            region_history = numpy.zeros((nt, ns, n_reg, nm))
-            numpy_add_at(region_history.transpose(ax), self._regmap, history.transpose(ax))
-            region_history /= numpy.bincount(self._regmap).reshape((-1, 1))
-            history = region_history
+            history = self._region_mean(history, axis=2)
         # create history query implementation
-        self.history = SparseHistory(
+        self.history = self._create_history()
+        # initialize its buffer
+        self.history.initialize(history)
+
+    def _create_history(self):
+        "Create the history implementation used to query delayed state."
+        return SparseHistory(
             self.connectivity.weights,
             self.connectivity.idelays,
             self.model.cvar,
             self.model.number_of_modes
         )
-        # initialize its buffer
-        self.history.initialize(history)
+
+    def _configure_coupling(self):
+        "Select the implementation evaluating delayed coupling."
+        self._coupling_impl = self.coupling
+        if self.numba_coupling:
+            from ._numba.coupling import NbSparseCoupling
+            self._coupling_impl = NbSparseCoupling(self.coupling, self.history)
 
     def _configure_integrator_noise(self):
         """
@@ -544,6 +745,7 @@ class Simulator(core.Type):
         # Configure monitors
         for monitor in self.monitors:
             monitor.config_for_sim(self)
+        monitors.Projection.group_lazy(self.monitors)
 
     def _configure_stimuli(self):
         """ Configure the defined Stimuli for this Simulator """
@@ -731,23 +933,37 @@ class Simulator(core.Type):
         LOG.info("Calculated storage requirement for simulation: %d " % int(strgreq))
         self._storage_requirement = int(strgreq)
 
-    def run(self, **kwds):
-        "Convenience method to call the simulator with **kwds and collect output data."
+    def run(self, sinks=None, **kwds):
+        """
+        Convenience method to call the simulator with **kwds and collect output data.
+
+        Outputs of monitors with a corresponding sink in ``sinks`` (see `tvb.simulator.sinks`)
+        are streamed to the sink instead of held in memory, and returned lazily loaded.
+
+        """
+        sinks = list(sinks or [])
+        sinks += [None] * (len(self.monitors) - len(sinks))
         ts, xs = [], []
         for _ in self.monitors:
             ts.append([])
             xs.append([])
         wall_time_start = time.time()
         for data in self(**kwds):
-            for tl, xl, t_x in zip(ts, xs, data):
+            for tl, xl, sink, t_x in zip(ts, xs, sinks, data):
                 if t_x is not None:
                     t, x = t_x
-                    tl.append(t)
-                    xl.append(x)
+                    if sink is not None:
+                        sink.append(t, x)
+                    else:
+                        tl.append(t)
+                        xl.append(x)
         elapsed_wall_time = time.time() - wall_time_start
         LOG.info("%.3f s elapsed, %.3fx real time", elapsed_wall_time,
                  elapsed_wall_time * 1e3 / self.simulation_length)
-        for i in range(len(ts)):
-            ts[i] = numpy.array(ts[i])
-            xs[i] = numpy.array(xs[i])
+        for i, sink in enumerate(sinks):
+            if sink is not None:
+                ts[i], xs[i] = sink.close()
+            else:
+                ts[i] = numpy.array(ts[i])
+                xs[i] = numpy.array(xs[i])
         return list(zip(ts, xs))
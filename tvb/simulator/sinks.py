@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+
+"""
+Sinks which stream monitor samples to disk during a simulation.
+
+`Simulator.run` collects monitor outputs in memory, which is not feasible for
+long surface simulations with e.g. a Raw or EEG monitor. A sink instead buffers
+``chunk_size`` samples at a time and appends them to a chunked HDF5 dataset or
+a growable ``.npy`` file. Once closed, the samples are available as lazily
+loaded arrays, or as the monitor's `TimeSeries`::
+
+    sink = sinks.NpySink('raw.npy')
+    sim.run(simulation_length=1e5, sinks=[sink])
+    ts = sink.time_series(sim.monitors[0])
+
+"""
+
+import struct
+import numpy
+from tvb.basic.traits.types_mapped_light import ChunkedArray
+from tvb.datatypes.time_series import TimeSeries
+from .common import get_logger
+
+try:
+    import h5py as hdf5
+except ImportError:
+    hdf5 = None
+
+
+LOG = get_logger(__name__)
+
+
+class MonitorSink(object):
+    "Base class for sinks receiving the (time, data) samples of one monitor."
+
+    def __init__(self, chunk_size=1024):
+        self.chunk_size = chunk_size
+        self.n_sample = 0
+        self._times = []
+        self._data = []
+        self._result = None
+
+    def append(self, time, data):
+        "Buffer a sample, writing the buffer once it holds chunk_size samples."
+        self._times.append(time)
+        self._data.append(data)
+        if len(self._times) == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        "Write buffered samples."
+        if self._times:
+            self._write(numpy.array(self._times), numpy.array(self._data))
+            self.n_sample += len(self._times)
+            self._times, self._data = [], []
+
+    def close(self):
+        "Write remaining samples and return the lazily loaded (time, data) arrays."
+        if self._result is None:
+            self.flush()
+            self._result = self._read()
+            LOG.info('%s closed with %d samples', self.__class__.__name__, self.n_sample)
+        return self._result
+
+    def time_series(self, monitor, time_series_class=TimeSeries, **kwds):
+        "Create a TimeSeries of the monitor on the samples, read on demand by chunk, with further traits in kwds."
+        time, data = self.close()
+        kwds.setdefault('title', monitor.__class__.__name__)
+        data = ChunkedArray(data, chunk_size=self.chunk_size)
+        time_series = time_series_class(time=time, data=data, sample_period=monitor.period, **kwds)
+        time_series.configure()
+        return time_series
+
+    def _write(self, times, data):
+        raise NotImplementedError
+
+    def _read(self):
+        raise NotImplementedError
+
+
+class H5Sink(MonitorSink):
+    """
+    Appends samples to resizable ``time`` and ``data`` datasets of an HDF5
+    file, chunked along time by ``chunk_size`` samples.
+
+    """
+
+    def __init__(self, path, chunk_size=1024):
+        if hdf5 is None:
+            raise ImportError('H5Sink requires h5py.')
+        super(H5Sink, self).__init__(chunk_size)
+        self.path = path
+        self._file = hdf5.File(path, 'w')
+
+    def _write(self, times, data):
+        if 'data' not in self._file:
+            self._file.create_dataset('time', shape=(0, ), maxshape=(None, ), dtype=times.dtype,
+                                      chunks=(self.chunk_size, ))
+            self._file.create_dataset('data', shape=(0, ) + data.shape[1:], maxshape=(None, ) + data.shape[1:],
+                                      dtype=data.dtype, chunks=(self.chunk_size, ) + data.shape[1:])
+        for key, value in (('time', times), ('data', data)):
+            dataset = self._file[key]
+            dataset.resize(self.n_sample + value.shape[0], axis=0)
+            dataset[self.n_sample:] = value
+
+    def _read(self):
+        self._file.close()
+        if self.n_sample == 0:
+            return numpy.array([]), numpy.array([])
+        self._file = hdf5.File(self.path, 'r')
+        return self._file['time'], self._file['data']
+
+
+class NpySink(MonitorSink):
+    """
+    Appends samples to a ``.npy`` file, whose header is rewritten with the
+    final shape on close, so that the data can be memory mapped. Times are
+    written likewise to ``time_path``, by default the data path with a
+    ``_time`` suffix.
+
+    """
+
+    # fixed header size, so that the shape can be rewritten in place
+    header_size = 128
+
+    def __init__(self, path, chunk_size=1024, time_path=None):
+        super(NpySink, self).__init__(chunk_size)
+        self.path = path
+        self.time_path = time_path or (path[:-4] if path.endswith('.npy') else path) + '_time.npy'
+        self._files = {self.time_path: open(self.time_path, 'wb'), self.path: open(self.path, 'wb')}
+        self._dtypes = {}
+
+    def _header(self, dtype, shape):
+        header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (
+            numpy.lib.format.dtype_to_descr(dtype), tuple(int(n) for n in shape))
+        header = header.ljust(self.header_size - 10 - 1) + '\n'
+        return numpy.lib.format.magic(1, 0) + struct.pack('<H', len(header)) + header.encode('latin1')
+
+    def _write(self, times, data):
+        for path, value in ((self.time_path, times), (self.path, data)):
+            file_ = self._files[path]
+            if path not in self._dtypes:
+                self._dtypes[path] = value.dtype, value.shape[1:]
+                file_.write(self._header(value.dtype, (0, ) + value.shape[1:]))
+            file_.write(numpy.ascontiguousarray(value, dtype=self._dtypes[path][0]).tobytes())
+
+    def _read(self):
+        arrays = []
+        for path in (self.time_path, self.path):
+            file_ = self._files[path]
+            dtype, sample_shape = self._dtypes.get(path, (numpy.dtype('d'), ()))
+            file_.seek(0)
+            file_.write(self._header(dtype, (self.n_sample, ) + sample_shape))
+            file_.close()
+            arrays.append(numpy.load(path, mmap_mode='r' if self.n_sample else None))
+        return tuple(arrays)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Tests for the cross-correlation analyzer.
+
+"""
+
+import numpy
+from scipy.signal import correlate
+from tvb.tests.library.base_testcase import BaseTestCase
+from tvb.analyzers.cross_correlation import CrossCorrelate
+from tvb.datatypes.time_series import TimeSeries
+
+
+class TestCrossCorrelate(BaseTestCase):
+
+    def _assert_matches_correlate(self, n_time, max_lag=0.0):
+        data = numpy.random.RandomState(42).randn(n_time, 2, 5, 1)
+        time_series = TimeSeries(data=data, sample_period=0.5)
+        time_series.configure()
+        cross_corr = CrossCorrelate(time_series=time_series, max_lag=max_lag, block_nbytes=2 ** 16).evaluate()
+        centre = n_time // 2 + numpy.round(cross_corr.time / 0.5).astype(int)
+        for var in range(2):
+            x = data[:, var, :, 0] - data[:, var, :, 0].mean(axis=0)
+            for n1 in range(5):
+                for n2 in range(5):
+                    expected = correlate(x[:, n1], x[:, n2], mode="same")[centre]
+                    assert numpy.allclose(cross_corr.array_data[:, n1, n2, var, 0], expected)
+
+    def test_all_lags(self):
+        # many lags, correlated in the spectral domain
+        self._assert_matches_correlate(600)
+        self._assert_matches_correlate(601)
+
+    def test_max_lag(self):
+        # few lags, correlated by products over time
+        self._assert_matches_correlate(600, max_lag=5.0)
+        self._assert_matches_correlate(15, max_lag=5.0)
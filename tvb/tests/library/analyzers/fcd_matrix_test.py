@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Tests for the FCD analyzer.
+
+"""
+
+import numpy
+from tvb.tests.library.base_testcase import BaseTestCase
+from tvb.analyzers import fcd_matrix
+
+
+def _loop_fcd(data, sp, sw, n_window):
+    "FCD with one correlation matrix per window and per pair of windows."
+    fcs, start = [], -sp
+    for _ in range(n_window):
+        start += sp
+        fc = numpy.corrcoef(data[int(start):int(start + sw) + 1].T)
+        fcs.append(fc[numpy.triu_indices(len(fc), 1)])
+    return numpy.corrcoef(fcs)
+
+
+class TestWindowedFcd(BaseTestCase):
+
+    def _data(self):
+        # offset random walks, for which cumulative sums must be well conditioned
+        return numpy.random.RandomState(42).randn(400, 12).cumsum(axis=0) + 50.0
+
+    def test_matches_loop(self):
+        data, sp, sw, n_window = self._data(), 7.3, 40.6, 49
+        starts, stops = fcd_matrix.window_bounds(sp, sw, n_window)
+        expected = _loop_fcd(data, sp, sw, n_window)
+        assert numpy.allclose(fcd_matrix.windowed_fcd(data, starts, stops), expected)
+        assert numpy.allclose(fcd_matrix.windowed_fcd(data, starts, stops, edge_chunk=10), expected)
+
+    def test_block_nbytes(self):
+        data, sp, sw, n_window = self._data(), 7.3, 40.6, 49
+        starts, stops = fcd_matrix.window_bounds(sp, sw, n_window)
+        expected = _loop_fcd(data, sp, sw, n_window)
+        # a budget of some ten pairs of cumulative cross products
+        block_nbytes = 10 * 3 * 8 * data.shape[0]
+        chunks = [fc.shape for fc in fcd_matrix.windowed_fc(data, starts, stops, block_nbytes=block_nbytes)]
+        assert 1 < len(chunks) and all(shape[1] <= 10 for shape in chunks)
+        assert sum(shape[1] for shape in chunks) == 12 * 11 // 2
+        assert numpy.allclose(fcd_matrix.windowed_fcd(data, starts, stops, block_nbytes=block_nbytes), expected)
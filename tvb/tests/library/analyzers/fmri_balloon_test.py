@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Tests for the Balloon-Windkessel BOLD model.
+
+"""
+
+import numpy
+from tvb.tests.library.base_testcase import BaseTestCase
+from tvb.datatypes import time_series
+from tvb.simulator import integrators
+from tvb.analyzers.fmri_balloon import BalloonModel
+
+
+class TestBalloonModel(BaseTestCase):
+
+    def _time_series(self, n_time=300, n_node=5, n_mode=2):
+        data = numpy.random.RandomState(42).randn(n_time, 2, n_node, n_mode)
+        return time_series.TimeSeries(data=data, sample_period=1.0, time=numpy.arange(n_time) * 1.0)
+
+    def _input(self, data, transformation):
+        "Neural input (time, 1, node, mode) of the state variable read by the balloon model."
+        neural_activity = {"none": lambda: data[:, 0],
+                           "sum": lambda: data.sum(axis=1),
+                           "abs_diff": lambda: abs(numpy.diff(data, axis=0))[:, 0]}[transformation]()
+        return neural_activity[:, numpy.newaxis]
+
+    def _reference(self, bm, transformation):
+        "Integrate all time points at once, storing the whole balloon model state."
+        neural_activity = self._input(bm.time_series.data, transformation)
+        neural_activity = neural_activity - neural_activity.mean(axis=0)
+        state = numpy.zeros((neural_activity.shape[0], 4) + neural_activity.shape[2:])
+        state[0, 1:] = 1.0
+        bm.integrator.dt = bm.dt
+        bm.integrator.configure()
+        for step in range(1, state.shape[0]):
+            state[step] = bm.integrator.scheme(state[step - 1], bm.balloon_dfun, neural_activity[step], 0.0, 0.0)
+        return bm.bold_signal(state[:, 2:3], state[:, 3:4], bm.compute_derived_parameters())
+
+    def test_blocks(self):
+        ts = self._time_series()
+        for transformation in ("none", "sum", "abs_diff"):
+            for bold_model in ("nonlinear", "linear"):
+                bm = BalloonModel(time_series=ts, dt=0.001, neural_input_transformation=transformation,
+                                  bold_model=bold_model, block_nbytes=2 ** 12)
+                bold = bm.evaluate().data
+                assert bold.shape == (ts.data.shape[0] - (transformation == "abs_diff"), 1, 5, 2)
+                assert numpy.allclose(bold, self._reference(bm, transformation), rtol=1e-10, atol=1e-14)
+
+    def test_input_transformation(self):
+        ts = self._time_series()
+        for transformation in ("none", "sum", "abs_diff"):
+            neural_activity, t_int = BalloonModel().input_transformation(ts, transformation)
+            assert numpy.allclose(neural_activity, self._input(ts.data, transformation))
+            assert t_int.shape[0] == neural_activity.shape[0]
+
+    def test_numba(self):
+        ts = self._time_series()
+        for integrator in (integrators.HeunDeterministic, integrators.EulerDeterministic):
+            bold = [BalloonModel(time_series=ts, dt=0.001, integrator=integrator(), block_nbytes=2 ** 12,
+                                 numba_integration=numba_integration).evaluate().data
+                    for numba_integration in (False, True)]
+            assert numpy.allclose(bold[0], bold[1], rtol=1e-10, atol=1e-14)
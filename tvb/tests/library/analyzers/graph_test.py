@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Tests for the graph analyses.
+
+"""
+
+import numpy
+import scipy.sparse
+from tvb.tests.library.base_testcase import BaseTestCase
+from tvb.analyzers import graph
+
+
+class _WhiteMatter(object):
+
+    def __init__(self, weights):
+        self.weights = weights
+
+
+class TestLesion(BaseTestCase):
+
+    def _white_matter(self, n=30, density=0.1):
+        rs = numpy.random.RandomState(42)
+        weights = rs.rand(n, n) * (rs.rand(n, n) < density)
+        numpy.fill_diagonal(weights, 0.0)
+        return _WhiteMatter(weights)
+
+    def test_lesion_graph(self):
+        white_matter = self._white_matter()
+        lesion = graph.LesionGraph(white_matter.weights)
+        weights = white_matter.weights.copy()
+        for node in numpy.random.RandomState(1).permutation(30)[:20]:
+            lesion.remove(node)
+            weights[node] = weights[:, node] = 0.0
+            assert numpy.allclose(lesion.efficiency, graph.efficiency_bin(weights))
+            assert lesion.largest_component == graph.get_components_sizes(weights)
+            assert numpy.allclose(lesion.degree, (weights > 0).sum(axis=0) + (weights > 0).sum(axis=1))
+            assert numpy.allclose(lesion.strength, weights.sum(axis=0) + weights.sum(axis=1))
+
+    def test_largest_component(self):
+        weights = numpy.zeros((4, 4))
+        weights[1, 2] = weights[2, 3] = 1.0
+        assert graph.get_components_sizes(weights) == 3
+
+    def test_random_deletion_ensemble(self):
+        white_matter = self._white_matter()
+        sequences = [numpy.random.RandomState(i).permutation(30)[:28] for i in range(3)]
+        serial = graph.random_deletion_ensemble(white_matter, sequences, 30, n_proc=1)
+        parallel = graph.random_deletion_ensemble(white_matter, sequences, 30, n_proc=2)
+        assert serial[0].shape == (3, 30, 28)
+        assert serial[3].shape == (3, 28)
+        for i, sequence in enumerate(sequences):
+            single = graph.sequential_random_deletion(white_matter, sequence, 30)
+            for stacked, stacked_parallel, result in zip(serial, parallel, single):
+                assert numpy.allclose(stacked[i], result)
+                assert numpy.allclose(stacked_parallel[i], result)
+
+    def test_targeted_deletion(self):
+        white_matter = self._white_matter(20, 0.2)
+        strength, degree, bc, efficiency, component = graph.sequential_targeted_deletion(white_matter, 20)
+        assert bc.shape == (20, 18)
+        assert efficiency.shape == component.shape == (18, 3)
+        assert (numpy.diff(component, axis=0) <= 0).all()
+
+
+class TestSparseMetrics(BaseTestCase):
+
+    def _adjacency(self, n=60, density=0.05):
+        adjacency = (numpy.random.RandomState(42).rand(n, n) < density) * 1.0
+        numpy.fill_diagonal(adjacency, 0.0)
+        return adjacency
+
+    def test_betweenness(self):
+        adjacency = self._adjacency()
+        for matrix in (adjacency, numpy.maximum(adjacency, adjacency.T)):
+            expected = graph.betweenness_bin(matrix)
+            assert expected.max() > 0
+            # blocks of a few sources
+            assert numpy.allclose(graph.betweenness_sparse(matrix, block_nbytes=33 * 60 * 7), expected)
+            assert numpy.allclose(graph.betweenness_bin(scipy.sparse.csr_matrix(matrix)), expected)
+
+    def test_efficiency(self):
+        adjacency = self._adjacency()
+        sparse = scipy.sparse.csc_matrix(adjacency)
+        assert numpy.allclose(graph.efficiency_bin(sparse), graph.efficiency_bin(adjacency))
+        assert numpy.allclose(graph.efficiency_bin(sparse, compute_local_efficiency=True),
+                              graph.efficiency_bin(adjacency, compute_local_efficiency=True))
+        assert graph.get_components_sizes(sparse) == graph.get_components_sizes(adjacency)
+
+    def test_self_connections(self):
+        adjacency = self._adjacency()
+        looped = adjacency.copy()
+        numpy.fill_diagonal(looped, 1.0)
+        assert numpy.allclose(graph.efficiency_bin(looped), graph.efficiency_bin(adjacency))
+        assert numpy.allclose(graph.inverse_distance_sum_sparse(looped), graph.distance_inv(adjacency).sum())
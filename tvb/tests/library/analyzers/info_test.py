@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Tests for the information theoretic analyses.
+
+"""
+
+import numpy
+from tvb.tests.library.base_testcase import BaseTestCase
+from tvb.analyzers.info import sampen
+
+
+def _brute_counts(y, m, r):
+    "Template pair matches of lengths m and m + 1, comparing all pairs."
+    counts = []
+    for n in (m, m + 1):
+        templates = numpy.array([y[i:i + n] for i in range(y.size - n + 1)])
+        distance = abs(templates[:, numpy.newaxis] - templates).max(axis=-1)
+        counts.append(numpy.triu(distance < r, 1).sum())
+    return counts
+
+
+class TestSampen(BaseTestCase):
+
+    def _data(self):
+        return numpy.random.RandomState(42).randn(400, 3).cumsum(axis=0) * [1.0, 10.0, 0.1]
+
+    def test_counts(self):
+        y = self._data()[:, 0]
+        for m, r in ((2, 0.5), (3, 1.0)):
+            e, p, c2, c1 = sampen(y, m=m, r=r, info=True)
+            assert [c1, c2] == _brute_counts(y, m, r)
+            assert numpy.allclose(e, -numpy.log(c2 * 1.0 / c1))
+
+    def test_nodes_and_scales(self):
+        data = self._data()
+        taus = numpy.r_[1:4]
+        e = sampen(data, taus=taus, qse=True)
+        assert e.shape == (3, 3)
+        for i in range(3):
+            assert numpy.allclose(e[:, i], sampen(data[:, i], taus=taus, qse=True))
+        assert sampen(data[:, numpy.newaxis, :, numpy.newaxis]).shape == (1, 3, 1)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Tests for the node coherence analyzer.
+
+"""
+
+import numpy
+from tvb.tests.library.base_testcase import BaseTestCase
+from tvb.analyzers.node_coherence import coherence, coherence_blocked, hamming, NodeCoherence
+from tvb.datatypes.time_series import TimeSeries
+
+
+class TestNodeCoherence(BaseTestCase):
+
+    def _data(self):
+        data = numpy.random.RandomState(42).randn(1000, 2, 7, 1)
+        data[:, :, 3] += data[:, :, 2]
+        return data
+
+    def test_window_averaged(self):
+        data = self._data()
+        coh, freq = coherence(data, 1000.0, nfft=128)
+        x, y = [numpy.fft.fft(data[:896, 0, i, 0].reshape((7, 128)) * hamming(128)) for i in (2, 3)]
+        expected = abs((x * y.conj()).mean(axis=0)) ** 2 / ((abs(x) ** 2).mean(axis=0) * (abs(y) ** 2).mean(axis=0))
+        assert numpy.allclose(coh[:, 2, 3, 0, 0], expected[1:64])
+        assert numpy.allclose(freq, numpy.r_[1:64] / 128.0)
+
+    def test_blocked(self):
+        data = self._data()
+        for imag in (False, True):
+            coh, freq = coherence(data, 1000.0, nfft=128, imag=imag)
+            coh_, freq_ = coherence_blocked(data, 1000.0, nfft=128, imag=imag, block_nbytes=16 * 63 * 9)
+            assert numpy.allclose(coh, coh_)
+            assert numpy.allclose(freq, freq_)
+
+    def test_memory_budget(self):
+        time_series = TimeSeries(data=self._data(), sample_period=1.0)
+        time_series.configure()
+        coh = NodeCoherence(time_series=time_series, nfft=128).evaluate().array_data
+        coh_ = NodeCoherence(time_series=time_series, nfft=128, memory_budget=2 ** 10).evaluate().array_data
+        assert numpy.allclose(coh, coh_)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Tests for the complex coherence analyzer.
+
+"""
+
+import numpy
+from tvb.tests.library.base_testcase import BaseTestCase
+from tvb.analyzers.node_complex_coherence import NodeComplexCoherence
+from tvb.datatypes.time_series import TimeSeries
+
+
+def _loop_cross_spectrum(data, epoch_tpts, seg_tpts, seg_shift_tpts):
+    "Cross-spectrum averaged over windowed segments of epochs, less the outer product of the mean spectrum."
+    cs, av, n = 0.0, 0.0, 0
+    for epoch in range(data.shape[0] // epoch_tpts):
+        for start in range(0, epoch_tpts - seg_tpts + 1, seg_shift_tpts):
+            segment = data[epoch * epoch_tpts + start:epoch * epoch_tpts + start + seg_tpts]
+            spectrum = numpy.fft.fft(segment * numpy.hanning(seg_tpts)[:, numpy.newaxis], axis=0)
+            spectrum = spectrum[:seg_tpts // 2 + 1].T
+            cs = cs + spectrum[:, numpy.newaxis] * spectrum[numpy.newaxis].conj()
+            av, n = av + spectrum, n + 1
+    av = av / n
+    return cs / n - av[:, numpy.newaxis] * av[numpy.newaxis].conj()
+
+
+class TestNodeComplexCoherence(BaseTestCase):
+
+    def _time_series(self):
+        time_series = TimeSeries(data=numpy.random.RandomState(42).randn(2000, 2, 6, 1), sample_period=1.0)
+        time_series.configure()
+        return time_series
+
+    def test_matches_loop(self):
+        time_series = self._time_series()
+        spectra = NodeComplexCoherence(time_series=time_series, segment_length=200.0, segment_shift=100.0,
+                                       block_nbytes=2 ** 12).evaluate()
+        expected = _loop_cross_spectrum(time_series.data.mean(axis=(1, 3)), 1000, 200, 100)
+        assert numpy.allclose(spectra.cross_spectrum, expected)
+        diagonal = numpy.sqrt(expected[range(6), range(6)].real)
+        assert numpy.allclose(spectra.array_data, expected / (diagonal[:, numpy.newaxis] * diagonal))
+
+    def test_segments(self):
+        spectra = NodeComplexCoherence(time_series=self._time_series(), average_segments=False).evaluate()
+        assert spectra.cross_spectrum.shape == (6, 6, 251, 3)
+        assert numpy.allclose(abs(spectra.array_data[range(6), range(6)]), 1.0)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Tests for the principal and independent component analyzers.
+
+"""
+
+import numpy
+from tvb.tests.library.base_testcase import BaseTestCase
+from tvb.analyzers import ica, pca
+from tvb.datatypes import time_series
+
+
+class TestPrincipalComponents(BaseTestCase):
+
+    def _data(self, n_time=400, n_svar=2, n_node=30, n_mode=2):
+        rs = numpy.random.RandomState(42)
+        scales = numpy.r_[8.0, 5.0, 3.0, 2.0][:, numpy.newaxis]
+        mixing = rs.randn(n_svar, n_mode, 4, n_node) * scales
+        latent = rs.randn(n_time, n_svar, n_mode, 4)
+        noise = 0.1 * rs.randn(n_time, n_svar, n_node, n_mode)
+        return numpy.einsum('tvmk,vmkn->tvnm', latent, mixing) + noise + 10.0
+
+    def _reference(self, data):
+        "Right singular vectors and fractions of the standardized slice, as matplotlib.mlab.PCA."
+        standardized = (data - data.mean(axis=0)) / data.std(axis=0)
+        _, s, vectors = numpy.linalg.svd(standardized, full_matrices=False)
+        return vectors, s ** 2 / (s ** 2).sum()
+
+    def test_principal_components(self):
+        data = self._data()
+        # the covariance fits in the larger blocks only
+        for n_comp, block_nbytes in ((None, 2 ** 26), (4, 2 ** 26), (4, 10000)):
+            weights, _, fractions, _, _ = pca.principal_components(data, n_comp, block_nbytes=block_nbytes)
+            n = n_comp or 30
+            assert weights.shape == (n, 30, 2, 2)
+            assert fractions.shape == (n, 2, 2)
+            for var in range(2):
+                for mode in range(2):
+                    vectors, expected = self._reference(data[:, var, :, mode])
+                    assert numpy.allclose(fractions[:, var, mode], expected[:n])
+                    cosines = (vectors[:4] * weights[:4, :, var, mode]).sum(axis=1)
+                    assert numpy.allclose(abs(cosines), 1.0)
+
+    def test_project_components(self):
+        data = self._data()
+        weights, _, _, mean, scale = pca.principal_components(data, 3)
+        components = pca.project_components(data, weights, mean, scale, block_nbytes=10000)
+        assert components.shape == (400, 3, 2, 2)
+        expected = ((data[:, 1, :, 0] - mean[1, :, 0]) / scale[1, :, 0]).dot(weights[:, :, 1, 0].T)
+        assert numpy.allclose(components[:, :, 1, 0], expected)
+
+    def test_analyzer(self):
+        ts = time_series.TimeSeries(data=self._data(n_time=20, n_node=30))
+        analyzer = pca.PCA(time_series=ts, n_components=5)
+        assert analyzer.result_shape(ts.data.shape) == [(5, 30, 2, 2), (5, 2, 2)]
+        result = analyzer.evaluate()
+        assert result.weights.shape == (5, 30, 2, 2)
+        result.configure()
+        assert result.component_time_series.shape == (20, 2, 5, 2)
+        assert result.normalised_component_time_series.shape == (20, 2, 5, 2)
+
+
+class TestIndependentComponents(BaseTestCase):
+
+    def test_analyzer(self):
+        rs = numpy.random.RandomState(42)
+        time = numpy.r_[:1000]
+        sources = numpy.c_[numpy.sign(numpy.sin(time * 0.05)), rs.laplace(size=time.size)]
+        data = sources.dot(rs.randn(2, 10)) + 0.01 * rs.randn(time.size, 10)
+        ts = time_series.TimeSeries(data=data[:, numpy.newaxis, :, numpy.newaxis])
+        result = ica.fastICA(time_series=ts, n_components=2).evaluate()
+        assert result.prewhitening_matrix.shape == (2, 10, 1, 1)
+        assert result.unmixing_matrix.shape == (2, 2, 1, 1)
+        # each source is recovered, up to sign and scale
+        correlation = numpy.corrcoef(sources.T, result.component_time_series[:, :, 0, 0].T)[:2, 2:]
+        assert numpy.allclose(abs(correlation).max(axis=1), 1.0, atol=1e-3)
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Tests for the wavelet analyzer.
+
+"""
+
+import os
+import numpy
+import scipy.signal
+from tvb.tests.library.base_testcase import BaseTestCase
+from tvb.analyzers.wavelet import convolve_decimated, ContinuousWaveletTransform
+from tvb.basic.traits.types_basic import Range
+from tvb.datatypes.time_series import TimeSeries
+
+
+class TestContinuousWaveletTransform(BaseTestCase):
+
+    def _time_series(self):
+        time_series = TimeSeries(data=numpy.random.RandomState(42).randn(999, 2, 3, 1), sample_period=1.0)
+        time_series.configure()
+        return time_series
+
+    def test_convolve_decimated(self):
+        data = self._time_series().data[:, 0, :, 0]
+        kernels = [numpy.exp(2j * numpy.arange(-n, n + 1)) for n in (3, 40, 600)]
+        for step in (1, 7):
+            n_out = data.shape[0] // step
+            for kernel, coef in zip(kernels, convolve_decimated(data, kernels, step, n_out)):
+                for i in range(data.shape[1]):
+                    expected = scipy.signal.convolve(data[:, i], kernel, 'same')[::step][:n_out]
+                    assert numpy.allclose(coef[:, i], expected)
+
+    def test_complex64_file(self, tmpdir):
+        path = os.path.join(str(tmpdir), 'coef.npy')
+        frequencies = Range(lo=0.008, hi=0.06, step=0.01)
+        expected = ContinuousWaveletTransform(time_series=self._time_series(), frequencies=frequencies,
+                                              sample_period=4.0).evaluate().array_data
+        coef = ContinuousWaveletTransform(time_series=self._time_series(), frequencies=frequencies,
+                                          sample_period=4.0, coefficients_dtype='complex64',
+                                          coefficients_path=path).evaluate().array_data
+        assert isinstance(coef, numpy.memmap)
+        assert coef.dtype == numpy.complex64
+        assert numpy.allclose(numpy.load(path), expected, atol=1e-5)
+
+    def test_channel_blocks(self):
+        frequencies = Range(lo=0.008, hi=0.06, step=0.01)
+        expected = ContinuousWaveletTransform(time_series=self._time_series(), frequencies=frequencies,
+                                              sample_period=4.0).evaluate().array_data
+        # one channel per block
+        coef = ContinuousWaveletTransform(time_series=self._time_series(), frequencies=frequencies,
+                                          sample_period=4.0, block_nbytes=1).evaluate().array_data
+        assert numpy.allclose(coef, expected)
@@ -32,8 +32,12 @@
 .. moduleauthor:: Bogdan Neacsa <bogdan.neacsa@codemart.ro>
 """
 
+import os
 import numpy
+import pytest
 from tvb.tests.library.base_testcase import BaseTestCase
+from tvb.analyzers import fcd_matrix
+from tvb.basic.traits.types_mapped_light import ChunkedArray
 from tvb.datatypes import time_series
 
 
@@ -109,3 +113,51 @@ class TestTimeseries(BaseTestCase):
         assert dt.sample_rate == 0.0
         assert dt.start_time == 0.0
         assert dt.time.shape == (0,)
+
+
+class TestChunkedTimeSeries(BaseTestCase):
+    """
+    Tests time series with data read on demand by `ChunkedArray`.
+    """
+
+    def _data(self):
+        return numpy.random.RandomState(42).randn(50, 2, 7, 1)
+
+    def test_indexing(self):
+        data = self._data()
+        chunked = ChunkedArray(data, chunk_size=8, cache_chunks=2)
+        keys = [3, -1, slice(None), slice(5, 30, 3), slice(40, 2, -5), slice(60, 70), [1, 17, 9, 49],
+                numpy.arange(50) % 3 == 0, (slice(4, 20), 1), (slice(10, 12), slice(None), [0, 5], 0),
+                (Ellipsis, 0), (7, 0, 3, 0)]
+        for key in keys:
+            assert numpy.array_equal(chunked[key], data[key])
+        assert len(chunked._cache) == 2
+        assert numpy.array_equal(numpy.asarray(chunked), data)
+
+    def test_npy(self, tmpdir):
+        data = self._data()
+        npy_path = os.path.join(str(tmpdir), 'data.npy')
+        numpy.save(npy_path, data)
+        assert numpy.array_equal(ChunkedArray.from_npy(npy_path)[10:20], data[10:20])
+
+    def test_h5(self, tmpdir):
+        h5py = pytest.importorskip('h5py')
+        data = self._data()
+        h5_path = os.path.join(str(tmpdir), 'data.h5')
+        with h5py.File(h5_path, 'w') as h5_file:
+            h5_file.create_dataset('data', data=data, chunks=(4, 2, 7, 1))
+        chunked = ChunkedArray.from_h5(h5_path)
+        assert chunked.chunk_size == 4
+        assert numpy.array_equal(chunked[[3, 30, 31]], data[[3, 30, 31]])
+        chunked.close()
+
+    def test_analyzer(self):
+        data = self._data()
+        fcds = []
+        for data_ in (data, ChunkedArray(data, chunk_size=8)):
+            ts = time_series.TimeSeriesRegion(data=data_, sample_period=1.0)
+            ts.configure()
+            assert ts.read_data_shape() == data.shape
+            assert numpy.array_equal(ts.read_data_page(5, 25), data[5:25, 0, :, 0])
+            fcds.append(fcd_matrix.FcdCalculator(time_series=ts, sw=10.0, sp=5.0).evaluate()[0])
+        assert numpy.allclose(*fcds)
@@ -56,8 +56,9 @@ from tvb.tests.library.base_testcase import BaseTestCase
 if HAVE_NUMBA:
     from tvb.simulator._numba.coupling import (cu_simple_cfun, next_pow_of_2, cu_linear_cfe_post, cu_linear_cfe_pre,
                                                cu_delay_cfun, _cu_mod_pow_2, cu_tanh_cfe_pre, cu_sigm_cfe_post,
-                                               cu_kura_cfe_pre)
+                                               cu_kura_cfe_pre, nb_delay_cfun)
     from tvb.simulator._numba.util import CUDA_SIM, cu_expr
+    from tvb.simulator._numba.loops import CpuSweep
 
 from tvb.simulator import coupling as py_coupling, simulator, models, monitors, integrators
 from tvb.datatypes import connectivity
@@ -393,3 +394,45 @@ class TestSim(CudaBaseCase):
         # accept higher error because it accumulates over time
         # TODO test error proportional to time
         numpy.testing.assert_allclose(cu_data, py_data, 1e-2, 1e-2)
+
+
+class TestCpuSweep(BaseTestCase):
+
+    @skip_if_no_numba
+    def test_cpu_target(self):
+        cpu_fn = cu_expr('exp(x) + sin(y)', ['x', 'y'], {}, target='cpu')
+        assert numpy.allclose(cpu_fn(0.5, 0.2), numpy.exp(0.5) + numpy.sin(0.2))
+        assert numpy.allclose(cu_kura_cfe_pre(target='cpu')(0.3, 0.5), numpy.sin(0.2))
+        with pytest.raises(ValueError):
+            nb_delay_cfun(13, cu_kura_cfe_pre(target='cpu'), cu_linear_cfe_post(1.0, 0.0, target='cpu'))
+
+    @skip_if_no_numba
+    def test_kuramoto_sweep(self):
+        numpy.random.seed(42)
+        n, n_step, n_inner, omega, dt = 10, 60, 20, 0.6, 0.1
+        weights = numpy.random.rand(n, n).astype(numpy.float32)
+        weights[weights < 0.5] = 0.0
+        delays = numpy.random.randint(0, 10, (n, n)).astype(numpy.int32)
+        dfun = cu_expr('omega + c', ('x', 'c'), {'omega': omega}, target='cpu')
+        cfpre = cu_kura_cfe_pre(target='cpu')
+        cfpost = cu_linear_cfe_post(1.0 / n, 0.0, target='cpu')
+        sweep = CpuSweep(weights, delays, dfun, cfpre, cfpost, dt, n_inner=n_inner)
+        a_values = numpy.linspace(0.0, 2.0, 8)
+        initial = numpy.random.rand(n).astype(numpy.float32)
+        states = sweep.run(n_step, a_values, numpy.zeros_like(a_values), initial)
+        assert states.shape == (n_step // n_inner, a_values.size, n)
+        # replay with NumPy
+        horizon, nodes = sweep.horizon, numpy.r_[:n]
+        for i, a in enumerate(a_values):
+            x = initial.copy()
+            buf = numpy.tile(x[:, numpy.newaxis], (1, horizon))
+            for step in range(n_step):
+                buf[:, step % horizon] = x
+                x_j = buf[nodes, (step - delays) % horizon]
+                x = x + dt * (omega + a * (weights * numpy.sin(x_j - x[:, numpy.newaxis])).sum(axis=1) / n)
+                if (step + 1) % n_inner == 0:
+                    numpy.testing.assert_allclose(states[(step + 1) // n_inner - 1, i], x, 1e-4, 1e-5)
+        # noise is reproducible given a random state
+        noisy = [sweep.run(n_step, a_values, a_values * 1e-3, initial, numpy.random.RandomState(1)) for _ in range(2)]
+        numpy.testing.assert_equal(*noisy)
+        assert not numpy.allclose(noisy[0], states)
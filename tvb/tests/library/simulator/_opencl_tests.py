@@ -257,4 +257,62 @@ class TestIntegrator():
         cl.configure_opencl(self.context, self.queue)
         self.model.configure_opencl(self.context, self.queue)
         cl.noise.dt = cl.dt
-        cl.scheme(self.state, self.model.dfunKernel, self.coupling)
\ No newline at end of file
+        cl.scheme(self.state, self.model.dfunKernel, self.coupling)
+
+@pytest.mark.skipif(not PYOPENCL_AVAILABLE, reason='PyOpenCL not available')
+class TestCLSimulator():
+
+    def _simulator(self, coupling_, integrator):
+        from tvb.datatypes.connectivity import Connectivity
+        from tvb.simulator import simulator, models, monitors
+        conn = Connectivity(load_default=True)
+        conn.speed = numpy.r_[4.0]
+        return simulator.Simulator(connectivity=conn, model=models.Generic2dOscillator(), coupling=coupling_,
+                                   integrator=integrator, monitors=[monitors.TemporalAverage(period=1.0)]).configure()
+
+    @pytest.mark.parametrize('coupling_class, integrator_class', [
+        ('Linear', 'HeunDeterministic'), ('Difference', 'EulerDeterministic')])
+    def test_numpy_against_opencl(self, coupling_class, integrator_class):
+        from tvb.simulator import coupling, integrators
+        from tvb.simulator._opencl.util import create_cpu_context, context_and_queue
+        from tvb.simulator._opencl.cl_simulator import CLSimulator
+        sim = self._simulator(getattr(coupling, coupling_class)(a=numpy.r_[0.1]),
+                              getattr(integrators, integrator_class)(dt=0.05))
+        cl_sim = CLSimulator(sim)
+        cl_sim.configure_opencl(*context_and_queue(create_cpu_context()))
+        # simulator state is advanced by the OpenCL run, so compare against a fresh one
+        np_sim = self._simulator(sim.coupling, sim.integrator)
+        np_sim.history.buffer[:] = sim.history.buffer
+        np_sim.current_state[:] = sim.current_state
+        (t, cl_tavg), = cl_sim.run(simulation_length=10.5)
+        (np_t, np_tavg), = np_sim.run(simulation_length=10.5)
+        numpy.testing.assert_allclose(t, np_t)
+        numpy.testing.assert_allclose(cl_tavg, np_tavg, 1e-4, 1e-5)
+        assert sim.current_step == np_sim.current_step
+
+    def test_host_continuation(self):
+        from tvb.simulator import coupling, integrators
+        from tvb.simulator._opencl.util import create_cpu_context, context_and_queue
+        from tvb.simulator._opencl.cl_simulator import CLSimulator
+        sim = self._simulator(coupling.Linear(a=numpy.r_[0.1]), integrators.HeunDeterministic(dt=0.05))
+        np_sim = self._simulator(sim.coupling, sim.integrator)
+        np_sim.history.buffer[:] = sim.history.buffer
+        np_sim.current_state[:] = sim.current_state
+        cl_sim = CLSimulator(sim)
+        cl_sim.configure_opencl(*context_and_queue(create_cpu_context()))
+        cl_sim.run(simulation_length=10.0)
+        np_sim.run(simulation_length=10.0)
+        # the host simulator continues from the device's history
+        numpy.testing.assert_allclose(sim.history.buffer, np_sim.history.buffer, 1e-4, 1e-5)
+        numpy.testing.assert_allclose(sim.current_state, np_sim.current_state, 1e-4, 1e-5)
+        (t, tavg), = sim.run(simulation_length=5.0)
+        (np_t, np_tavg), = np_sim.run(simulation_length=5.0)
+        numpy.testing.assert_allclose(t, np_t)
+        numpy.testing.assert_allclose(tavg, np_tavg, 1e-4, 1e-5)
+
+    def test_unsupported(self):
+        from tvb.simulator import integrators
+        from tvb.simulator._opencl.cl_simulator import CLSimulator
+        from tvb.simulator.coupling import Linear
+        with pytest.raises(NotImplementedError):
+            CLSimulator(self._simulator(Linear(), integrators.RungeKutta4thOrderDeterministic()))
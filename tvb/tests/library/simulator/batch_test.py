@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Test for tvb.simulator.batch module
+
+"""
+
+import numpy
+import pytest
+from tvb.tests.library.base_testcase import BaseTestCase
+from tvb.datatypes.connectivity import Connectivity
+from tvb.simulator import coupling, integrators, models, monitors
+from tvb.simulator.batch import BatchSimulator
+from tvb.simulator.simulator import Simulator
+
+
+class TestBatchSimulator(BaseTestCase):
+
+    speeds = numpy.r_[2.0, 4.0, 8.0]
+    coupling_a = numpy.r_[0.001, 0.01, 0.1]
+    model_a = numpy.r_[-1.0, -0.5, 0.5]
+
+    def _conn(self):
+        conn = Connectivity(load_default=True)
+        conn.speed = numpy.r_[4.0]
+        return conn
+
+    def _sim_kwds(self):
+        return dict(model=models.Generic2dOscillator(),
+                    integrator=integrators.HeunDeterministic(dt=2 ** -4),
+                    monitors=[monitors.TemporalAverage(period=1.0)])
+
+    def _initial_conditions(self, n_node):
+        # constant history, long enough for all instances' horizons
+        rng = numpy.random.RandomState(42)
+        return numpy.tile(rng.uniform(-1.0, 1.0, size=(1, 2, n_node, 1)), (1500, 1, 1, 1))
+
+    def test_matches_individual_simulations(self):
+        conn = self._conn()
+        ic = self._initial_conditions(conn.weights.shape[0])
+        batch = BatchSimulator(connectivity=conn, coupling=coupling.Linear(), initial_conditions=ic,
+                               **self._sim_kwds())
+        batch.sweep = {'conduction_speed': self.speeds, 'coupling.a': self.coupling_a, 'model.a': self.model_a}
+        batch.configure()
+        (t, batch_tavg), = batch.run(simulation_length=10.0)
+        assert batch_tavg.shape == (10, 3, 1, conn.weights.shape[0], 1)
+        for i in range(3):
+            conn = self._conn()
+            conn.speed = numpy.r_[self.speeds[i]]
+            kwds = self._sim_kwds()
+            kwds['model'].a = numpy.r_[self.model_a[i]]
+            sim = Simulator(connectivity=conn, coupling=coupling.Linear(a=numpy.r_[self.coupling_a[i]]),
+                            initial_conditions=ic, **kwds)
+            sim.configure()
+            (ti, tavg), = sim.run(simulation_length=10.0)
+            assert numpy.allclose(t, ti)
+            assert numpy.allclose(batch_tavg[:, i], tavg)
+
+    def test_unsupported(self):
+        sim = BatchSimulator(connectivity=self._conn(), coupling=coupling.PreSigmoidal(), **self._sim_kwds())
+        sim.sweep = {'model.a': self.model_a}
+        with pytest.raises(NotImplementedError):
+            sim.configure()
+        sim = BatchSimulator(connectivity=self._conn(), **self._sim_kwds())
+        sim.sweep = {'model.a': self.model_a, 'coupling.a': self.coupling_a[:2]}
+        with pytest.raises(ValueError):
+            sim.configure()
@@ -90,3 +90,21 @@ class TestCommon(BaseTestCase):
             numpy.add.at(expected, map, source)
             common._add_at(actual, map, source)
             assert numpy.allclose(expected, actual)
+
+    def test_group_mean(self):
+        ri = numpy.random.randint
+        for nd in range(1, 4):
+            m, n, rest = ri(3, 50), ri(51, 100), tuple(ri(3, 10, nd - 1))
+            source = numpy.random.randn(*((n,) + rest))
+            index = ri(0, m, n)
+            index[index == 1] = 0  # at least one empty group
+            dense = numpy.zeros((m, n))
+            dense[index, numpy.r_[:n]] = 1.0
+            counts = numpy.maximum(dense.sum(axis=1), 1.0).reshape((-1,) + (1,) * (nd - 1))
+            expected = numpy.tensordot(dense, source, axes=1) / counts
+            actual = common.GroupMean(index, m)(source)
+            assert actual.shape == expected.shape
+            assert numpy.allclose(expected, actual)
+            # reduction along a trailing axis
+            actual = common.GroupMean(index, m)(source[numpy.newaxis], axis=1)
+            assert numpy.allclose(expected, actual[0])
@@ -171,3 +171,62 @@ class TestCouplingShape(BaseTestCase):
 
         for _ in sim(simulation_length=sim.integrator.dt * 2):
             pass
+
+
+def _random_history(n_node=6, n_time=5):
+    "Sparse history of a random network with random delays & buffer contents."
+    rng = numpy.random.RandomState(42)
+    weights = rng.rand(n_node, n_node) * (rng.rand(n_node, n_node) > 0.5)
+    delays = rng.randint(0, n_time, (n_node, n_node))
+    history = SparseHistory(weights, delays, numpy.r_[0, 1], 1)
+    history.initialize(rng.randn(history.n_time, 2, n_node, 1))
+    return history
+
+
+class TestSparseDelayedState(BaseTestCase):
+    "Sparse coupling paths against dense evaluation of the delayed state."
+
+    def _delayed_state_allocated(self, history):
+        return history in SparseHistory.delayed_state.instance_state
+
+    def test_sigmoidal_matches_dense(self):
+        for k in (coupling.Sigmoidal(sigma=1.0), coupling.SigmoidalJansenRit(r=0.5)):
+            k.configure()
+            history = _random_history()
+            sparse = k(3, history)
+            assert not self._delayed_state_allocated(history)
+            dense = coupling.Coupling.__call__(k, 3, history)
+            # dense evaluation repeats a single pre-summation variable over all coupling variables
+            numpy.testing.assert_allclose(numpy.broadcast_to(sparse, dense.shape), dense, rtol=1e-5)
+
+    def _dense_pre_sigmoidal(self, k, step, history, na=numpy.newaxis):
+        "The dense PreSigmoidal evaluation which the sparse one reproduces."
+        g_ij = history.es_weights
+        x_i, x_j = history.query(step)
+        if k.dynamic:
+            _ = (k.P * x_j[:,0] - x_j[:,1,k.sliceT])[:,na]
+        else:
+            _ = k.P * x_j - k.theta[k.sliceT,na]
+        A_j = k.H * (k.Q + numpy.tanh(k.G * _))
+        if k.dynamic:
+            c_0 = (g_ij[:,0] * A_j[:,0]).sum(axis=0)
+            # copied, as the diagonal view is read-only
+            c_1 = numpy.diag(A_j[:,0,:,0])[:, na].copy()
+            if k.globalT:
+                c_1[:] = c_1.mean()
+            return numpy.array([c_0, c_1])
+        else: # static threshold
+            return (g_ij.transpose((2, 1, 0, 3)) * A_j).sum(axis=0)
+
+    def test_pre_sigmoidal_matches_dense(self):
+        theta = numpy.linspace(0.0, 1.0, 6)
+        for dynamic in (False, True):
+            for globalT in (False, True):
+                for k in (coupling.PreSigmoidal(dynamic=dynamic, globalT=globalT, G=numpy.r_[2.0]),
+                          coupling.PreSigmoidal(dynamic=dynamic, globalT=globalT, theta=theta)):
+                    k.configure()
+                    history = _random_history()
+                    sparse = k(3, history)
+                    assert not self._delayed_state_allocated(history)
+                    dense = self._dense_pre_sigmoidal(k, 3, history)
+                    numpy.testing.assert_allclose(sparse, dense, rtol=1e-5, atol=1e-7)
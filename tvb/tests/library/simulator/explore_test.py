@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Test for tvb.simulator.explore module
+
+"""
+
+import numpy
+import scipy.sparse
+from tvb.tests.library.base_testcase import BaseTestCase
+from tvb.analyzers.metric_variance_global import GlobalVariance
+from tvb.datatypes.connectivity import Connectivity
+from tvb.simulator import simulator, coupling, monitors, integrators
+from tvb.simulator.explore import SharedArrays, MetricReduction, ParameterExploration
+
+
+def _build(shared, a):
+    conn = shared.connectivity()
+    conn.speed = numpy.r_[4.0]
+    return simulator.Simulator(connectivity=conn, coupling=coupling.Linear(a=numpy.r_[a]),
+                               integrator=integrators.HeunDeterministic(dt=0.1),
+                               initial_conditions=shared['initial'],
+                               monitors=[monitors.TemporalAverage(period=1.0)])
+
+
+class TestExplore(BaseTestCase):
+
+    def setup_method(self):
+        self.conn = Connectivity(load_default=True)
+        initial = numpy.random.RandomState(42).uniform(-1.0, 1.0, (1, 2, 76, 1))
+        self.shared = SharedArrays.from_connectivity(self.conn, initial=numpy.tile(initial, (3000, 1, 1, 1)),
+                                                     sparse=scipy.sparse.eye(5, format='csr'))
+
+    def teardown_method(self):
+        self.shared.close()
+
+    def test_shared_arrays(self):
+        arrays = self.shared.load()
+        assert isinstance(arrays['connectivity.weights'], numpy.memmap)
+        assert numpy.allclose(arrays['connectivity.weights'], self.conn.weights)
+        assert numpy.allclose(arrays['sparse'].toarray(), numpy.eye(5))
+        conn = self.shared.connectivity()
+        conn.configure()
+        assert conn.number_of_regions == 76
+        assert (conn.region_labels == self.conn.region_labels).all()
+
+    def test_exploration(self):
+        reduction = MetricReduction([GlobalVariance], start_point=10.0)
+        configurations = [{'a': a} for a in (0.0, 0.01, 0.02)]
+        results = dict((params['a'], result) for params, result in
+                       ParameterExploration(_build, reduction, self.shared, n_proc=2).run(configurations, 50.0))
+        assert sorted(results) == [0.0, 0.01, 0.02]
+        for a, result in results.items():
+            sim = _build(self.shared, a)
+            sim.configure()
+            assert numpy.allclose(result['GlobalVariance'], reduction(sim, sim.run(simulation_length=50.0))['GlobalVariance'])
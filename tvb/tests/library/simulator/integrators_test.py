@@ -142,3 +142,23 @@ class TestIntegrators(BaseTestCase):
             x = vode.scheme(x, self._dummy_dfun, 0.0, 0.0, 0.0)
         for idx, val in zip(vode.clamped_state_variable_indices, vode.clamped_state_variable_values):
             assert numpy.allclose(x[idx], val)
+
+    def test_in_place(self):
+        "Verify in place schemes give the same result as allocating schemes."
+        sh = 2, 10, 1
+        X = numpy.random.randn(*sh)
+        stimulus = numpy.random.randn(*sh)
+        for cls in (integrators.HeunDeterministic, integrators.HeunStochastic, integrators.EulerDeterministic,
+                    integrators.EulerStochastic, integrators.RungeKutta4thOrderDeterministic, integrators.Identity):
+            results = []
+            for in_place in (False, True):
+                integrator = cls(in_place=in_place)
+                integrator.configure()
+                if isinstance(integrator, integrators.IntegratorStochastic):
+                    integrator.noise.dt = integrator.dt
+                    integrator.noise.random_stream.seed(42)
+                X_ = X.copy()
+                nX = integrator.scheme(X_, self._dummy_dfun, 0.0, 0.0, stimulus)
+                assert (nX is X_) == in_place
+                results.append(nX)
+            assert numpy.allclose(*results)
@@ -117,6 +117,79 @@ class TestMonitorsConfiguration(BaseTestCase):
         assert monitor.period == 2000.0
 
 
+class TestSpatialAverage(BaseTestCase):
+    "Spatial average against the dense averaging matrix."
+
+    def test_matches_dense(self):
+        conn = connectivity.Connectivity(load_default=True)
+        n_node = conn.weights.shape[0]
+        mask = numpy.random.RandomState(42).randint(0, 7, n_node)
+        mask[:7] = numpy.r_[:7]
+        sim = simulator.Simulator(connectivity=conn, monitors=[monitors.SpatialAverage(spatial_mask=mask, period=1.0)])
+        sim.configure()
+        mon, = sim.monitors
+        dense = numpy.zeros((7, n_node))
+        dense[mask, numpy.r_[:n_node]] = 1.0
+        dense /= dense.sum(axis=1)[:, numpy.newaxis]
+        state = numpy.random.randn(2, n_node, 1)
+        _, actual = mon.sample(mon.istep, state)
+        expected = numpy.dot(dense, state[mon.voi]).transpose((1, 0, 2))
+        assert actual.shape == (len(mon.voi), 7, 1)
+        assert numpy.allclose(expected, actual)
+
+
+class TestBoldStreaming(BaseTestCase):
+    "Streaming BOLD against the full HRF convolution."
+
+    def test_matches_bold(self):
+        from tvb.datatypes import equations
+        for hrf_kernel in (equations.FirstOrderVolterra(), equations.Gamma()):
+            conn = connectivity.Connectivity(load_default=True)
+            conn.speed = numpy.r_[4.0]
+            sim = simulator.Simulator(
+                model=models.Generic2dOscillator(),
+                connectivity=conn,
+                coupling=coupling.Linear(),
+                integrator=integrators.HeunStochastic(dt=2 ** -2, noise=noise.Additive(nsig=numpy.r_[1e-3])),
+                monitors=[monitors.Bold(period=500.0, hrf_length=4000.0, hrf_kernel=hrf_kernel),
+                          monitors.BoldStreaming(period=500.0, hrf_length=4000.0, hrf_kernel=hrf_kernel)])
+            sim.configure()
+            (t, bold), (ts, bold_s) = sim.run(simulation_length=6000.0)
+            assert sim.monitors[1]._stock.shape[0] == 9
+            assert numpy.allclose(t, ts)
+            assert numpy.allclose(bold, bold_s)
+
+
+class TestLazyProjection(BaseTestCase):
+    "Lazy projection monitors sharing a stacked gain against eager ones."
+
+    def _run(self, lazy):
+        conn = connectivity.Connectivity.from_file('connectivity_76.zip')
+        conn.speed = numpy.r_[4.0]
+        region_mapping = RegionMapping.from_file('regionMapping_16k_76.txt')
+        mons = [monitors.EEG.from_file(period=1.0, region_mapping=region_mapping),
+                monitors.MEG.from_file(period=1.0, region_mapping=region_mapping)]
+        for mon in mons:
+            mon.lazy = lazy
+        sim = simulator.Simulator(
+            model=models.Generic2dOscillator(),
+            connectivity=conn,
+            coupling=coupling.Linear(),
+            integrator=integrators.HeunStochastic(dt=2 ** -4, noise=noise.Additive(nsig=numpy.r_[1e-3])),
+            monitors=mons).configure()
+        return sim, sim.run(simulation_length=20.0)
+
+    def test_matches_eager(self):
+        sim, ((t, eeg), (_, meg)) = self._run(lazy=True)
+        _, ((t_, eeg_), (_, meg_)) = self._run(lazy=False)
+        eeg_mon, meg_mon = sim.monitors
+        assert eeg_mon._group is meg_mon._group
+        assert eeg_mon._group.gain.shape[0] == eeg_mon.gain.shape[0] + meg_mon.gain.shape[0]
+        assert numpy.allclose(t, t_)
+        assert numpy.allclose(eeg, eeg_)
+        assert numpy.allclose(meg, meg_)
+
+
 class TestSubcorticalProjection(BaseTestCase):
     """
     Cortical surface with subcortical regions, sEEG, EEG & MEG, using a stochastic
@@ -34,6 +34,8 @@ Test for tvb.simulator.noise module
 .. moduleauthor:: Paula Sanz Leon <sanzleon.paula@gmail.com>
 
 """
+import numpy
+import pytest
 from tvb.tests.library.base_testcase import BaseTestCase
 from tvb.simulator import noise
 from tvb.datatypes import equations
@@ -52,3 +54,41 @@ class TestNoise(BaseTestCase):
         noise_multiplicative = noise.Multiplicative()
         assert noise_multiplicative.ntau == 0.0
         assert isinstance(noise_multiplicative.b, equations.Linear)
+
+    def _realization(self, n_step=10, shape=(2, 5, 1), **kwds):
+        noise_ = noise.Additive(**kwds)
+        if noise_.ntau > 0.0:
+            noise_.configure_coloured(0.1, shape)
+        else:
+            noise_.configure_white(0.1, shape)
+        return numpy.array([noise_.generate(shape) for _ in range(n_step)])
+
+    def test_block(self):
+        for ntau in (0.0, 1.0):
+            assert numpy.allclose(self._realization(ntau=ntau), self._realization(ntau=ntau, block_size=4))
+
+    def test_bit_generator(self):
+        if not hasattr(numpy.random, 'Generator'):
+            with pytest.raises(ImportError):
+                self._realization(bit_generator='PCG64')
+        else:
+            for name in ('PCG64', 'Philox'):
+                assert numpy.allclose(self._realization(bit_generator=name),
+                                      self._realization(bit_generator=name, block_size=3))
+        with pytest.raises(ValueError):
+            self._realization(bit_generator='MT19937')
+
+    def test_state(self):
+        shape = (2, 5, 1)
+        names = ['RandomState'] + (['PCG64', 'Philox'] if hasattr(numpy.random, 'Generator') else [])
+        for name in names:
+            noise_ = noise.Additive(bit_generator=name)
+            noise_.configure_white(0.1, shape)
+            first = noise_.generate(shape)
+            state = noise_.get_state()
+            # reconfiguring continues the stream
+            noise_.configure_white(0.1, shape)
+            second = noise_.generate(shape)
+            assert not numpy.allclose(first, second)
+            noise_.set_state(state)
+            assert numpy.allclose(noise_.generate(shape), second)
@@ -41,6 +41,7 @@ schemes (region and surface based simulations).
 # TODO: check the defaults of simulator.Simulator() (?)
 # TODO: continuation support or maybe test that particular feature elsewhere
 
+import os
 import numpy
 import itertools
 from tvb.tests.library.base_testcase import BaseTestCase
@@ -177,3 +178,101 @@ class TestSimulator(BaseTestCase):
 
             assert len(test_simulator.monitors) == len(result)
             LOG.debug("Surface simulation finished for defaultConnectivity= %s" % str(default_connectivity))
+
+
+def _run_delayed(coupling_, **kwds):
+    "Run a short region simulation with delays of at least a few steps."
+    conn = Connectivity(load_default=True)
+    conn.speed = numpy.r_[4.0]
+    # ensure minimum delay allows blocks
+    conn.tract_lengths = conn.tract_lengths + 10.0
+    rng = numpy.random.RandomState(42)
+    ic = numpy.tile(rng.uniform(-1.0, 1.0, size=(1, 2, conn.weights.shape[0], 1)), (1000, 1, 1, 1))
+    mons = (monitors.Raw(), monitors.SubSample(period=1.0), monitors.TemporalAverage(period=1.0),
+            monitors.GlobalAverage(period=0.5))
+    kwds.setdefault('integrator', integrators.HeunDeterministic(dt=2 ** -4))
+    sim = simulator.Simulator(connectivity=conn, coupling=coupling_, initial_conditions=ic,
+                              monitors=mons, **kwds)
+    sim.configure()
+    assert sim.history.max_block_steps >= sim.block_steps
+    return sim.run(simulation_length=10.0)
+
+
+def _assert_same_output(output, other):
+    for (t1, y1), (t2, y2) in zip(output, other):
+        assert numpy.allclose(t1, t2)
+        assert numpy.allclose(y1, y2)
+
+
+class TestBlockSimulator(BaseTestCase):
+
+    def _assert_block_matches_steps(self, coupling_class):
+        _assert_same_output(_run_delayed(coupling_class(), block_steps=1),
+                            _run_delayed(coupling_class(), block_steps=7))
+
+    def test_block_coupling(self):
+        self._assert_block_matches_steps(coupling.Linear)
+
+    def test_per_step_coupling(self):
+        self._assert_block_matches_steps(coupling.Difference)
+
+
+class TestNumbaCouplingSimulator(BaseTestCase):
+
+    def test_numba_coupling(self):
+        for coupling_class in (coupling.Linear, coupling.Kuramoto):
+            _assert_same_output(_run_delayed(coupling_class()),
+                                _run_delayed(coupling_class(), numba_coupling=True))
+
+
+class TestInPlaceSimulator(BaseTestCase):
+
+    def test_in_place_integration(self):
+        for integrator_class in (integrators.HeunDeterministic, integrators.RungeKutta4thOrderDeterministic):
+            _assert_same_output(_run_delayed(coupling.Linear(), integrator=integrator_class(dt=2 ** -4)),
+                                _run_delayed(coupling.Linear(), integrator=integrator_class(dt=2 ** -4,
+                                                                                            in_place=True)))
+
+
+class TestCheckpoint(BaseTestCase):
+    "Runs resumed from a checkpoint against uninterrupted runs."
+
+    def _build(self, noise_, **kwds):
+        conn = Connectivity.from_file('connectivity_76.zip')
+        conn.speed = numpy.r_[4.0]
+        region_mapping = RegionMapping.from_file('regionMapping_16k_76.txt')
+        mons = [monitors.TemporalAverage(period=1.0),
+                monitors.Bold(period=5.0),
+                monitors.EEG.from_file(period=1.0, region_mapping=region_mapping, lazy=True),
+                monitors.MEG.from_file(period=1.5, region_mapping=region_mapping)]
+        sim = simulator.Simulator(
+            model=models.Generic2dOscillator(),
+            connectivity=conn,
+            coupling=coupling.Linear(),
+            integrator=integrators.HeunStochastic(dt=2 ** -4, noise=noise_),
+            monitors=mons, **kwds).configure()
+        return sim
+
+    def _assert_resumes(self, tmpdir, make_noise, **kwds):
+        path = os.path.join(str(tmpdir), 'checkpoint.npz')
+        expected = self._build(make_noise(), **kwds).run(simulation_length=20.0)
+        # checkpoints at steps 84 and 168, the latter replacing the former, within sampling periods
+        first = self._build(make_noise(), checkpoint_steps=84, checkpoint_path=path, **kwds)
+        first.run(simulation_length=10.5)
+        assert not os.path.exists(path + '.tmp')
+        sim = self._build(make_noise(), **kwds)
+        sim.restore(path)
+        assert sim.current_step == 168
+        for (t, y), (t_, y_) in zip(sim.run(simulation_length=9.5), expected):
+            assert len(t) > 0
+            assert numpy.array_equal(t, t_[-len(t):])
+            assert numpy.array_equal(y, y_[-len(t):])
+
+    def test_white_block_noise(self, tmpdir):
+        self._assert_resumes(tmpdir, lambda: noise.Additive(nsig=numpy.r_[1e-3], block_size=48))
+
+    def test_coloured_noise(self, tmpdir):
+        self._assert_resumes(tmpdir, lambda: noise.Additive(nsig=numpy.r_[1e-3], ntau=1.0))
+
+    def test_block_steps(self, tmpdir):
+        self._assert_resumes(tmpdir, lambda: noise.Additive(nsig=numpy.r_[1e-3]), block_steps=3)
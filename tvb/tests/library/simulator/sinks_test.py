@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#
+#
+#  TheVirtualBrain-Scientific Package. This package holds all simulators, and 
+# analysers necessary to run brain-simulations. You can use it stand alone or
+# in conjunction with TheVirtualBrain-Framework Package. See content of the
+# documentation-folder for more details. See also http://www.thevirtualbrain.org
+#
+# (c) 2012-2017, Baycrest Centre for Geriatric Care ("Baycrest") and others
+#
+# This program is free software: you can redistribute it and/or modify it under the
+# terms of the GNU General Public License as published by the Free Software Foundation,
+# either version 3 of the License, or (at your option) any later version.
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A
+# PARTICULAR PURPOSE.  See the GNU General Public License for more details.
+# You should have received a copy of the GNU General Public License along with this
+# program.  If not, see <http://www.gnu.org/licenses/>.
+#
+#
+#   CITATION:
+# When using The Virtual Brain for scientific publications, please cite it as follows:
+#
+#   Paula Sanz Leon, Stuart A. Knock, M. Marmaduke Woodman, Lia Domide,
+#   Jochen Mersmann, Anthony R. McIntosh, Viktor Jirsa (2013)
+#       The Virtual Brain: a simulator of primate brain network dynamics.
+#   Frontiers in Neuroinformatics (7:10. doi: 10.3389/fninf.2013.00010)
+#
+#
+
+"""
+Test for tvb.simulator.sinks module
+
+"""
+
+import os
+import numpy
+import pytest
+from tvb.tests.library.base_testcase import BaseTestCase
+from tvb.datatypes.connectivity import Connectivity
+from tvb.datatypes.time_series import TimeSeriesRegion
+from tvb.simulator import simulator, monitors, sinks, integrators
+
+
+class TestSinks(BaseTestCase):
+
+    def _run(self, sinks_=None):
+        conn = Connectivity(load_default=True)
+        conn.speed = numpy.r_[4.0]
+        ic = numpy.tile(numpy.random.RandomState(42).uniform(-1.0, 1.0, size=(1, 2, 76, 1)), (5000, 1, 1, 1))
+        sim = simulator.Simulator(connectivity=conn, initial_conditions=ic, integrator=integrators.HeunDeterministic(),
+                                  monitors=(monitors.Raw(), monitors.TemporalAverage(period=1.0)))
+        sim.configure()
+        return sim, sim.run(simulation_length=20.0, sinks=sinks_)
+
+    def _assert_streamed(self, make_sink):
+        _, expected = self._run()
+        sink = make_sink()
+        sim, actual = self._run([None, sink])
+        assert sink.n_sample == expected[1][0].size
+        assert numpy.allclose(expected[0][1], actual[0][1])
+        for exp, act in zip(expected[1], actual[1]):
+            assert exp.shape == act.shape
+            assert numpy.allclose(exp, act[()])
+        time_series = sink.time_series(sim.monitors[1], TimeSeriesRegion, connectivity=sim.connectivity)
+        assert time_series.length_1d == expected[1][0].size
+        assert numpy.allclose(expected[1][1][:3], time_series.data[:3])
+
+    def test_npy(self, tmpdir):
+        path = os.path.join(str(tmpdir), 'tavg.npy')
+        self._assert_streamed(lambda: sinks.NpySink(path, chunk_size=7))
+        assert isinstance(numpy.load(path, mmap_mode='r'), numpy.memmap)
+        assert os.path.exists(os.path.join(str(tmpdir), 'tavg_time.npy'))
+
+    @pytest.mark.skipif(sinks.hdf5 is None, reason='h5py not available')
+    def test_h5(self, tmpdir):
+        self._assert_streamed(lambda: sinks.H5Sink(os.path.join(str(tmpdir), 'tavg.h5'), chunk_size=7))